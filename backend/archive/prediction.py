@@ -3,7 +3,7 @@ import torch.nn as nn
 import numpy as np
 import logging
 import os
-import yfinance as yf
+import market_data
 from typing import List, Dict
 
 logger = logging.getLogger(__name__)
@@ -59,14 +59,14 @@ class GlobalPredictor:
              # Stage 1: Pre-training (Transfer Learning Base)
              logger.info("Starting Stage 1: Pre-training on Broad Market (SPY, QQQ, AAPL...)")
              market_tickers = ["SPY", "QQQ", "AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "BRK-B", "LLY", "JPM"]
-             market_data = []
+             histories = []
              
              for t in market_tickers:
                  try:
-                     ticker = yf.Ticker(t)
+                     ticker = market_data.Ticker(t)  # served from the local bar cache when warm
                      hist = ticker.history(period="10y")["Close"].tolist()
                      if len(hist) > 200:
-                         market_data.append(hist)
+                         histories.append(hist)
                  except Exception as e:
                      logger.warning(f"Failed to fetch market data for {t}: {e}")
              
@@ -74,7 +74,7 @@ class GlobalPredictor:
                   self.model = StockLSTM().to(self.device)
              
              # Train Base Model
-             self._train_cycle(market_data, epochs=30, learning_rate=0.005)
+             self._train_cycle(histories, epochs=30, learning_rate=0.005)
              logger.info("Stage 1 Complete.")
              
              # Stage 2: Fine-tuning on AI Portfolio
@@ -0,0 +1,240 @@
+"""
+Memory-aware batch sizing for model inference.
+
+Batch sizes are derived from measurements rather than fixed:
+  - free memory: the container's cgroup limit minus its usage (bounded by
+    MemAvailable), or free device memory on CUDA
+  - per-series cost: the memory high-water mark of each batch above the level
+    before it, divided by the batch size. The first batch of a phase is a
+    warm-up and is not measured: it pages in the memory-mapped weights, which
+    would otherwise be charged to its series. The next batch probes with a
+    single series unless an earlier run already measured the model. Each phase
+    sizes from its own worst batch and leaves that for the next run, so one
+    unusually expensive run does not shrink every later one.
+
+The next batch is as large as fits in the free memory minus
+INFERENCE_MEMORY_HEADROOM_MB, with a safety factor, capped at
+INFERENCE_MAX_BATCH. An allocation failure halves the batch and retries the
+same series; non-memory errors are retried one series at a time so a single
+bad series does not fail its neighbours. Note that the kernel OOM killer
+cannot be caught, which is why sizes are chosen from free memory up front.
+
+Every model phase reports what it did (batch sizes, OOM retries, memory
+high-water marks, resident model size after the warm-up) into the run's stats.
+"""
+import gc
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+HEADROOM_BYTES = int(float(os.environ.get("INFERENCE_MEMORY_HEADROOM_MB", "1024")) * 2**20)
+MAX_BATCH = int(os.environ.get("INFERENCE_MAX_BATCH", "64"))
+# Measured per-series cost is multiplied by this before sizing a batch
+SAFETY_FACTOR = 1.5
+# Fraction of the free memory this process may plan with; worker processes
+# sharing the machine (chronos_shards.py) each get 1/K
+MEMORY_SHARE = 1.0
+
+_MB = 2**20
+
+# (model, device, mode) -> bytes per series measured by the last run of this process
+_per_series = {}
+
+
+def _read(path: str):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _proc_status_kb(field: str):
+    for line in (_read("/proc/self/status") or "").splitlines():
+        if line.startswith(field + ":"):
+            return int(line.split()[1]) * 1024
+    return None
+
+
+def container_limit():
+    """cgroup memory limit in bytes (v2, then v1), or None if unlimited/unknown."""
+    raw = _read("/sys/fs/cgroup/memory.max") or _read("/sys/fs/cgroup/memory/memory.limit_in_bytes")
+    if not raw or raw == "max":
+        return None
+    limit = int(raw)
+    return None if limit >= 2**60 else limit  # v1 reports "unlimited" as a huge number
+
+
+def container_usage():
+    raw = _read("/sys/fs/cgroup/memory.current") or _read("/sys/fs/cgroup/memory/memory.usage_in_bytes")
+    return int(raw) if raw else None
+
+
+def available_bytes(device: str = "cpu") -> int:
+    """Memory a batch may still use on `device`."""
+    if device == "cuda":
+        import torch
+        return torch.cuda.mem_get_info()[0]
+
+    candidates = []
+    for line in (_read("/proc/meminfo") or "").splitlines():
+        if line.startswith("MemAvailable:"):
+            candidates.append(int(line.split()[1]) * 1024)
+    limit, usage = container_limit(), container_usage()
+    if limit and usage is not None:
+        candidates.append(limit - usage)
+    if not candidates:
+        return MAX_BATCH * 256 * _MB  # unknown platform: effectively "let MAX_BATCH decide"
+    return max(min(candidates), 0)
+
+
+def rss_bytes() -> int:
+    return _proc_status_kb("VmRSS") or 0
+
+
+class MemoryProbe:
+    """Current and peak memory for batches on one device."""
+
+    def __init__(self, device: str):
+        self.device = device
+
+    def reset_peak(self):
+        if self.device == "cuda":
+            import torch
+            torch.cuda.reset_peak_memory_stats()
+        else:
+            try:
+                # Resets VmHWM to the current RSS (Linux)
+                with open("/proc/self/clear_refs", "w") as f:
+                    f.write("5")
+            except OSError:
+                pass
+
+    def current(self) -> int:
+        if self.device == "cuda":
+            import torch
+            return torch.cuda.memory_allocated()
+        return rss_bytes()
+
+    def peak(self) -> int:
+        if self.device == "cuda":
+            import torch
+            return torch.cuda.max_memory_allocated()
+        return _proc_status_kb("VmHWM") or rss_bytes()
+
+
+def is_oom(exc: BaseException) -> bool:
+    """True for allocation failures raised by Python or torch (CPU or accelerator)."""
+    if isinstance(exc, MemoryError):
+        return True
+    msg = str(exc).lower()
+    return isinstance(exc, RuntimeError) and any(
+        s in msg for s in ("out of memory", "can't allocate memory", "not enough memory", "failed to allocate")
+    )
+
+
+def release_memory(device: str):
+    gc.collect()
+    try:
+        import torch
+        if device == "cuda":
+            torch.cuda.empty_cache()
+        elif device == "mps":
+            torch.mps.empty_cache()
+    except Exception:
+        pass
+
+
+class BatchSizer:
+    """Chooses batch sizes for one model phase from free memory and measured cost."""
+
+    def __init__(self, model_name: str, device: str, mode: str = "fp32"):
+        self.key = (model_name, device, mode)
+        self.device = device
+        self.measured = None  # worst cost seen in this phase
+        self.ceiling = MAX_BATCH  # lowered after an OOM
+
+    @property
+    def per_series(self):
+        return self.measured or _per_series.get(self.key)
+
+    def next_size(self, remaining: int) -> int:
+        if self.per_series is None:
+            return 1  # probe
+        budget = (available_bytes(self.device) - HEADROOM_BYTES) * MEMORY_SHARE
+        size = int(budget // (self.per_series * SAFETY_FACTOR)) if budget > 0 else 1
+        return max(1, min(size, self.ceiling, remaining))
+
+    def observe(self, size: int, before: int, peak: int):
+        cost = max(peak - before, 0) / size
+        if cost > 0:
+            # Worst case of this phase: long contexts cost more than short ones
+            self.measured = max(self.measured or 0, cost)
+            _per_series[self.key] = self.measured
+
+    def backoff(self, size: int) -> int:
+        self.ceiling = max(1, size // 2)
+        return self.ceiling
+
+
+def run_in_batches(items: list, forward, model_name: str, device: str, mode: str = "fp32", stats: dict = None,
+                   baseline: int = None):
+    """
+    Calls forward(batch) over `items`, (key, series) pairs, in adaptively sized
+    batches. `stats` (if given) receives batch_sizes, oom_retries, available/peak
+    memory and, given `baseline` (MemoryProbe.current() before the model was
+    loaded), model_mb measured once the warm-up batch has paged the weights in.
+    """
+    sizer = BatchSizer(model_name, device, mode)
+    probe = MemoryProbe(device)
+    report = {
+        "device": device,
+        "available_mb_at_start": round(available_bytes(device) / _MB, 1),
+        "batch_sizes": [],
+        "oom_retries": 0,
+        "failed": 0,
+        "peak_mb": 0.0,
+    }
+
+    i, singles, warm = 0, 0, False
+    while i < len(items):
+        size = 1 if singles else sizer.next_size(len(items) - i)
+        batch = items[i:i + size]
+        probe.reset_peak()
+        before = probe.current()
+        try:
+            forward(batch)
+        except Exception as e:
+            release_memory(device)
+            if size > 1 and is_oom(e):
+                logger.warning(f"{model_name}: allocation failed at batch size {size}, retrying with {sizer.backoff(size)}")
+                report["oom_retries"] += 1
+                continue
+            if size > 1:
+                logger.warning(f"{model_name}: batch of {size} failed ({e}); retrying series one by one")
+                singles = size
+                continue
+            logger.error(f"  {model_name} failed for {batch[0][0]}: {e}")
+            report["failed"] += 1
+            i += 1
+            singles = max(singles - 1, 0)
+            continue
+
+        peak = probe.peak()
+        if warm:
+            sizer.observe(size, before, peak)
+        else:
+            warm = True
+            if baseline is not None:
+                report["model_mb"] = round((probe.current() - baseline) / _MB, 1)
+        report["batch_sizes"].append(size)
+        report["peak_mb"] = max(report["peak_mb"], round(peak / _MB, 1))
+        i += size
+        singles = max(singles - size, 0)
+
+    if sizer.per_series:
+        report["per_series_mb"] = round(sizer.per_series / _MB, 2)
+    if stats is not None:
+        stats.update(report)
+    return report
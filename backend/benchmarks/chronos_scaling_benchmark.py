@@ -0,0 +1,63 @@
+"""
+Chronos throughput vs number of worker processes (chronos_shards.py).
+
+Runs the full 2-pass Chronos inference over N synthetic random-walk histories
+with K = 1, 2, 4, ... workers (each pinned to cores/K threads), including
+worker start-up and model load, and reports series/second and speedup over
+K = 1. Every K runs in fresh worker processes, so K = 1 is the sharded path
+with a single worker rather than the in-process one.
+
+Usage:
+    python benchmarks/chronos_scaling_benchmark.py [--series 128] [--workers 1 2 4 8] [--days 512]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from bench_utils import BACKEND_DIR  # noqa: F401  (puts backend on sys.path)
+import batch_sizing
+import chronos_shards
+
+
+def synthetic_histories(n: int, days: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.02, size=(n, days))
+    closes = 100 * np.exp(np.cumsum(returns, axis=1))
+    return {f"SYN{i:04d}": closes[i] for i in range(n)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=128)
+    parser.add_argument("--days", type=int, default=512)
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="worker counts to try (default: powers of two up to the core count)")
+    args = parser.parse_args()
+
+    cores = chronos_shards.cpu_count()
+    counts = args.workers or [k for k in (1, 2, 4, 8, 16, 32, 64) if k <= cores]
+    histories = synthetic_histories(args.series, args.days)
+    free_mb = (batch_sizing.available_bytes("cpu") - batch_sizing.HEADROOM_BYTES) / 2**20
+    print(f"{args.series} series x {args.days} days, {cores} cores, {free_mb:.0f} MB free for workers "
+          f"(budget {chronos_shards.WORKER_MEMORY_BYTES / 2**20:.0f} MB each)")
+    print(f"{'K':<4} | {'threads':<7} | {'seconds':<8} | {'series/s':<9} | {'speedup':<7} | failed")
+    print("-" * 58)
+
+    baseline = None
+    for k in counts:
+        workers, threads = chronos_shards.plan(args.series, str(k))
+        if workers != k:
+            print(f"{k:<4} | skipped: only {workers} workers fit the memory budget")
+            continue
+        stats = {}
+        start = time.perf_counter()
+        results = chronos_shards.run(histories, workers, threads, stats=stats)
+        elapsed = time.perf_counter() - start
+        throughput = len(results) / elapsed
+        baseline = baseline or throughput
+        print(f"{k:<4} | {threads:<7} | {elapsed:<8.1f} | {throughput:<9.2f} | {throughput / baseline:<7.2f} | {stats['failed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Price-history storage benchmark: legacy JSON column vs packed blobs.
+
+Builds one SQLite file per encoding holding N tickers x 5 years of closes and
+reports file size, write time and full read+decode time (rows -> np.ndarray,
+which is what the forecasting path consumes).
+
+Usage:
+    python benchmarks/history_storage_benchmark.py [--tickers 500] [--days 1260] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import JSON, Column, LargeBinary, MetaData, String, Table, create_engine, insert, select
+
+from bench_utils import BACKEND_DIR  # noqa: F401  (puts backend on sys.path)
+import history_codec
+
+VARIANTS = [
+    ("json", None, None),
+    ("float64", "float64", "none"),
+    ("float32", "float32", "none"),
+    ("float64+zlib", "float64", "zlib"),
+    ("float32+zlib", "float32", "zlib"),
+]
+
+
+def synthetic_histories(n: int, days: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.02, size=(n, days))
+    return 100 * np.exp(np.cumsum(returns, axis=1))
+
+
+def build(path: str, histories, dtype, codec):
+    engine = create_engine(f"sqlite:///{path}")
+    meta = MetaData()
+    col = Column("history", JSON if dtype is None else LargeBinary)
+    table = Table("stocks", meta, Column("ticker", String, primary_key=True), col)
+    meta.create_all(engine)
+
+    t0 = time.perf_counter()
+    if dtype is None:
+        rows = [{"ticker": f"T{i}", "history": [float(x) for x in h]} for i, h in enumerate(histories)]
+    else:
+        rows = [{"ticker": f"T{i}", "history": history_codec.encode(h, dtype, codec)} for i, h in enumerate(histories)]
+    with engine.begin() as conn:
+        conn.execute(insert(table), rows)
+    write_s = time.perf_counter() - t0
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+    return engine, table, write_s
+
+
+def read_all(engine, table, is_json: bool):
+    with engine.connect() as conn:
+        rows = conn.execute(select(table.c.history)).scalars().all()
+    if is_json:
+        return [np.asarray(h, dtype=np.float64) for h in rows]
+    return [history_codec.decode(h) for h in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=1260)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    histories = synthetic_histories(args.tickers, args.days)
+    print(f"{args.tickers} tickers x {args.days} days")
+    print(f"{'Encoding':<14} | {'DB size MB':<10} | {'write (s)':<9} | {'read+decode (ms)':<16} | {'max abs err':<11}")
+    print("-" * 72)
+
+    baseline_ms = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, dtype, codec in VARIANTS:
+            path = os.path.join(tmp, f"{name}.db")
+            engine, table, write_s = build(path, histories, dtype, codec)
+            size_mb = os.path.getsize(path) / 1e6
+
+            times = []
+            for _ in range(args.runs):
+                t0 = time.perf_counter()
+                decoded = read_all(engine, table, dtype is None)
+                times.append((time.perf_counter() - t0) * 1000)
+            read_ms = statistics.median(times)
+            baseline_ms = baseline_ms or read_ms
+
+            err = max(float(np.max(np.abs(d - h))) for d, h in zip(decoded, histories))
+            speedup = f" ({baseline_ms / read_ms:.1f}x)" if name != "json" else ""
+            print(f"{name:<14} | {size_mb:<10.2f} | {write_s:<9.2f} | {f'{read_ms:.1f}{speedup}':<16} | {err:<11.2e}")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Offline API load test against synthetic large-universe databases.
+
+For each universe size this builds a synthetic SQLite database (see
+synthetic_db.py), starts the API with MARKET_DATA_PROVIDER=fake so nothing
+touches the network, and drives concurrent load at:
+  stocks    GET  /api/stocks
+  forecasts GET  /api/forecasts/{ticker}   (random tickers)
+  refresh   POST /api/refresh              (O(universe) per call; fixed request count)
+Reports p50/p95/p99 latency, throughput and server RSS (peak while loaded).
+
+Usage:
+    python benchmarks/load_test.py [--tickers 1000 5000 10000] [--concurrency 8]
+        [--duration 10] [--refresh-requests 2] [--scenarios stocks forecasts refresh]
+        [--encoding "gzip, br"] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from bench_utils import BACKEND_DIR, backend_env, free_port, percentile, rss_mb
+import synthetic_db
+
+
+class RssSampler(threading.Thread):
+    """Samples a process' RSS in the background and keeps the peak."""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.pid, self.interval = pid, interval
+        self.peak = 0.0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.peak = max(self.peak, rss_mb(self.pid))
+            time.sleep(self.interval)
+
+    def stop(self) -> float:
+        self._done.set()
+        self.join()
+        return self.peak
+
+
+def start_server(db_path: str):
+    port = free_port()
+    env = backend_env(DATABASE_URL=f"sqlite:///{db_path}", MARKET_DATA_PROVIDER="fake")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base}/api/needs-refresh", timeout=2).status_code == 200:
+                return proc, base
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    proc.kill()
+    raise TimeoutError("API did not start")
+
+
+async def drive(base: str, make_request, concurrency: int, duration: float = None, total: int = None, encoding: str = ""):
+    """Runs `concurrency` workers until `duration` seconds elapse or `total` requests complete."""
+    latencies, errors = [], 0
+    issued = 0
+    end = time.perf_counter() + duration if duration else None
+    headers = {"Accept-Encoding": encoding or "identity"}
+    timeout = httpx.Timeout(600.0)
+
+    async with httpx.AsyncClient(base_url=base, headers=headers, timeout=timeout,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker():
+            nonlocal issued, errors
+            while True:
+                if end is not None and time.perf_counter() >= end:
+                    return
+                if total is not None:
+                    if issued >= total:
+                        return
+                    issued += 1
+                t0 = time.perf_counter()
+                try:
+                    res = await make_request(client)
+                    await res.aread()
+                    if res.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def scenario_request(name: str, tickers):
+    if name == "stocks":
+        return lambda c: c.get("/api/stocks")
+    if name == "forecasts":
+        return lambda c: c.get(f"/api/forecasts/{random.choice(tickers)}")
+    if name == "refresh":
+        return lambda c: c.post("/api/refresh")
+    raise ValueError(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--days", type=int, default=1260)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per read scenario")
+    parser.add_argument("--refresh-requests", type=int, default=2)
+    parser.add_argument("--refresh-concurrency", type=int, default=1)
+    parser.add_argument("--scenarios", nargs="+", default=["stocks", "forecasts", "refresh"],
+                        choices=["stocks", "forecasts", "refresh"])
+    parser.add_argument("--encoding", default="gzip, br", help='Accept-Encoding to send ("" for identity)')
+    parser.add_argument("--json", dest="json_out", default=None, help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    header = f"{'Tickers':<8} | {'Scenario':<9} | {'reqs':<5} | {'err':<4} | {'req/s':<8} | {'p50 ms':<8} | {'p95 ms':<8} | {'p99 ms':<8} | {'RSS MB':<7} | {'peak MB':<7}"
+    print(header)
+    print("-" * len(header))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.tickers:
+            db_path = synthetic_db.build(os.path.join(tmp, f"synthetic_{n}.db"), n, args.days)
+            tickers = [synthetic_db.synthetic_ticker(i) for i in range(n)]
+            proc, base = start_server(db_path)
+            try:
+                for name in args.scenarios:
+                    sampler = RssSampler(proc.pid)
+                    sampler.start()
+                    if name == "refresh":
+                        stats = asyncio.run(drive(base, scenario_request(name, tickers), args.refresh_concurrency,
+                                                  total=args.refresh_requests, encoding=args.encoding))
+                    else:
+                        stats = asyncio.run(drive(base, scenario_request(name, tickers), args.concurrency,
+                                                  duration=args.duration, encoding=args.encoding))
+                    stats.update(tickers=n, scenario=name, peak_rss_mb=sampler.stop(), rss_mb=rss_mb(proc.pid))
+                    results.append(stats)
+                    print(f"{n:<8} | {name:<9} | {stats['requests']:<5} | {stats['errors']:<4} | {stats['rps']:<8.2f} | "
+                          f"{stats['p50_ms']:<8.1f} | {stats['p95_ms']:<8.1f} | {stats['p99_ms']:<8.1f} | "
+                          f"{stats['rss_mb']:<7.0f} | {stats['peak_rss_mb']:<7.0f}")
+            finally:
+                proc.terminate()
+                proc.wait()
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
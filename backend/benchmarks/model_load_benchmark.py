@@ -0,0 +1,80 @@
+"""
+Cold-load benchmark for the foundation models.
+
+Each measurement runs in a fresh interpreter so nothing is shared between runs:
+  - hf:    from_pretrained from hf_cache (the original path)
+  - cache: mmap load from model_cache (run `python model_cache.py prepare` first)
+
+The cache runs are executed with HF_HUB_OFFLINE/TRANSFORMERS_OFFLINE set, so a
+pass also proves the cached path works without network access.
+
+Usage:
+    python benchmarks/model_load_benchmark.py [--models timesfm chronos] [--runs 3]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from bench_utils import BACKEND_DIR, backend_env
+
+PROBE = """
+import json, time
+from bench_utils import rss_mb, peak_rss_mb
+import forecasting  # sets HF_HOME to the shared hf_cache
+import model_cache
+base = rss_mb()
+t0 = time.perf_counter()
+if {mode!r} == "cache":
+    model = model_cache.load_timesfm("cpu") if {model!r} == "timesfm" else model_cache.load_chronos()
+elif {model!r} == "timesfm":
+    import timesfm
+    model = timesfm.TimesFM_2p5_200M_torch.from_pretrained(model_cache.TIMESFM_REPO, device="cpu")
+else:
+    import torch
+    from chronos import ChronosPipeline
+    model = ChronosPipeline.from_pretrained(model_cache.CHRONOS_REPO, device_map="cpu", dtype=torch.float32)
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "rss_delta_mb": rss_mb() - base, "peak_rss_mb": peak_rss_mb()}}))
+"""
+
+
+def run_probe(model: str, mode: str) -> dict:
+    env = backend_env(PYTHONPATH=f"{BACKEND_DIR}/benchmarks:{BACKEND_DIR}")
+    if mode == "cache":
+        env.update(HF_HUB_OFFLINE="1", TRANSFORMERS_OFFLINE="1")
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(model=model, mode=mode)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"{model}/{mode} probe failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=["timesfm", "chronos"], choices=["timesfm", "chronos"])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    import model_cache
+    missing = [m for m in args.models if not model_cache.is_prepared(m)]
+    if missing:
+        print(f"Local cache missing for {missing}; run `python model_cache.py prepare` first.")
+        sys.exit(1)
+
+    print(f"{'Model':<8} | {'Mode':<6} | {'load (s)':<9} | {'RSS +MB':<9} | {'peak MB':<9}")
+    print("-" * 54)
+    for model in args.models:
+        for mode in ("hf", "cache"):
+            runs = [run_probe(model, mode) for _ in range(args.runs)]
+            load = statistics.median(r["seconds"] for r in runs)
+            rss = statistics.median(r["rss_delta_mb"] for r in runs)
+            peak = statistics.median(r["peak_rss_mb"] for r in runs)
+            print(f"{model:<8} | {mode:<6} | {load:<9.2f} | {rss:<9.0f} | {peak:<9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+/api/stocks serialization benchmark.
+
+Compares, at several universe sizes:
+  - legacy:   ORM objects -> jsonable_encoder -> json.dumps (the old endpoint)
+  - pydantic: TypeAdapter(List[StockOut]) validate + dump_json (response_model path)
+  - fast:     stock_row() dicts -> FastJSONResponse (orjson, ndarray history)
+and the bytes on the wire for the fast payload raw, gzip and brotli encoded.
+
+Usage:
+    python benchmarks/serialization_benchmark.py [--sizes 50 500 5000] [--days 1260]
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import List
+
+import numpy as np
+
+from bench_utils import BACKEND_DIR  # noqa: F401  (puts backend on sys.path)
+import history_codec
+import responses
+from fastapi.encoders import jsonable_encoder
+from models import Stock
+from pydantic import TypeAdapter
+from schemas import StockOut, stock_row
+
+
+def synthetic_stocks(n: int, days: int, as_array: bool, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    stocks = []
+    for i in range(n):
+        closes = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, days)))
+        # Same values the DB would hand back: a decoded float32 blob
+        history = history_codec.decode(history_codec.encode(closes))
+        stocks.append(Stock(
+            id=f"syn-{i}", name=f"Synthetic {i}", ticker=f"S{i:05d}", stack="Hardware",
+            price=float(history[-1]), change1M=1.0, change6M=2.0, change1Y=3.0, change3Y=4.0,
+            projectedGrowth=0.5, projectedGrowth1M=0.5, projectedGrowth6M=1.5, projectedGrowth1Y=2.5,
+            riskScore="Med", volatility="Medium",
+            history=history if as_array else history.tolist(),
+            forecasts={"timesfm": {"1d": 0.1, "1w": 0.5, "1m": 1.0, "6m": 3.0, "1y": 6.0},
+                       "chronos": {"1d": 0.2, "1w": 0.4, "1m": 0.9, "6m": 2.5, "1y": 5.0}},
+            last_updated=datetime.utcnow(),
+        ))
+    return stocks
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def legacy(stocks) -> bytes:
+    content = jsonable_encoder(stocks)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def via_pydantic(stocks) -> bytes:
+    adapter = TypeAdapter(List[StockOut])
+    return adapter.dump_json(adapter.validate_python(stocks, from_attributes=True))
+
+
+def fast(stocks) -> bytes:
+    return responses.FastJSONResponse([stock_row(s) for s in stocks]).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--days", type=int, default=1260)
+    parser.add_argument("--legacy-max", type=int, default=5000, help="Skip the slow legacy path above this size")
+    args = parser.parse_args()
+
+    print(f"{'Tickers':<8} | {'Path':<9} | {'serialize (ms)':<14} | {'raw MB':<7} | {'gzip MB':<8} | {'br MB':<7} | {'gzip/br (ms)':<12}")
+    print("-" * 84)
+    for n in args.sizes:
+        as_list = synthetic_stocks(n, args.days, as_array=False)
+        as_array = synthetic_stocks(n, args.days, as_array=True)
+
+        paths = [("pydantic", lambda: via_pydantic(as_list)), ("fast", lambda: fast(as_array))]
+        if n <= args.legacy_max:
+            paths.insert(0, ("legacy", lambda: legacy(as_list)))
+
+        for name, fn in paths:
+            body, ms = timed(fn)
+            wire = ""
+            if name == "fast":
+                gz, gz_ms = timed(lambda: responses.compress(body, "gzip"))
+                if responses.brotli:
+                    br, br_ms = timed(lambda: responses.compress(body, "br"))
+                    br_mb, br_t = f"{len(br) / 1e6:.2f}", f"{br_ms:.0f}"
+                else:
+                    br_mb, br_t = "n/a", "-"
+                wire = f"{len(gz) / 1e6:<8.2f} | {br_mb:<7} | {gz_ms:.0f}/{br_t}"
+            else:
+                wire = f"{'':<8} | {'':<7} |"
+            print(f"{n:<8} | {name:<9} | {ms:<14.1f} | {len(body) / 1e6:<7.2f} | {wire}")
+
+
+if __name__ == "__main__":
+    main()
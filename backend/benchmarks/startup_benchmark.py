@@ -0,0 +1,102 @@
+"""
+Startup-time benchmark for the API.
+
+Measures, in fresh processes:
+  1. `import main` wall time, and that no heavy ML modules were pulled in.
+  2. Time from process spawn until GET /api/stocks answers 200.
+
+Runs against a throwaway SQLite database so the real stocks.db is untouched.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 5] [--budget 1.0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from bench_utils import BACKEND_DIR, backend_env, free_port
+
+# Modules that must stay out of the import path of the API
+HEAVY_MODULES = ["torch", "timesfm", "chronos", "transformers", "yfinance", "numpy", "pandas"]
+
+IMPORT_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import main
+elapsed = time.perf_counter() - t0
+print(json.dumps({"seconds": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def _env(db_path: str) -> dict:
+    return backend_env(DATABASE_URL=f"sqlite:///{db_path}")
+
+
+def measure_import(db_path: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        cwd=BACKEND_DIR, env=_env(db_path), capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure_first_response(db_path: str, timeout: float = 30.0) -> float:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/api/stocks"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_env(db_path), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as res:
+                    if res.status == 200:
+                        return time.perf_counter() - t0
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/api/stocks did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="Max median seconds to first /api/stocks response")
+    args = parser.parse_args()
+
+    import_times, serve_times = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.runs):
+            db_path = os.path.join(tmp, f"startup_{i}.db")
+            probe = measure_import(db_path)
+            if probe["heavy"]:
+                print(f"FAIL: importing main pulled in {probe['heavy']}")
+                sys.exit(1)
+            import_times.append(probe["seconds"])
+            serve_times.append(measure_first_response(db_path))
+
+    import_med = statistics.median(import_times)
+    serve_med = statistics.median(serve_times)
+    print(f"{'Metric':<32} | {'median (s)':<10} | {'max (s)':<10}")
+    print("-" * 58)
+    print(f"{'import main':<32} | {import_med:<10.3f} | {max(import_times):<10.3f}")
+    print(f"{'spawn -> /api/stocks 200':<32} | {serve_med:<10.3f} | {max(serve_times):<10.3f}")
+
+    if serve_med > args.budget:
+        print(f"FAIL: median startup {serve_med:.3f}s exceeds budget {args.budget:.3f}s")
+        sys.exit(1)
+    print(f"OK: within {args.budget:.3f}s budget")
+
+
+if __name__ == "__main__":
+    main()
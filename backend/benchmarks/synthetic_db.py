@@ -0,0 +1,97 @@
+"""
+Builds a synthetic large-universe SQLite database for load and scaling tests.
+
+Every row looks like one written by a full refresh: a 5-year packed history,
+the derived change/volatility fields and both models' forecasts. Prices come
+from market_data.fake_closes, so a server started with MARKET_DATA_PROVIDER=fake
+against this database refreshes to the same values.
+
+Usage:
+    python benchmarks/synthetic_db.py --tickers 5000 [--days 1260] [--out synthetic_5000.db]
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from bench_utils import BACKEND_DIR  # noqa: F401  (puts backend on sys.path)
+
+STACKS = ["Hardware", "Cloud & Infra", "Data & MLOps", "Models", "Applications"]
+RISKS = ["Low", "Med", "High"]
+HORIZONS = ["1d", "1w", "1m", "6m", "1y"]
+
+
+def synthetic_ticker(i: int) -> str:
+    return f"S{i:05d}"
+
+
+def _rows(n: int, days: int, seed: int):
+    import market_data
+
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+    for i in range(n):
+        ticker = synthetic_ticker(i)
+        closes = market_data.fake_closes(ticker, days)
+        price = float(closes[-1])
+
+        def change(k):
+            return float((price - closes[-k]) / closes[-k] * 100) if len(closes) >= k else 0.0
+
+        vol = float(np.std(np.diff(closes[-253:]) / closes[-253:-1]) * np.sqrt(252) * 100)
+        forecasts = {m: {h: float(rng.normal(0, 5)) for h in HORIZONS} for m in ("timesfm", "chronos")}
+        yield {
+            "id": f"syn-{i}", "name": f"Synthetic {i}", "ticker": ticker,
+            "stack": STACKS[i % len(STACKS)], "riskScore": RISKS[i % len(RISKS)],
+            "price": price, "change1M": change(21), "change6M": change(126),
+            "change1Y": change(252), "change3Y": change(756),
+            "projectedGrowth": forecasts["timesfm"]["1m"], "projectedGrowth1M": forecasts["timesfm"]["1m"],
+            "projectedGrowth6M": forecasts["timesfm"]["6m"], "projectedGrowth1Y": forecasts["timesfm"]["1y"],
+            "volatility": "High" if vol > 40 else "Medium" if vol > 20 else "Low",
+            "history": closes, "forecasts": forecasts, "last_updated": now,
+        }
+
+
+def build(path: str, n: int, days: int = 1260, seed: int = 0, batch: int = 1000) -> str:
+    """Creates (or replaces) a database at `path` with `n` synthetic stocks."""
+    from sqlalchemy import create_engine, insert
+    from database import Base
+    from models import Stock
+
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    pending = []
+    with engine.begin() as conn:
+        for row in _rows(n, days, seed):
+            pending.append(row)
+            if len(pending) >= batch:
+                conn.execute(insert(Stock), pending)
+                pending = []
+        if pending:
+            conn.execute(insert(Stock), pending)
+    engine.dispose()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=1260)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out or f"synthetic_{args.tickers}.db")
+    t0 = time.perf_counter()
+    build(out, args.tickers, args.days, args.seed)
+    size_mb = os.path.getsize(out) / 1e6
+    print(f"Built {out}: {args.tickers} tickers x {args.days} days, {size_mb:.1f} MB in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
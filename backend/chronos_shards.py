@@ -0,0 +1,186 @@
+"""
+Data-parallel Chronos inference across CPU worker processes.
+
+Chronos runs on CPU (see forecasting.py), where one process does not scale
+across many cores. With CHRONOS_WORKERS > 1 (or "auto") the tickers are split
+into K shards, each handled by a spawned worker process holding its own copy
+of the model and pinned to cores/K intra-op threads:
+
+  - K is capped by the cores and by the memory budget: free memory minus
+    INFERENCE_MEMORY_HEADROOM_MB must fit K x CHRONOS_WORKER_MEMORY_MB
+    (weights mapped from model_cache are shared page cache, so the estimate is
+    conservative for fp32)
+  - each worker sizes its batches from 1/K of the free memory (batch_sizing.py)
+  - results stream back to the parent as they are produced, so on_result
+    (persistence) still happens progressively, in the calling thread
+
+A worker that dies (e.g. killed for memory) only loses its unfinished
+tickers; they are reported as failed and are picked up by the next run.
+
+Measure throughput against K with `python benchmarks/chronos_scaling_benchmark.py`.
+"""
+import contextlib
+import importlib.util
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+import batch_sizing
+
+logger = logging.getLogger(__name__)
+
+WORKERS = os.environ.get("CHRONOS_WORKERS", "1")  # a number, or "auto"
+WORKER_MEMORY_BYTES = int(float(os.environ.get("CHRONOS_WORKER_MEMORY_MB", "3500")) * 2**20)
+
+# Seconds between liveness checks of the workers while waiting for results
+_POLL = 5.0
+
+_start_lock = threading.Lock()
+
+
+def cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def plan(n_series: int, requested: str = None) -> tuple:
+    """(workers, threads per worker) for `n_series` series under the current memory budget."""
+    requested = requested or WORKERS
+    cores = cpu_count()
+    try:
+        wanted = cores if requested == "auto" else int(requested)
+    except ValueError:
+        logger.warning(f"Invalid CHRONOS_WORKERS '{requested}', running in-process")
+        wanted = 1
+    if wanted <= 1 or n_series <= 1:
+        return 1, cores
+
+    budget = batch_sizing.available_bytes("cpu") - batch_sizing.HEADROOM_BYTES
+    fits = int(max(budget, 0) // WORKER_MEMORY_BYTES)
+    workers = max(1, min(wanted, cores, fits, n_series))
+    if workers < wanted:
+        logger.info(f"Chronos: {wanted} workers requested, {workers} fit ({cores} cores, {budget / 2**20:.0f} MB free)")
+    return workers, max(1, cores // workers)
+
+
+def _worker(index: int, shard: dict, threads: int, share: float, results):
+    """Worker process entry point: Chronos over one shard, results sent to `results`."""
+    # Before torch is imported, so its thread pools are created at this size
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s chronos-worker-{index} %(levelname)s %(message)s")
+
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    batch_sizing.MEMORY_SHARE = share
+
+    from forecasting import engine
+
+    stats = {"series": len(shard), "threads": threads}
+    start = time.perf_counter()
+    try:
+        engine._run_chronos_local(shard, lambda ticker, _, values: results.put(("result", ticker, values)), stats)
+    finally:
+        stats["seconds"] = round(time.perf_counter() - start, 2)
+        results.put(("done", index, stats))
+
+
+@contextlib.contextmanager
+def _main_pinned():
+    """
+    Spawned children re-import the parent's __main__ before unpickling their
+    target. Started as `python main.py`, that would run the API module (app
+    and database setup) in every worker; while workers start, __main__ points
+    at this module instead.
+    """
+    main = sys.modules["__main__"]
+    with _start_lock:
+        saved = main.__dict__.get("__spec__")
+        main.__spec__ = importlib.util.find_spec(__name__)
+        try:
+            yield
+        finally:
+            main.__spec__ = saved
+
+
+def run(stock_histories: dict, workers: int, threads: int, on_result=None, stats: dict = None) -> dict:
+    """
+    Chronos over `stock_histories` split across `workers` processes.
+    Returns { ticker: { horizon: growth % } } like the in-process path.
+    """
+    tickers = sorted(stock_histories)
+    shards = [{t: stock_histories[t] for t in tickers[i::workers]} for i in range(workers)]
+    ctx = multiprocessing.get_context("spawn")  # fork is unsafe once torch has threads
+    results_queue = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(i, shard, threads, 1.0 / workers, results_queue),
+                    name=f"chronos-worker-{i}", daemon=True)
+        for i, shard in enumerate(shards)
+    ]
+    logger.info(f"Chronos: {len(tickers)} stocks across {workers} workers x {threads} threads")
+    start = time.perf_counter()
+    with _main_pinned():
+        for p in procs:
+            p.start()
+
+    results, reports = {}, {}
+
+    def handle(msg):
+        if msg[0] == "result":
+            _, ticker, values = msg
+            results[ticker] = values
+            if on_result:
+                try:
+                    on_result(ticker, "chronos", values)
+                except Exception as e:
+                    logger.error(f"  Chronos result handling failed for {ticker}: {e}")
+        else:
+            reports[msg[1]] = msg[2]
+
+    try:
+        while len(reports) < workers:
+            try:
+                handle(results_queue.get(timeout=_POLL))
+                continue
+            except queue.Empty:
+                pass
+            dead = [i for i, p in enumerate(procs) if i not in reports and p.exitcode is not None]
+            if not dead:
+                continue
+            # Anything a worker sent before exiting is already in the queue
+            while True:
+                try:
+                    handle(results_queue.get(timeout=1))
+                except queue.Empty:
+                    break
+            for i in dead:
+                if i not in reports:
+                    lost = [t for t in shards[i] if t not in results]
+                    logger.error(f"Chronos worker {i} exited ({procs[i].exitcode}) with {len(lost)} stocks unfinished")
+                    reports[i] = {"series": len(shards[i]), "exitcode": procs[i].exitcode, "failed": len(lost)}
+    finally:
+        for p in procs:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+
+    if stats is not None:
+        shard_reports = [reports[i] for i in range(workers)]
+        stats.update(
+            workers=workers,
+            threads_per_worker=threads,
+            seconds=round(time.perf_counter() - start, 2),
+            failed=sum(r.get("failed", 0) for r in shard_reports),
+            shards=shard_reports,
+        )
+        modes = {r["mode"] for r in shard_reports if "mode" in r}
+        if len(modes) == 1:
+            stats["mode"] = modes.pop()
+    return results
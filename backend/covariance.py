@@ -0,0 +1,201 @@
+"""
+Cross-ticker covariance / correlation of daily returns, maintained online.
+
+Two estimators are available:
+  rolling - last COVARIANCE_WINDOW daily returns, equally weighted
+  ewm     - exponentially weighted, half-life COVARIANCE_HALFLIFE days
+
+Each estimator keeps pairwise moment sums over the tracked universe
+(Σw·x·xᵀ, Σw·x·mᵀ, Σw·x²·mᵀ, Σw·m·mᵀ, Σw²·m·mᵀ and the raw pair counts,
+where m masks days a ticker has no return). A new daily bar is folded in with
+rank-1 updates; the rolling estimator also subtracts the bar that leaves the
+window. A revised last bar swaps out the most recent return. Statistics are pairwise-complete, i.e. they match pandas' DataFrame.cov()
+/ .corr() (rolling) and .ewm(halflife=...).cov() / .corr() (ewm).
+
+Keeping in step with the stored histories (incremental when every ticker
+gained the same bars, otherwise a full rebuild, which is a few matrix
+products) is handled by universe.UniverseState.
+
+State is O(N²) per estimator and lives in memory; the first request after
+startup builds it.
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+
+from universe import UniverseState
+
+logger = logging.getLogger(__name__)
+
+WINDOW = int(os.environ.get("COVARIANCE_WINDOW", "252"))
+HALFLIFE = float(os.environ.get("COVARIANCE_HALFLIFE", "63"))
+# Pairs with fewer overlapping returns are reported as null
+MIN_PERIODS = int(os.environ.get("COVARIANCE_MIN_PERIODS", "20"))
+
+METHODS = ("rolling", "ewm")
+
+def returns_matrix(closes: np.ndarray) -> np.ndarray:
+    """(T - 1, N) simple daily returns of a universe.close_matrix(); NaN where undefined."""
+    return closes[1:] / closes[:-1] - 1
+
+
+class _Moments:
+    """Weighted pairwise moment sums for one estimator."""
+
+    def __init__(self, n: int, decay: float):
+        self.decay = decay
+        self.xx = np.zeros((n, n))  # Σ w x_i x_j
+        self.xm = np.zeros((n, n))  # Σ w x_i m_j
+        self.x2m = np.zeros((n, n))  # Σ w x_i² m_j
+        self.w = np.zeros((n, n))  # Σ w m_i m_j
+        self.w2 = np.zeros((n, n))  # Σ w² m_i m_j
+        self.count = np.zeros((n, n))  # Σ m_i m_j
+
+    @classmethod
+    def from_returns(cls, R: np.ndarray, decay: float) -> "_Moments":
+        moments = cls(R.shape[1], decay)
+        mask = np.isfinite(R)
+        X = np.where(mask, R, 0.0)
+        M = mask.astype(np.float64)
+        # Weight of each row at the time of the last one
+        w = decay ** np.arange(len(R) - 1, -1, -1, dtype=np.float64)[:, None]
+        moments.xx = (X * w).T @ X
+        moments.xm = (X * w).T @ M
+        moments.x2m = (X * X * w).T @ M
+        moments.w = (M * w).T @ M
+        moments.w2 = (M * w * w).T @ M
+        moments.count = M.T @ M
+        return moments
+
+    def push(self, r: np.ndarray):
+        """Decays the sums by one day and adds a return vector with weight 1."""
+        m = np.isfinite(r).astype(np.float64)
+        x = np.where(m > 0, r, 0.0)
+        if self.decay != 1.0:
+            for a in (self.xx, self.xm, self.x2m, self.w):
+                a *= self.decay
+            self.w2 *= self.decay * self.decay
+        self._add(x, m, 1.0)
+
+    def pop(self, r: np.ndarray):
+        """Removes a return vector previously pushed with weight 1 (rolling window)."""
+        m = np.isfinite(r).astype(np.float64)
+        self._add(np.where(m > 0, r, 0.0), m, -1.0)
+
+    def replace(self, old: np.ndarray, new: np.ndarray):
+        """Swaps the most recent return vector (weight 1) for a revised one."""
+        mo, mn = np.isfinite(old).astype(np.float64), np.isfinite(new).astype(np.float64)
+        xo, xn = np.where(mo > 0, old, 0.0), np.where(mn > 0, new, 0.0)
+        # Differences, so pairs of unrevised tickers are left exactly as they were
+        self.xx += np.outer(xn, xn) - np.outer(xo, xo)
+        self.xm += np.outer(xn, mn) - np.outer(xo, mo)
+        self.x2m += np.outer(xn * xn, mn) - np.outer(xo * xo, mo)
+        mm = np.outer(mn, mn) - np.outer(mo, mo)
+        self.w += mm
+        self.w2 += mm
+        self.count += mm
+
+    def _add(self, x, m, sign):
+        self.xx += sign * np.outer(x, x)
+        self.xm += sign * np.outer(x, m)
+        self.x2m += sign * np.outer(x * x, m)
+        self.w += sign * np.outer(m, m)
+        self.w2 += sign * np.outer(m, m)
+        self.count += sign * np.outer(m, m)
+
+    def keep(self, idx):
+        for name in ("xx", "xm", "x2m", "w", "w2", "count"):
+            setattr(self, name, getattr(self, name)[np.ix_(idx, idx)])
+
+    def stats(self, idx, kind: str) -> np.ndarray:
+        """Covariance or correlation matrix over the tickers at positions `idx`."""
+        sub = np.ix_(idx, idx)
+        w, w2 = self.w[sub], self.w2[sub]
+        xm = self.xm[sub]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_i = xm / w  # mean of i over days where j also trades
+            mean_j = xm.T / w
+            # Bias correction for weighted samples; (n-1) for equal weights
+            unbias = w * w / (w * w - w2)
+            out = (self.xx[sub] / w - mean_i * mean_j) * unbias
+            if kind == "correlation":
+                var_i = (self.x2m[sub] / w - mean_i * mean_i) * unbias
+                out = np.clip(out / np.sqrt(var_i * var_i.T), -1.0, 1.0)
+        out[self.count[sub] < max(MIN_PERIODS, 2)] = np.nan
+        return out
+
+
+class CovarianceEngine(UniverseState):
+    """Online return covariance for one method ("rolling" or "ewm")."""
+
+    def __init__(self, method: str):
+        if method not in METHODS:
+            raise ValueError(f"Unknown covariance method '{method}'")
+        super().__init__()
+        self.method = method
+        self.name = f"Covariance ({method})"
+        self.decay = 1.0 if method == "rolling" else 0.5 ** (1.0 / HALFLIFE)
+        self._moments = None
+        self._window = None  # (≤WINDOW, N) returns currently inside the rolling window
+
+    def _build(self, closes):
+        R = returns_matrix(closes)
+        if self.method == "rolling":
+            R = R[-WINDOW:]
+            self._window = R.copy()
+        self._moments = _Moments.from_returns(R, self.decay)
+
+    def _drop(self, keep):
+        self._moments.keep(keep)
+        if self._window is not None:
+            self._window = self._window[:, keep]
+
+    def _advance(self, closes):
+        R = returns_matrix(closes)
+        for r in R:
+            self._moments.push(r)
+        if self._window is not None:
+            self._window = np.vstack([self._window, R])
+            for r in self._window[:-WINDOW]:
+                self._moments.pop(r)
+            self._window = self._window[-WINDOW:]
+
+    def _revise(self, closes, previous):
+        R = returns_matrix(closes)
+        self._moments.replace(previous / closes[0] - 1, R[0])
+        if self._window is not None:
+            self._window[-1] = R[0]
+        self._advance(closes[1:])
+
+    def matrix(self, tickers=None, kind: str = "correlation"):
+        """
+        (tickers, matrix) for `tickers` (all tracked tickers if None).
+        Raises KeyError listing tickers that are not tracked.
+        """
+        with self._lock:
+            tickers, idx = self._positions(tickers)
+            return tickers, self._moments.stats(idx, kind)
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(method: str) -> CovarianceEngine:
+    """The process-wide engine for `method`, created on first use."""
+    with _engines_lock:
+        if method not in _engines:
+            _engines[method] = CovarianceEngine(method)
+        return _engines[method]
+
+
+def update(db):
+    """Syncs every engine that has already been built (after a data refresh)."""
+    for engine in list(_engines.values()):
+        if engine.built:
+            try:
+                engine.sync(db)
+            except Exception as e:
+                logger.error(f"Covariance ({engine.method}) update failed: {e}")
@@ -0,0 +1,90 @@
+"""
+Data version for delta syncs of /api/stocks.
+
+Every transaction that inserts, changes or deletes Stock rows takes the next
+version number: the rows it writes are stamped with it (Stock.version) and a
+deleted stock leaves a StockDeletion tombstone. A refresh that only moves
+last_updated is not a change. A client that has seen
+version v asks for rows and tombstones above v (GET /api/stocks?since=v).
+
+Versions are handed out at flush time but become visible at commit, and
+transactions may commit out of order. current() therefore reports one less
+than the oldest version not yet committed, so a client never moves past a
+change that is still in flight. Versions are allocated in this process, which
+assumes a single API process per database (as with SQLite).
+"""
+import threading
+
+from sqlalchemy import event, func, inspect, select
+
+from database import SessionLocal
+from models import Stock, StockDeletion
+
+_lock = threading.Lock()
+_last = None  # highest version handed out; loaded from the database on first use
+_open = set()  # versions of transactions that have not committed or rolled back yet
+
+# Columns a refresh rewrites even when the data is the same; on their own they
+# do not make a new version
+_UNVERSIONED = {"last_updated", "version"}
+
+
+def _ensure_loaded(connection):
+    global _last
+    if _last is None:
+        _last = max(
+            connection.execute(select(func.max(Stock.version))).scalar() or 0,
+            connection.execute(select(func.max(StockDeletion.version))).scalar() or 0,
+        )
+
+
+def current(db) -> int:
+    """The version up to which every change is committed and visible."""
+    connection = db.connection()
+    with _lock:
+        _ensure_loaded(connection)
+        return min(_open) - 1 if _open else _last
+
+
+def _version_for(session) -> int:
+    global _last
+    version = session.info.get("data_version")
+    if version is None:
+        connection = session.connection()
+        with _lock:
+            _ensure_loaded(connection)
+            _last += 1
+            version = session.info["data_version"] = _last
+            _open.add(version)
+    return version
+
+
+def _modified(stock) -> bool:
+    return any(
+        attr.history.has_changes()
+        for attr in inspect(stock).attrs
+        if attr.key not in _UNVERSIONED
+    )
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _stamp(session, flush_context, instances):
+    changed = [o for o in session.new if isinstance(o, Stock)]
+    changed += [o for o in session.dirty if isinstance(o, Stock) and _modified(o)]
+    deleted = [o for o in session.deleted if isinstance(o, Stock)]
+    if not (changed or deleted):
+        return
+    version = _version_for(session)
+    for stock in changed:
+        stock.version = version
+    for stock in deleted:
+        session.add(StockDeletion(stock_id=stock.id, ticker=stock.ticker, version=version))
+
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _release(session, transaction):
+    if transaction.parent is None:
+        version = session.info.pop("data_version", None)
+        if version is not None:
+            with _lock:
+                _open.discard(version)
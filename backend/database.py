@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./stocks.db"
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./stocks.db")
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
@@ -17,3 +18,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def add_missing_columns(bind, metadata):
+    """
+    create_all() never alters existing tables: adds columns that models gained
+    after a table was created, with their indexes. New columns must be
+    nullable or have a default.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            added = set()
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = column.type.compile(dialect=bind.dialect)
+                    conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {ddl}')
+                    added.add(column.name)
+            for index in table.indexes:
+                if added & {c.name for c in index.columns}:
+                    index.create(conn, checkfirst=True)
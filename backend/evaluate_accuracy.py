@@ -1,4 +1,3 @@
-import torch
 import numpy as np
 import logging
 import os
@@ -11,33 +10,46 @@ os.makedirs(local_tmp, exist_ok=True)
 os.environ['TMPDIR'] = local_tmp
 os.environ['HF_HOME'] = os.path.join(os.getcwd(), 'hf_cache')
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("evaluate_accuracy")
 
-def generate_synthetic_data(length=1500):
+# 2. Multi-Horizon Setup
+HORIZONS = {
+    "1d": 1,
+    "1w": 5,
+    "3m": 63,
+    "6m": 126,
+    "1y": 252
+}
+
+def generate_synthetic_data(length=1500, seed=None):
     """Generates a predictable pattern: Linear Trend + Seasonality + Noise"""
+    rng = np.random.default_rng(seed)
     t = np.arange(length)
     # y = Start + Trend*t + Seasonality + Noise
-    y = 100 + 0.05 * t + 10 * np.sin(t / 20.0) + np.random.normal(0, 0.5, length)
+    y = 100 + 0.05 * t + 10 * np.sin(t / 20.0) + rng.normal(0, 0.5, length)
     return y
 
-def evaluate():
-    logger.info("Starting Multi-Horizon Foundation Model Evaluation...")
+def evaluate(mode="fp32", device=None, seed=None, models=("chronos", "timesfm")):
+    """
+    Runs the multi-horizon evaluation and returns
+    { model: { horizon: {"MAPE": float, "MAE": float} } }.
+
+    Models are loaded through the forecasting engine with the given precision
+    mode (see precision.py), so this scores exactly what inference would run.
+    Pass a seed for a deterministic series and deterministic Chronos sampling.
+    """
+    import torch
+    import precision
+    from forecasting import engine
+
+    logger.info(f"Starting Multi-Horizon Foundation Model Evaluation (precision={mode})...")
     logger.info(f"Temporary Directory set to: {os.environ['TMPDIR']}")
     
-    # 2. Multi-Horizon Setup
-    horizons = {
-        "1d": 1,
-        "1w": 5,
-        "3m": 63,
-        "6m": 126,
-        "1y": 252
-    }
+    horizons = HORIZONS
     max_h = 252
     
     # Generate Data (Context + Future)
-    full_data = generate_synthetic_data(1500)
+    full_data = generate_synthetic_data(1500, seed=seed)
     train_len = 1000
     
     context = full_data[:train_len]
@@ -45,95 +57,152 @@ def evaluate():
     
     logger.info(f"Data Generated. Context Length: {len(context)}, Evaluation Horizon: {max_h} days")
     
-    device = "mps" if torch.backends.mps.is_available() else "cpu"
+    if device is None:
+        device = "mps" if torch.backends.mps.is_available() else "cpu"
     logger.info(f"Using device: {device}")
 
     metrics = {"chronos": {}, "timesfm": {}}
 
     # --- EVALUATE CHRONOS ---
-    try:
-        logger.info("Evaluating Amazon Chronos (Parallelized Horizon Evaluation)...")
-        from chronos import ChronosPipeline
+    if "chronos" in models:
+        try:
+            logger.info("Evaluating Amazon Chronos (Parallelized Horizon Evaluation)...")
         
-        chronos = ChronosPipeline.from_pretrained(
-            "amazon/chronos-t5-large",
-            device_map=device,
-            dtype=torch.bfloat16
-        )
+            chronos = engine._load_chronos("cpu", mode=mode)
         
-        ctx_tensor = torch.tensor(context[-512:], dtype=torch.float32)
+            ctx_tensor = torch.tensor(context[-512:], dtype=torch.float32)
+            if seed is not None:
+                torch.manual_seed(seed)
         
-        # Optimize: Predict ONCE for the max horizon (252 days)
-        # We can then slice this single long prediction to evaluate shorter horizons
-        forecast = chronos.predict(
-            ctx_tensor.unsqueeze(0),
-            prediction_length=max_h,
-            num_samples=20
-        )
+            # Optimize: Predict ONCE for the max horizon (252 days)
+            # We can then slice this single long prediction to evaluate shorter horizons
+            with precision.inference_context(mode):
+                forecast = chronos.predict(
+                    ctx_tensor.unsqueeze(0),
+                    prediction_length=max_h,
+                    num_samples=20
+                )
         
-        # Median forecast [252]
-        chronos_full_pred = torch.median(forecast[0], dim=0).values.float().cpu().numpy()
+            # Median forecast [252]
+            chronos_full_pred = torch.median(forecast[0], dim=0).values.float().cpu().numpy()
         
-        # Slice and Dice
-        for h_name, h_days in horizons.items():
-            pred_slice = chronos_full_pred[:h_days]
-            truth_slice = ground_truth[:h_days]
+            # Slice and Dice
+            for h_name, h_days in horizons.items():
+                pred_slice = chronos_full_pred[:h_days]
+                truth_slice = ground_truth[:h_days]
             
-            abs_err = np.abs(pred_slice - truth_slice)
-            mape = np.mean(abs_err / truth_slice) * 100
-            mae = np.mean(abs_err)
+                abs_err = np.abs(pred_slice - truth_slice)
+                mape = np.mean(abs_err / truth_slice) * 100
+                mae = np.mean(abs_err)
             
-            metrics["chronos"][h_name] = {"MAPE": mape, "MAE": mae}
+                metrics["chronos"][h_name] = {"MAPE": float(mape), "MAE": float(mae)}
         
-    except Exception as e:
-        logger.error(f"Chronos Evaluation Failed: {e}", exc_info=True)
+            del chronos
+            engine._cleanup_memory()
+        
+        except Exception as e:
+            logger.error(f"Chronos Evaluation Failed: {e}", exc_info=True)
 
 
     # --- EVALUATE TIMESFM ---
-    try:
-        logger.info("Evaluating Google TimesFM (Parallelized Horizon Evaluation)...")
-        import timesfm
+    if "timesfm" in models:
+        try:
+            logger.info("Evaluating Google TimesFM (Parallelized Horizon Evaluation)...")
+            import timesfm
         
-        tfm = timesfm.TimesFM_2p5_200M_torch.from_pretrained(
-            "google/timesfm-2.5-200m-pytorch",
-            device=device
-        )
-        tfm.compile(
-            timesfm.ForecastConfig(
-                max_context=1024,
-                max_horizon=max_h + 10, # Buffer
-                normalize_inputs=True,
-                use_continuous_quantile_head=True,
-                force_flip_invariance=True,
-                infer_is_positive=True,
-                fix_quantile_crossing=True,
+            tfm = engine._load_timesfm(mode=mode, device=device)
+            tfm.compile(
+                timesfm.ForecastConfig(
+                    max_context=1024,
+                    max_horizon=max_h + 10, # Buffer
+                    normalize_inputs=True,
+                    use_continuous_quantile_head=True,
+                    force_flip_invariance=True,
+                    infer_is_positive=True,
+                    fix_quantile_crossing=True,
+                )
             )
-        )
         
-        output = tfm.forecast(
-             inputs=[context],
-             horizon=max_h 
-        )
+            with precision.inference_context(mode):
+                output = tfm.forecast(
+                     inputs=[context],
+                     horizon=max_h 
+                )
         
-        if isinstance(output, tuple): 
-            tfm_full_pred = output[0][0]
-        else:
-            tfm_full_pred = output[0]
+            if isinstance(output, tuple): 
+                tfm_full_pred = output[0][0]
+            else:
+                tfm_full_pred = output[0]
             
-        # Slice and Dice
-        for h_name, h_days in horizons.items():
-            pred_slice = tfm_full_pred[:h_days]
-            truth_slice = ground_truth[:h_days]
+            # Slice and Dice
+            for h_name, h_days in horizons.items():
+                pred_slice = tfm_full_pred[:h_days]
+                truth_slice = ground_truth[:h_days]
             
-            abs_err = np.abs(pred_slice - truth_slice)
-            mape = np.mean(abs_err / truth_slice) * 100
-            mae = np.mean(abs_err)
+                abs_err = np.abs(pred_slice - truth_slice)
+                mape = np.mean(abs_err / truth_slice) * 100
+                mae = np.mean(abs_err)
             
-            metrics["timesfm"][h_name] = {"MAPE": mape, "MAE": mae}
+                metrics["timesfm"][h_name] = {"MAPE": float(mape), "MAE": float(mae)}
+        
+            del tfm
+            engine._cleanup_memory()
+
+        except Exception as e:
+            logger.error(f"TimesFM Evaluation Failed: {e}", exc_info=True)
+
+    return metrics
+
+def evaluate_forecasts(mode="fp32", seed=None, models=("chronos", "timesfm"), series=8):
+    """
+    Scores the forecasts inference actually produces, for the precision gate.
+    Each model runs through the engine's own batched forward passes
+    (_timesfm_forecast / _chronos_forecast), so context and prediction lengths
+    are the production ones, over `series` seeded synthetic histories.
+    Returns the same shape as evaluate(), keyed by the engine's horizons, with
+    the MAPE/MAE of the predicted price at each horizon.
+    """
+    import torch
+    from forecasting import engine
+
+    context_len = 1000
+    histories, futures = [], []
+    for i in range(series):
+        data = generate_synthetic_data(context_len + engine.max_horizon, seed=None if seed is None else seed + i)
+        histories.append(data[:context_len])
+        futures.append(data[context_len:])
+
+    metrics = {}
+    for name in models:
+        metrics[name] = {}
+        try:
+            # Never alongside an inference run's copy of the same model
+            with engine.model_locks[name]:
+                if seed is not None:
+                    torch.manual_seed(seed)
+                if name == "timesfm":
+                    model = engine._load_timesfm(mode=mode, device="cpu")
+                    engine._compile_timesfm(model)
+                    forecasts = engine._timesfm_forecast(model, mode, histories)
+                else:
+                    model = engine._load_chronos("cpu", mode=mode)
+                    forecasts = engine._chronos_forecast(model, mode, histories)
+                del model
+                engine._cleanup_memory()
+        except Exception as e:
+            logger.error(f"{name} evaluation ({mode}) failed: {e}", exc_info=True)
+            continue
 
-    except Exception as e:
-        logger.error(f"TimesFM Evaluation Failed: {e}", exc_info=True)
+        for h_name, h_days in engine.horizons.items():
+            if not all(h_name in f for f in forecasts):
+                continue
+            predicted = np.array([h[-1] * (1 + f[h_name] / 100) for h, f in zip(histories, forecasts)])
+            actual = np.array([future[h_days - 1] for future in futures])
+            abs_err = np.abs(predicted - actual)
+            metrics[name][h_name] = {"MAPE": float(np.mean(abs_err / actual) * 100), "MAE": float(np.mean(abs_err))}
+    return metrics
 
+def log_report(metrics, horizons=HORIZONS):
     # --- REPORT ---
     logger.info("\n" + "="*60)
     logger.info(f"{'MULTI-HORIZON ACCURACY REPORT':^60}")
@@ -158,4 +227,6 @@ def evaluate():
         logger.info("-" * 46)
 
 if __name__ == "__main__":
-    evaluate()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # Usage: python evaluate_accuracy.py [fp32|bf16|int8]
+    log_report(evaluate(mode=sys.argv[1] if len(sys.argv) > 1 else "fp32"))
@@ -1,13 +1,27 @@
-import torch
-import numpy as np
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Callable, Optional, Set, Tuple
 import os
 import gc
+import threading
+import time
+import batch_sizing
+import chronos_shards
+import model_cache
+import precision
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Called with (ticker, model_name, { horizon: growth % }) as each forecast completes
+ResultCallback = Callable[[str, str, Dict[str, float]], None]
+
+# Chronos horizons served by the daily pass, and the weekly-pass step of the others
+# (6m = 126 days approx 25 index, 1y = 252 days approx 50 index)
+_CHRONOS_DAILY = ("1d", "1w", "1m")
+_CHRONOS_WEEKLY_STEP = {"6m": 25, "1y": 50}
+# TimesFM 2.5 decodes in output patches of this many steps
+_TIMESFM_OUTPUT_PATCH = 128
+
 # Fix for HF Cache permissions in restricted environments
 os.environ['HF_HOME'] = os.path.join(os.getcwd(), 'hf_cache')
 # Set local TMPDIR to avoid some MPS Cache Permission Errors (though system warnings may persist)
@@ -20,6 +34,8 @@ def get_device() -> str:
     """
     Auto-detect best available device: CUDA > MPS > CPU
     """
+    import torch
+
     if torch.cuda.is_available():
         return "cuda"
     elif torch.backends.mps.is_available():
@@ -33,11 +49,13 @@ class ForecastingEngine:
     Forecasting engine with sequential model loading to minimize RAM usage.
     Auto-detects best available device (CUDA > MPS > CPU).
     Models are loaded one at a time, used for inference, then unloaded.
+
+    torch and the model libraries are imported lazily on first use so that
+    importing this module (and therefore the API) stays cheap.
     """
     
     def __init__(self):
-        self.device = get_device()
-        logger.info(f"Initializing Forecasting Engine on {self.device}...")
+        self._device = None
         
         # Horizons in trading days: 1d, 1w (5d), 1m (21d), 6m (126d), 1y (252d)
         self.horizons = {
@@ -48,76 +66,223 @@ class ForecastingEngine:
             "1y": 252
         }
         self.max_horizon = 252
+        # At most one inference per model at a time, whichever run asks for it
+        self.model_locks = {"timesfm": threading.Lock(), "chronos": threading.Lock()}
+        # model -> drops a warm on-demand copy (online_forecast.py); called holding the lock
+        self.unload_hooks = {}
+
+    @property
+    def device(self) -> str:
+        """Resolved on first access, which is the first point torch is needed."""
+        if self._device is None:
+            self._device = get_device()
+            logger.info(f"Initializing Forecasting Engine on {self._device}...")
+        return self._device
 
     def _cleanup_memory(self):
         """Force memory cleanup after unloading a model."""
         gc.collect()
-        if self.device == "mps":
+        if self._device == "mps":
+            import torch
             torch.mps.empty_cache()
 
-    def _run_timesfm_inference(self, stock_histories: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    def _load_timesfm(self, mode: str = "fp32", device: str = None):
         """
-        Load TimesFM, run inference on all stocks, unload model.
-        Returns: { ticker: { "1d": val, "1w": val, ... } }
+        Maps TimesFM from the local weight cache, falling back to the HF checkpoint,
+        then applies the precision mode (see precision.py).
         """
-        results = {}
-        
-        try:
-            logger.info(f"Loading Google TimesFM-2.5-200m on {self.device}...")
+        device = device or self.device
+        model = None
+        if model_cache.is_prepared("timesfm"):
+            try:
+                model = model_cache.load_timesfm(device)
+            except Exception as e:
+                logger.warning(f"TimesFM cache load failed, falling back to from_pretrained: {e}")
+
+        if model is None:
             import timesfm
-            
             model = timesfm.TimesFM_2p5_200M_torch.from_pretrained(
-                "google/timesfm-2.5-200m-pytorch",
-                device=self.device
+                model_cache.TIMESFM_REPO,
+                device=device
             )
-            
-            model.compile(
-                timesfm.ForecastConfig(
-                    max_context=1024,
-                    max_horizon=self.max_horizon,
-                    normalize_inputs=True,
-                    use_continuous_quantile_head=True,
-                    force_flip_invariance=True,
-                    infer_is_positive=True,
-                    fix_quantile_crossing=True,
-                )
+
+        model.model = precision.quantize(model.model, mode)
+        return model
+
+    def _load_chronos(self, inference_device: str, mode: str = "fp32"):
+        """
+        Maps Chronos from the local weight cache, falling back to the HF checkpoint,
+        then applies the precision mode (see precision.py).
+        """
+        model = None
+        if model_cache.is_prepared("chronos"):
+            try:
+                model = model_cache.load_chronos()
+            except Exception as e:
+                logger.warning(f"Chronos cache load failed, falling back to from_pretrained: {e}")
+
+        if model is None:
+            import torch
+            from chronos import ChronosPipeline
+            model = ChronosPipeline.from_pretrained(
+                model_cache.CHRONOS_REPO,
+                device_map=inference_device,
+                dtype=torch.float32
+            )
+
+        model.model.model = precision.quantize(model.model.model, mode)
+        return model
+
+    def _compile_timesfm(self, model, batch_size: int = 1, horizon: Optional[int] = None):
+        """
+        Compiles TimesFM for batches of `batch_size` series decoding `horizon`
+        steps (the longest horizon if None), rounded up to whole output patches.
+        Inputs are padded to a multiple of the compiled batch size and decoded
+        to the compiled horizon, so both follow the batch. No-op if unchanged.
+        """
+        horizon = horizon or self.max_horizon
+        key = (batch_size, -(-horizon // _TIMESFM_OUTPUT_PATCH) * _TIMESFM_OUTPUT_PATCH)
+        if getattr(model, "_compiled_for", None) == key:
+            return
+        import timesfm
+        model.compile(
+            timesfm.ForecastConfig(
+                max_context=1024,
+                max_horizon=key[1],
+                per_core_batch_size=batch_size,
+                normalize_inputs=True,
+                use_continuous_quantile_head=True,
+                force_flip_invariance=True,
+                infer_is_positive=True,
+                fix_quantile_crossing=True,
+            )
+        )
+        model._compiled_for = key
+
+    def _timesfm_forecast(self, model, mode: str, histories: list, horizons: Optional[List[str]] = None) -> List[Dict[str, float]]:
+        """
+        Growth % per history for `horizons` (all if None), in one forward pass
+        compiled for this batch size that decodes only the output patches the
+        longest of them needs.
+        """
+        horizons = horizons or list(self.horizons)
+        contexts = [history[-512:] for history in histories]  # Max context
+        horizon = max(self.horizons[h] for h in horizons)
+        self._compile_timesfm(model, len(contexts), horizon)
+        with precision.inference_context(mode):
+            tfm_forecast_raw = model.forecast(
+                inputs=contexts,
+                horizon=horizon
             )
+
+        # Handle return signature variations
+        if isinstance(tfm_forecast_raw, tuple):
+            point_forecasts = tfm_forecast_raw[0]
+        else:
+            point_forecasts = tfm_forecast_raw
+
+        out = []
+        for history, pred_curve in zip(histories, point_forecasts):
+            growth = self._timesfm_growth(history, pred_curve)
+            out.append({h: growth[h] for h in horizons if h in growth})
+        return out
+
+    def _chronos_forecast(self, model, mode: str, histories: list, horizons: Optional[List[str]] = None) -> List[Dict[str, float]]:
+        """
+        Growth % per history for `horizons` (all if None), in 2 passes:
+        1. Daily data for short-term (1d, 1w, 1m)
+        2. Weekly resampled data for long-term (6m, 1y) to keep prediction_length <= 64.
+        Each pass runs only if one of its horizons is asked for, and decodes
+        only as far as the longest of them.
+        """
+        import torch
+
+        horizons = horizons or list(self.horizons)
+        daily = [h for h in horizons if h in _CHRONOS_DAILY]
+        weekly = [h for h in horizons if h in _CHRONOS_WEEKLY_STEP]
+        out = [{} for _ in histories]
+
+        if daily:
+            # Context ~6 months; series of different lengths are left-padded by the pipeline
+            ctx_daily = [torch.tensor(history[-128:], dtype=torch.float32) for history in histories]
+            with precision.inference_context(mode):
+                forecast_daily = model.predict(
+                    ctx_daily,
+                    prediction_length=max(self.horizons[h] for h in daily),
+                    num_samples=20
+                )
+            median_daily = torch.median(forecast_daily, dim=1).values.float().numpy() # already on CPU
+            for result, history, row in zip(out, histories, median_daily):
+                last_price = float(history[-1])
+                for h_name in daily:
+                    pred = float(row[self.horizons[h_name] - 1])
+                    result[h_name] = ((pred - last_price) / last_price) * 100
+
+        if weekly:
+            # Resample history to weekly (take every 5th point from end)
+            ctx_weekly = [torch.tensor(history[::-5][::-1][-128:], dtype=torch.float32) for history in histories]
+            with precision.inference_context(mode):
+                forecast_weekly = model.predict(
+                    ctx_weekly,
+                    prediction_length=max(_CHRONOS_WEEKLY_STEP[h] for h in weekly) + 1,
+                    num_samples=20
+                )
+            median_weekly = torch.median(forecast_weekly, dim=1).values.float().numpy()
+            for result, history, row in zip(out, histories, median_weekly):
+                last_price = float(history[-1])
+                for h_name in weekly:
+                    pred = float(row[_CHRONOS_WEEKLY_STEP[h_name]])
+                    result[h_name] = ((pred - last_price) / last_price) * 100
+        return out
+
+    def _timesfm_growth(self, history, pred_curve) -> Dict[str, float]:
+        # Plain floats: decoded histories are float32, which JSON columns reject
+        last_price = float(history[-1])
+        ticker_results = {}
+        for h_name, h_days in self.horizons.items():
+            if h_days <= len(pred_curve):
+                pred_price = float(pred_curve[h_days-1])
+                growth = ((pred_price - last_price) / last_price) * 100
+                ticker_results[h_name] = growth
+        return ticker_results
+
+    def _run_timesfm_inference(self, stock_histories: Dict[str, List[float]], on_result: Optional[ResultCallback] = None, stats: Optional[dict] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Load TimesFM, run batched inference on all stocks, unload model.
+        Batch sizes adapt to free memory (see batch_sizing.py); what was used is written to `stats`.
+        Returns: { ticker: { "1d": val, "1w": val, ... } }
+        """
+        results = {}
+        stats = stats if stats is not None else {}
+        
+        try:
+            mode = precision.resolve("timesfm", self.device)
+            logger.info(f"Loading Google TimesFM-2.5-200m on {self.device} ({mode})...")
+            baseline = batch_sizing.MemoryProbe(self.device).current()
+            model = self._load_timesfm(mode)
+            stats.update(mode=mode)
             
             logger.info("TimesFM loaded. Running inference...")
             
+            items = []
             for ticker, history in stock_histories.items():
                 if len(history) < 30:
                     logger.warning(f"Skipping {ticker}: Insufficient history ({len(history)} points)")
                     continue
-                
-                try:
-                    context = history[-512:]  # Max context
-                    
-                    tfm_forecast_raw = model.forecast(
-                        inputs=[context],
-                        horizon=self.max_horizon
-                    )
-                    
-                    # Handle return signature variations
-                    if isinstance(tfm_forecast_raw, tuple):
-                        pred_curve = tfm_forecast_raw[0][0]
-                    else:
-                        pred_curve = tfm_forecast_raw[0]
-                    
-                    # Calculate growth for each horizon
-                    last_price = history[-1]
-                    ticker_results = {}
-                    for h_name, h_days in self.horizons.items():
-                        if h_days <= len(pred_curve):
-                            pred_price = float(pred_curve[h_days-1])
-                            growth = ((pred_price - last_price) / last_price) * 100
-                            ticker_results[h_name] = growth
-                    
-                    results[ticker] = ticker_results
-                    logger.info(f"  TimesFM {ticker}: Success")
-                    
-                except Exception as e:
-                    logger.error(f"  TimesFM failed for {ticker}: {e}")
+                items.append((ticker, history))
+
+            def forward(batch):
+                forecasts = self._timesfm_forecast(model, mode, [history for _, history in batch])
+                for (ticker, _), ticker_results in zip(batch, forecasts):
+                    try:
+                        results[ticker] = ticker_results
+                        if on_result:
+                            on_result(ticker, "timesfm", ticker_results)
+                        logger.info(f"  TimesFM {ticker}: Success")
+                    except Exception as e:
+                        logger.error(f"  TimesFM failed for {ticker}: {e}")
+
+            batch_sizing.run_in_batches(items, forward, "timesfm", self.device, mode, stats, baseline)
             
             # Unload model
             del model
@@ -129,86 +294,54 @@ class ForecastingEngine:
         self._cleanup_memory()
         return results
 
-    def _run_chronos_inference(self, stock_histories: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    def _run_chronos_inference(self, stock_histories: Dict[str, List[float]], on_result: Optional[ResultCallback] = None, stats: Optional[dict] = None) -> Dict[str, Dict[str, float]]:
         """
-        Load Chronos, run inference on all stocks, unload model.
-        Uses 2-pass inference:
-        1. Daily data for short-term (1d, 1w, 1m)
-        2. Weekly resampled data for long-term (6m, 1y) to keep prediction_length <= 64.
+        Chronos inference for all stocks: sharded across worker processes when
+        CHRONOS_WORKERS allows more than one (see chronos_shards.py), otherwise
+        in this process.
+        """
+        workers, threads = chronos_shards.plan(len(stock_histories))
+        if workers > 1:
+            return chronos_shards.run(stock_histories, workers, threads, on_result, stats)
+        return self._run_chronos_local(stock_histories, on_result, stats)
+
+    def _run_chronos_local(self, stock_histories: Dict[str, List[float]], on_result: Optional[ResultCallback] = None, stats: Optional[dict] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Load Chronos, run batched inference on all stocks, unload model.
+        Uses 2-pass inference, daily and weekly (see _chronos_forecast).
+        Batch sizes adapt to free memory (see batch_sizing.py); what was used is written to `stats`.
         
         CRITICAL: Forces CPU usage for Chronos to avoid MPS 'searchsorted' validation errors.
         """
         results = {}
+        stats = stats if stats is not None else {}
         
         try:
             # FORCE CPU for Chronos to avoid persistent MPS validation errors
             inference_device = "cpu"
-            logger.info(f"Loading Amazon Chronos-T5-Large on {inference_device} (forced for stability)...")
-            from chronos import ChronosPipeline
+            mode = precision.resolve("chronos", inference_device)
+            logger.info(f"Loading Amazon Chronos-T5-Large on {inference_device} ({mode}, forced for stability)...")
             
-            model = ChronosPipeline.from_pretrained(
-                "amazon/chronos-t5-large",
-                device_map=inference_device,
-                dtype=torch.float32
-            )
+            baseline = batch_sizing.MemoryProbe(inference_device).current()
+            model = self._load_chronos(inference_device, mode)
+            stats.update(mode=mode)
             
             logger.info("Chronos loaded. Running 2-pass inference (Daily + Weekly)...")
             
-            for ticker, history in stock_histories.items():
-                if len(history) < 30:
-                    continue
-                
-                ticker_results = {}
-                try:
-                    # PASS 1: Short-term (Daily) for 1d, 1w, 1m
-                    # Max horizon needed: 1m = 21 days. Pred len 24 is safe.
-                    ctx_daily = torch.tensor(history[-128:], dtype=torch.float32).unsqueeze(0) # Context ~6 months
-                    
-                    forecast_daily = model.predict(
-                        ctx_daily,
-                        prediction_length=24,
-                        num_samples=20
-                    )
-                    median_daily = torch.median(forecast_daily[0], dim=0).values.numpy() # already on CPU
-                    last_price = history[-1]
-                    
-                    # Store Daily Results
-                    for h_name in ["1d", "1w", "1m"]:
-                        h_days = self.horizons[h_name]
-                        if h_days <= len(median_daily):
-                            pred = float(median_daily[h_days-1])
-                            ticker_results[h_name] = ((pred - last_price) / last_price) * 100
-
-                    # PASS 2: Long-term (Weekly) for 6m, 1y
-                    # Resample history to weekly (take every 5th point from end)
-                    # 1y = 252 days = ~52 weeks. Pred len 52.
-                    history_weekly = history[::-5][::-1]
-                    ctx_weekly = torch.tensor(history_weekly[-128:], dtype=torch.float32).unsqueeze(0)
-                    
-                    forecast_weekly = model.predict(
-                        ctx_weekly,
-                        prediction_length=54, # ~1 year + buffer
-                        num_samples=20
-                    )
-                    median_weekly = torch.median(forecast_weekly[0], dim=0).values.numpy()
-                    
-                    # Store Weekly Results (6m=26w, 1y=52w)
-                    # 6m = 126 days approx 25 index
-                    # 1y = 252 days approx 50 index
-                    
-                    if 25 < len(median_weekly):
-                        pred_6m = float(median_weekly[25])
-                        ticker_results["6m"] = ((pred_6m - last_price) / last_price) * 100
-                    
-                    if 50 < len(median_weekly):
-                        pred_1y = float(median_weekly[50])
-                        ticker_results["1y"] = ((pred_1y - last_price) / last_price) * 100
-
-                    results[ticker] = ticker_results
-                    logger.info(f"  Chronos {ticker}: Success")
-                    
-                except Exception as e:
-                    logger.error(f"  Chronos failed for {ticker}: {e}")
+            items = [(ticker, history) for ticker, history in stock_histories.items() if len(history) >= 30]
+
+            def forward(batch):
+                forecasts = self._chronos_forecast(model, mode, [history for _, history in batch])
+                for (ticker, _), ticker_results in zip(batch, forecasts):
+                    try:
+                        results[ticker] = ticker_results
+                        if on_result:
+                            on_result(ticker, "chronos", ticker_results)
+                        logger.info(f"  Chronos {ticker}: Success")
+                    except Exception as e:
+                        logger.error(f"  Chronos failed for {ticker}: {e}")
+
+            batch_sizing.run_in_batches(items, forward, "chronos", inference_device, mode, stats, baseline)
             
             # Unload model
             del model
@@ -220,20 +353,58 @@ class ForecastingEngine:
         self._cleanup_memory()
         return results
 
-    def predict_all(self, stock_histories: Dict[str, List[float]]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    def _locked(self, model_name: str, run, todo, on_result, stats: dict):
+        """
+        Runs one model phase holding its lock; the time spent waiting goes to stats.
+        A warm on-demand copy of the model is unloaded first, so only the phase's own is resident.
+        """
+        model_stats = stats.setdefault(model_name, {})
+        start = time.perf_counter()
+        with self.model_locks[model_name]:
+            waited = time.perf_counter() - start
+            if waited > 1:
+                logger.info(f"Waited {waited:.1f}s for another {model_name} inference to finish")
+            model_stats["lock_wait_s"] = round(waited, 3)
+            unload = self.unload_hooks.get(model_name)
+            if unload:
+                unload()
+            return run(todo, on_result, model_stats)
+
+    def predict_all(
+        self,
+        stock_histories: Dict[str, List[float]],
+        on_result: Optional[ResultCallback] = None,
+        skip: Optional[Set[Tuple[str, str]]] = None,
+        stats: Optional[dict] = None,
+    ) -> Dict[str, Dict[str, Dict[str, float]]]:
         """
         Runs inference for all stocks using both models SEQUENTIALLY.
         Models are loaded one at a time to minimize RAM usage.
         
+        on_result is invoked as soon as each ticker/model forecast is produced,
+        so callers can persist progressively. (ticker, model) pairs in skip are
+        not recomputed; a model with nothing left to do is never loaded.
+        Each model phase holds that model's lock, so concurrent runs never
+        run the same model at once.
+        If `stats` is given, it receives { model: batch sizes / memory report }.
+        
         Returns: { ticker: { "timesfm": { "1d": val, ... }, "chronos": { ... } } }
         """
-        logger.info(f"Starting Forecasting Cycle on {len(stock_histories)} stocks...")
+        skip = skip or set()
+        logger.info(f"Starting Forecasting Cycle on {len(stock_histories)} stocks ({len(skip)} results already done)...")
+        
+        def pending(model_name):
+            return {t: h for t, h in stock_histories.items() if (t, model_name) not in skip}
+        
+        stats = stats if stats is not None else {}
         
         # Phase 1: TimesFM inference
-        timesfm_results = self._run_timesfm_inference(stock_histories)
+        todo = pending("timesfm")
+        timesfm_results = self._locked("timesfm", self._run_timesfm_inference, todo, on_result, stats) if todo else {}
         
         # Phase 2: Chronos inference
-        chronos_results = self._run_chronos_inference(stock_histories)
+        todo = pending("chronos")
+        chronos_results = self._locked("chronos", self._run_chronos_inference, todo, on_result, stats) if todo else {}
         
         # Merge results
         combined_results = {}
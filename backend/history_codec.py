@@ -0,0 +1,130 @@
+"""
+Packed binary encoding for price histories.
+
+Histories are stored as a small header followed by raw little-endian floats,
+optionally compressed. Uncompressed blobs decode with np.frombuffer, i.e. the
+returned array is a read-only view over the bytes SQLite handed back, with no
+per-element parsing. Rows written by older versions as JSON text are still
+decoded transparently; `python history_codec.py migrate` rewrites them.
+
+HISTORY_DTYPE: float32 (default) | float64
+HISTORY_CODEC: none (default) | zlib  (byte-shuffled before deflate)
+"""
+import json
+import os
+import struct
+import sys
+import zlib
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+HISTORY_DTYPE = os.environ.get("HISTORY_DTYPE", "float32")
+HISTORY_CODEC = os.environ.get("HISTORY_CODEC", "none")
+
+# magic, itemsize, codec, 2 pad bytes -> 8 bytes keeps float64 payloads aligned
+_HEADER = struct.Struct("<4sBBxx")
+_MAGIC = b"PHv1"
+_DTYPES = {4: "<f4", 8: "<f8"}
+_CODECS = {"none": 0, "zlib": 1}
+
+
+def encode(values, dtype: str = None, codec: str = None) -> bytes:
+    """Packs a sequence of floats into the history blob format."""
+    import numpy as np
+
+    dtype = np.dtype(dtype or HISTORY_DTYPE).newbyteorder("<")
+    codec = codec or HISTORY_CODEC
+    if codec not in _CODECS:
+        raise ValueError(f"Unknown history codec '{codec}'")
+
+    arr = np.ascontiguousarray(values, dtype=dtype)
+    payload = arr.tobytes()
+    if codec == "zlib":
+        # Group bytes by significance (sign/exponent bytes together) so deflate finds runs
+        shuffled = arr.view(np.uint8).reshape(-1, arr.itemsize).T.tobytes()
+        payload = zlib.compress(shuffled, 6)
+    return _HEADER.pack(_MAGIC, arr.itemsize, _CODECS[codec]) + payload
+
+
+def decode(blob) -> "np.ndarray":
+    """
+    Unpacks a history blob into a read-only 1-D float array.
+    Accepts legacy JSON text (str/bytes) for rows not yet migrated.
+    """
+    import numpy as np
+
+    if isinstance(blob, str):
+        return np.asarray(json.loads(blob), dtype=np.float64)
+
+    blob = bytes(blob) if isinstance(blob, memoryview) else blob
+    if len(blob) < _HEADER.size or blob[:4] != _MAGIC:
+        return np.asarray(json.loads(blob), dtype=np.float64)
+
+    _, itemsize, codec = _HEADER.unpack_from(blob)
+    dtype = _DTYPES[itemsize]
+    if codec == _CODECS["none"]:
+        return np.frombuffer(blob, dtype=dtype, offset=_HEADER.size)
+
+    raw = np.frombuffer(zlib.decompress(blob[_HEADER.size:]), dtype=np.uint8)
+    return raw.reshape(itemsize, -1).T.copy().view(dtype).reshape(-1)
+
+
+class PackedFloatArray(TypeDecorator):
+    """Column type storing a float sequence as a packed blob and loading it as np.ndarray."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return encode(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decode(value)
+
+    def compare_values(self, x, y):
+        # Default `x == y` is elementwise for arrays. Compared as they would be
+        # stored, so re-assigning the same float64 history is not a change.
+        if x is None or y is None:
+            return x is y
+        import numpy as np
+
+        dtype = np.dtype(HISTORY_DTYPE)
+        return np.array_equal(np.asarray(x, dtype=dtype), np.asarray(y, dtype=dtype))
+
+
+def migrate(db):
+    """Re-encodes every stored history with the current dtype/codec settings."""
+    from sqlalchemy.orm.attributes import flag_modified
+    from models import Stock
+
+    count = 0
+    for stock in db.query(Stock).all():
+        if stock.history is not None:
+            # Force a rewrite: the decoded values are unchanged, only the encoding differs
+            flag_modified(stock, "history")
+            count += 1
+    db.commit()
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "migrate":
+        print("Usage: python history_codec.py migrate")
+        sys.exit(1)
+
+    from database import SessionLocal, engine
+
+    db = SessionLocal()
+    try:
+        n = migrate(db)
+    finally:
+        db.close()
+    # Reclaim the space freed by the smaller rows
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+    print(f"Re-encoded {n} histories as {HISTORY_DTYPE}/{HISTORY_CODEC}")
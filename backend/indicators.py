@@ -0,0 +1,231 @@
+"""
+Technical indicators for the whole tracked universe at once.
+
+Every indicator is computed column-wise over the (T, N) close matrix
+(universe.close_matrix):
+  sma_20 / sma_50 / sma_200    simple moving averages
+  ema_12 / ema_26              exponential moving averages (adjust=False)
+  rsi_14                       RSI with Wilder smoothing (alpha = 1/14)
+  macd / macd_signal / macd_hist   12/26 EMA spread and its 9-period EMA
+  bb_upper / bb_middle / bb_lower / bb_percent_b   20-day, 2σ Bollinger bands
+  drawdown / max_drawdown      from the rolling 252-day peak, and the worst
+                               peak-to-trough move inside that window
+
+Recursive state (EMAs, RSI averages, MACD signal) plus the last 252 closes is
+kept between syncs, so a new daily bar costs a handful of O(N) vector
+operations. The state from before the last bar is kept as well: a rewritten
+last bar is undone and folded in again. A full rebuild runs the same recurrences over the whole matrix,
+solved in blocks of rows by matrix products (ema_series). Latest values are cached until
+the next update. Missing closes leave a ticker's state unchanged, i.e. the
+values match pandas with ignore_na=True.
+"""
+import logging
+import warnings
+
+import numpy as np
+
+from universe import UniverseState
+
+logger = logging.getLogger(__name__)
+
+SMA_WINDOWS = (20, 50, 200)
+EMA_SPANS = (12, 26)
+RSI_PERIOD = 14
+MACD_SPANS = (12, 26, 9)  # fast, slow, signal
+BOLLINGER_WINDOW, BOLLINGER_K = 20, 2.0
+DRAWDOWN_WINDOW = 252
+
+_BUFFER = max(max(SMA_WINDOWS), BOLLINGER_WINDOW, DRAWDOWN_WINDOW)
+
+NAMES = (
+    [f"sma_{n}" for n in SMA_WINDOWS]
+    + [f"ema_{n}" for n in EMA_SPANS]
+    + [f"rsi_{RSI_PERIOD}", "macd", "macd_signal", "macd_hist",
+       "bb_upper", "bb_middle", "bb_lower", "bb_percent_b", "drawdown", "max_drawdown"]
+)
+
+
+# Rows per closed-form EMA block; keeps alpha**-t well inside float64 range
+_EMA_BLOCK = 64
+
+
+def _ema_step(state, x, alpha):
+    """One EMA step per column; NaN inputs keep the state, the first value seeds it."""
+    return np.where(np.isnan(x), state, np.where(np.isnan(state), x, state + alpha * (x - state)))
+
+
+def ema_series(X: np.ndarray, alpha: float, state: np.ndarray = None) -> np.ndarray:
+    """
+    EMA (adjust=False) of every column of X, continuing from `state`; row t
+    is the EMA after X[t]. Blocks of rows are solved in closed form with one
+    matrix product, y_t = (1-α)^(t+1) y_-1 + Σ α (1-α)^(t-s) x_s; only columns
+    with gaps in a block fall back to _ema_step row by row.
+    """
+    T, n = X.shape
+    state = np.full(n, np.nan) if state is None else state.copy()
+    Y = np.empty_like(X, dtype=np.float64)
+    decay = 1.0 - alpha
+    for start in range(0, T, _EMA_BLOCK):
+        block = X[start:start + _EMA_BLOCK]
+        b = len(block)
+        lags = np.subtract.outer(np.arange(b), np.arange(b))
+        weights = np.where(lags >= 0, alpha * decay ** np.maximum(lags, 0), 0.0)
+        out = Y[start:start + b]
+
+        # Seeding with the first value is the same as starting from state = x_0
+        state = np.where(np.isnan(state), block[0], state)
+        clean = np.isfinite(block).all(axis=0) & np.isfinite(state)
+        carry = np.outer(decay ** np.arange(1, b + 1), state)
+        if clean.all():
+            np.add(weights @ block, carry, out=out)
+        else:
+            out[:, clean] = weights @ block[:, clean] + carry[:, clean]
+            rest, s = ~clean, state[~clean]
+            for t in range(b):
+                s = _ema_step(s, block[t, rest], alpha)
+                out[t, rest] = s
+        state = out[-1]
+    return Y
+
+
+class IndicatorEngine(UniverseState):
+    name = "Indicators"
+
+    def __init__(self):
+        super().__init__()
+        self._outputs = {}
+
+    def _reset_state(self, n: int):
+        self._buffer = np.full((0, n), np.nan)  # last _BUFFER closes
+        self._ema = {span: np.full(n, np.nan) for span in set(EMA_SPANS) | set(MACD_SPANS[:2])}
+        self._signal = np.full(n, np.nan)
+        self._avg_gain = np.full(n, np.nan)
+        self._avg_loss = np.full(n, np.nan)
+        self._before_last = None
+
+    def _state(self) -> dict:
+        # Every field is replaced, never updated in place, so references are a snapshot
+        return {name: getattr(self, name) for name in ("_buffer", "_ema", "_signal", "_avg_gain", "_avg_loss")}
+
+    def _push(self, closes):
+        """
+        Folds (k, N) new closes into the recursive state and the close buffer,
+        remembering the state before the last of them so that bar can be revised.
+        """
+        if not len(closes):
+            return
+        if len(closes) > 1:
+            self._fold(closes[:-1])
+        self._before_last = self._state()
+        self._fold(closes[-1:])
+
+    def _fold(self, closes):
+        emas = {span: ema_series(closes, 2.0 / (span + 1), self._ema[span]) for span in self._ema}
+        self._ema = {span: series[-1] for span, series in emas.items()}
+
+        fast, slow, signal = MACD_SPANS
+        self._signal = ema_series(emas[fast] - emas[slow], 2.0 / (signal + 1), self._signal)[-1]
+
+        # The very first bar has no change (and NaN would only send its block down the slow path)
+        delta = np.diff(np.vstack([self._buffer[-1:], closes]), axis=0)
+        with np.errstate(invalid="ignore"):
+            gains = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+            losses = np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0))
+        self._avg_gain = ema_series(gains, 1.0 / RSI_PERIOD, self._avg_gain)[-1]
+        self._avg_loss = ema_series(losses, 1.0 / RSI_PERIOD, self._avg_loss)[-1]
+
+        self._buffer = np.vstack([self._buffer[-_BUFFER:], closes[-_BUFFER:]])[-_BUFFER:]
+
+    def _build(self, closes):
+        self._reset_state(closes.shape[1])
+        self._push(closes)
+        self._compute_outputs()
+
+    def _drop(self, keep):
+        self._buffer = self._buffer[:, keep]
+        self._ema = {span: v[keep] for span, v in self._ema.items()}
+        self._signal = self._signal[keep]
+        self._avg_gain = self._avg_gain[keep]
+        self._avg_loss = self._avg_loss[keep]
+        if self._before_last is not None:
+            before = self._before_last
+            self._before_last = {
+                "_buffer": before["_buffer"][:, keep],
+                "_ema": {span: v[keep] for span, v in before["_ema"].items()},
+                **{name: before[name][keep] for name in ("_signal", "_avg_gain", "_avg_loss")},
+            }
+        self._outputs = {name: v[keep] for name, v in self._outputs.items()}
+
+    def _advance(self, closes):
+        # closes[0] is the bar already folded in
+        self._push(closes[1:])
+        self._compute_outputs()
+
+    def _revise(self, closes, previous):
+        # Back to before the revised bar, then fold it in again with the rest
+        for name, value in self._before_last.items():
+            setattr(self, name, value)
+        self._push(closes[1:])
+        self._compute_outputs()
+
+    def _compute_outputs(self):
+        buf = self._buffer
+        n = buf.shape[1]
+        close = buf[-1] if len(buf) else np.full(n, np.nan)
+
+        def window(size):
+            # NaN unless the window is complete, like pandas rolling(size)
+            return buf[-size:] if len(buf) >= size else np.full((size, n), np.nan)
+
+        out = {f"sma_{size}": window(size).mean(axis=0) for size in SMA_WINDOWS}
+        for span in EMA_SPANS:
+            out[f"ema_{span}"] = self._ema[span].copy()
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = self._avg_gain / self._avg_loss
+            out[f"rsi_{RSI_PERIOD}"] = np.where(self._avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + rs))
+
+            fast, slow, _ = MACD_SPANS
+            macd = self._ema[fast] - self._ema[slow]
+            out["macd"] = macd
+            out["macd_signal"] = self._signal.copy()
+            out["macd_hist"] = macd - self._signal
+
+            bb = window(BOLLINGER_WINDOW)
+            middle, std = bb.mean(axis=0), bb.std(axis=0)
+            out["bb_upper"] = middle + BOLLINGER_K * std
+            out["bb_middle"] = middle
+            out["bb_lower"] = middle - BOLLINGER_K * std
+            out["bb_percent_b"] = (close - out["bb_lower"]) / (out["bb_upper"] - out["bb_lower"])
+
+            recent = buf[-DRAWDOWN_WINDOW:]
+            if len(recent):
+                peaks = np.fmax.accumulate(recent, axis=0)
+                out["drawdown"] = close / peaks[-1] - 1
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+                    out["max_drawdown"] = np.nanmin(recent / peaks - 1, axis=0)
+            else:
+                out["drawdown"] = out["max_drawdown"] = np.full(n, np.nan)
+        self._outputs = out
+
+    def latest(self, tickers=None):
+        """
+        (tickers, { indicator: values aligned with tickers }) for `tickers`
+        (all tracked tickers if None). Raises KeyError listing unknown tickers.
+        """
+        with self._lock:
+            tickers, idx = self._positions(tickers)
+            return tickers, {name: self._outputs[name][idx] for name in NAMES}
+
+
+engine = IndicatorEngine()
+
+
+def update(db):
+    """Syncs the engine if it has been built (after a data refresh)."""
+    if engine.built:
+        try:
+            engine.sync(db)
+        except Exception as e:
+            logger.error(f"Indicator update failed: {e}")
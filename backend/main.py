@@ -1,14 +1,26 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Query
+from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from database import get_db, engine, Base
-from models import Stock
+from database import get_db, engine, Base, SessionLocal, add_missing_columns
+from models import Stock, StockDeletion, ForecastRun, ForecastResult, ForecastPrediction
 import service
+import ticker_metadata
+import scoring
+import data_version
+import profiling
+import online_forecast
+import precision
+from forecasting import engine as forecast_engine
 import uvicorn
+from singleflight import SingleFlight
+import threading
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-
-# Create tables
-Base.metadata.create_all(bind=engine)
+from typing import List, Optional, Union
+from responses import FastJSONResponse, CompressionMiddleware
+from schemas import StockCreate, StockOut, StockDeltaOut, Forecasts, ForecastRunOut, ForecastPredictionOut, ForecastAccuracyOut, BulkImportResponse, CovarianceOut, IndicatorsOut, stock_row, parse_bulk_import, in_input_order
 
 # Initial Seed Data - Top Companies per 5 Layers of AI Stack
 INITIAL_STOCKS = [
@@ -68,52 +80,308 @@ INITIAL_STOCKS = [
   {"id": "app-10", "name": "Atlassian", "ticker": "TEAM", "stack": "Applications", "riskScore": "Med"},
 ]
 
+def prepare_database():
+    """Creates missing tables, and columns models gained after their table was created."""
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine, Base.metadata)
+
+def seed_and_fetch():
+    """
+    Seeds the database if empty, runs the initial data fetch, validates a
+    reduced inference precision if one is configured and resumes any
+    interrupted forecast run.
+    Runs on a background thread so the API starts serving immediately;
+    /api/stocks returns rows as soon as they are seeded and fills in as
+    prices arrive.
+    """
+    db = SessionLocal()
+    try:
+        if db.query(Stock).count() == 0:
+            print("Seeding database...")
+            for s in INITIAL_STOCKS:
+                stock = Stock(
+                    id=s['id'], name=s['name'], ticker=s['ticker'], stack=s['stack'], riskScore=s['riskScore'],
+                    price=0.0, change1M=0.0, change6M=0.0, change1Y=0.0, change3Y=0.0, projectedGrowth=0.0, volatility="Low", history=[]
+                )
+                db.add(stock)
+            db.commit()
+
+            print("Triggering initial data fetch...")
+            for stock in db.query(Stock).all():
+                service.update_stock_in_db(db, stock)
+
+        if precision.PRECISION != "fp32":
+            # Inference uses fp32 until the reduced mode has a verdict
+            precision.ensure_gate()
+
+        # Pick up an inference run a previous process did not finish
+        service.resume_interrupted_run(db)
+    except Exception as e:
+        print(f"Initial seed/fetch failed: {e}")
+    finally:
+        db.close()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Seed DB if empty
-    db = next(get_db())
-    if db.query(Stock).count() == 0:
-        print("Seeding database...")
-        for s in INITIAL_STOCKS:
-            stock = Stock(
-                id=s['id'], name=s['name'], ticker=s['ticker'], stack=s['stack'], riskScore=s['riskScore'],
-                price=0.0, change1M=0.0, change6M=0.0, change1Y=0.0, change3Y=0.0, projectedGrowth=0.0, volatility="Low", history=[]
-            )
-            db.add(stock)
-        db.commit()
-        
-        # Initial fetch in background
-        print("Triggering initial data fetch...")
-        for stock in db.query(Stock).all():
-            service.update_stock_in_db(db, stock)
+    # Not at import time: importing main (tests, tools) does not touch the database
+    prepare_database()
+    # Daemon threads: never block startup or shutdown
+    threading.Thread(target=seed_and_fetch, name="seed-and-fetch", daemon=True).start()
+    stop_metadata = threading.Event()
+    threading.Thread(target=ticker_metadata.run_refresher, args=(stop_metadata,), name="metadata-refresher", daemon=True).start()
+    if online_forecast.PRELOAD:
+        threading.Thread(target=online_forecast.preload, name="online-forecast-preload", daemon=True).start()
     yield
+    stop_metadata.set()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+# brotli/gzip for large payloads such as /api/stocks
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+# Opt-in per request (X-Profile header / ?profile=); outermost so compression is included
+app.add_middleware(profiling.ProfilingMiddleware)
 
-@app.get("/api/stocks")
-def read_stocks(db: Session = Depends(get_db)):
-    return db.query(Stock).all()
+@app.get("/api/stocks", response_model=Union[List[StockOut], StockDeltaOut])
+def read_stocks(
+    since: Optional[int] = Query(default=None, ge=0, description="Data version already seen; returns only changes since"),
+    db: Session = Depends(get_db),
+):
+    """
+    All stocks, with the data version in the X-Data-Version header. With
+    ?since=<version>, only the stocks changed and the ids deleted after that
+    version plus the new version (since=0 or an unknown version: everything).
+    """
+    # Read before the rows: anything committed in between is sent again next time, never missed
+    version = data_version.current(db)
+    # Returned as a Response so FastAPI skips validation/jsonable_encoder on the large payload
+    if since is None:
+        return FastJSONResponse([stock_row(s) for s in db.query(Stock).all()], headers={"X-Data-Version": str(version)})
 
-from schemas import StockCreate
+    full = since == 0 or since > version
+    if full:
+        stocks, deleted = db.query(Stock).all(), []
+    else:
+        stocks = db.query(Stock).filter(Stock.version > since).all()
+        deleted = [
+            stock_id for (stock_id,) in db.query(StockDeletion.stock_id).distinct()
+            .filter(StockDeletion.version > since, StockDeletion.stock_id.notin_(db.query(Stock.id)))
+        ]
+    return FastJSONResponse({"version": version, "full": full, "stocks": [stock_row(s) for s in stocks], "deleted": deleted})
 
-@app.post("/api/stocks")
+@app.post("/api/stocks", response_model=StockOut)
 def create_stock(stock: StockCreate, db: Session = Depends(get_db)):
     db_stock = service.add_stock(db, stock.ticker, stock.stack)
     if not db_stock:
         raise HTTPException(status_code=400, detail="Invalid ticker or fetch error")
-    return db_stock
+    return FastJSONResponse(stock_row(db_stock))
+
+@app.post("/api/stocks/bulk", response_model=BulkImportResponse)
+async def bulk_import_stocks(request: Request, db: Session = Depends(get_db)):
+    """
+    Imports many stocks in one call. Body is either JSON
+    ([{ticker, stack, riskScore, name?}] or {"stocks": [...]}) or CSV with
+    Content-Type text/csv and a header row: ticker,stack,risk[,name].
+    Tickers are validated and fetched in batches and inserted in one transaction.
+    Returns a result per input row.
+    """
+    try:
+        entries, invalid = parse_bulk_import(await request.body(), request.headers.get("content-type", ""))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse import body: {e}")
+
+    results = await run_in_threadpool(service.bulk_add_stocks, db, entries)
+    return {
+        "added": sum(1 for r in results if r["status"] == "added"),
+        "results": in_input_order(results, invalid),
+    }
 
-@app.get("/api/forecasts/{ticker}")
-def get_forecasts(ticker: str, db: Session = Depends(get_db)):
+def parse_list(value: Optional[str], allowed, what: str):
+    """Comma-separated query value -> list (all of `allowed` if empty). 400 on unknown entries."""
+    if not value:
+        return list(allowed)
+    items = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = [v for v in items if v not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {what}: {', '.join(unknown)} (expected {', '.join(allowed)})")
+    return items
+
+@app.get("/api/forecasts/{ticker}", response_model=Forecasts)
+def get_forecasts(
+    ticker: str,
+    compute: bool = Query(default=False, description="Forecast now with the warm models instead of returning stored values"),
+    horizons: Optional[str] = Query(default=None, description="With compute: comma-separated horizons, e.g. 1d,1m"),
+    models: Optional[str] = Query(default=None, description="With compute: comma-separated models"),
+    db: Session = Depends(get_db),
+):
     """
     Returns the raw forecast data (TimesFM & Chronos) for a specific stock.
     Keys: timesfm, chronos
     Horizons: 1d, 1w, 1m, 6m, 1y
+    Each model's entry is the newest completed value, including results from a run still in progress.
+    With compute=true the requested horizons are forecast on demand (see
+    online_forecast.py) and stored on the stock like a run's results.
     """
     stock = db.query(Stock).filter(Stock.ticker == ticker.upper()).first()
     if not stock:
          raise HTTPException(status_code=404, detail="Stock not found")
-    return stock.forecasts
+    if not compute:
+        return stock.forecasts or {}
+
+    wanted_horizons = parse_list(horizons, list(forecast_engine.horizons), "horizons")
+    wanted_models = parse_list(models, online_forecast.MODELS, "models")
+    if stock.history is None or len(stock.history) < 30:
+        raise HTTPException(status_code=400, detail="Not enough price history to forecast")
+    try:
+        results = online_forecast.forecast(stock.history, wanted_models, wanted_horizons)
+        # Plain floats: the JSON column rejects NumPy scalars
+        results = {m: {h: float(v) for h, v in values.items()} for m, values in results.items()}
+        for model_name, values in results.items():
+            # Horizons not asked for keep their previous values
+            service.apply_forecast(db, stock.ticker, model_name, {**(stock.forecasts or {}).get(model_name, {}), **values})
+        db.commit()
+    except TimeoutError as e:
+        raise HTTPException(status_code=503, detail=f"Forecast timed out: {e}")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=503, detail=f"Forecast failed: {e}")
+    return results
+
+@app.get("/api/forecasts/{ticker}/history", response_model=List[ForecastPredictionOut])
+def get_forecast_history(ticker: str, limit: int = Query(default=50, ge=1, le=1000), db: Session = Depends(get_db)):
+    """
+    Past forecasts for a stock, newest first: predicted price per horizon and,
+    for horizons that have matured, the realized % error.
+    """
+    return (
+        db.query(ForecastPrediction)
+        .filter(ForecastPrediction.ticker == ticker.upper())
+        .order_by(ForecastPrediction.created_at.desc(), ForecastPrediction.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+@app.get("/api/forecast-accuracy", response_model=ForecastAccuracyOut)
+def get_forecast_accuracy(db: Session = Depends(get_db)):
+    """
+    Realized accuracy of live forecasts per model and horizon, from running
+    aggregates updated as predictions mature. Errors are % of the realized price.
+    """
+    return scoring.summary(db)
+
+def run_out(run, completed: int) -> dict:
+    return {
+        "run_id": run.id,
+        "status": run.status,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "tickers": len(run.tickers or []),
+        "completed_results": completed,
+        "stats": run.stats,
+    }
+
+@app.get("/api/forecast-runs", response_model=List[ForecastRunOut])
+def list_forecast_runs(limit: int = Query(default=20, ge=1, le=500), db: Session = Depends(get_db)):
+    """Forecasting runs, newest first."""
+    runs = db.query(ForecastRun).order_by(ForecastRun.started_at.desc()).limit(limit).all()
+    counts = dict(
+        db.query(ForecastResult.run_id, func.count(ForecastResult.id))
+        .filter(ForecastResult.run_id.in_([r.id for r in runs]))
+        .group_by(ForecastResult.run_id)
+    ) if runs else {}
+    return [run_out(run, counts.get(run.id, 0)) for run in runs]
+
+@app.get("/api/forecast-runs/{run_id}", response_model=ForecastRunOut)
+def get_forecast_run(run_id: str, db: Session = Depends(get_db)):
+    """
+    Progress of a forecasting run.
+    status: running | completed | failed
+    """
+    run = db.query(ForecastRun).filter(ForecastRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    completed = db.query(ForecastResult).filter(ForecastResult.run_id == run_id).count()
+    return run_out(run, completed)
+
+def select_tickers(db: Session, tickers: Optional[str], stack: Optional[str]):
+    """Tickers chosen by the comma-separated `tickers` and/or `stack` filters; None means all."""
+    selected = [t.strip().upper() for t in tickers.split(",") if t.strip()] if tickers else None
+    if stack:
+        in_stack = [t for (t,) in db.query(Stock.ticker).filter(Stock.stack == stack).distinct()]
+        selected = [t for t in selected if t in set(in_stack)] if selected else sorted(in_stack)
+        if not selected:
+            raise HTTPException(status_code=404, detail="No matching stocks")
+    return selected
+
+@app.get("/api/indicators", response_model=IndicatorsOut)
+def get_indicators(
+    db: Session = Depends(get_db),
+    tickers: Optional[str] = Query(default=None, description="Comma-separated tickers (default: all)"),
+    stack: Optional[str] = Query(default=None, description="Only tickers in this stack"),
+):
+    """
+    Latest SMA/EMA, RSI, MACD, Bollinger band and drawdown values for tracked stocks,
+    computed for the whole universe at once and updated incrementally per new bar.
+    """
+    import indicators
+    indicators.engine.sync(db)
+    try:
+        names, values = indicators.engine.latest(select_tickers(db, tickers, stack))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Stocks not tracked: {e.args[0]}")
+    return FastJSONResponse({"tickers": names, "as_of": indicators.engine.as_of, "values": values})
+
+@app.get("/api/covariance", response_model=CovarianceOut)
+def get_covariance(
+    db: Session = Depends(get_db),
+    tickers: Optional[str] = Query(default=None, description="Comma-separated tickers (default: all)"),
+    stack: Optional[str] = Query(default=None, description="Only tickers in this stack"),
+    method: str = Query(default="ewm", pattern="^(rolling|ewm)$"),
+    kind: str = Query(default="correlation", pattern="^(covariance|correlation)$"),
+):
+    """
+    Covariance or correlation of daily returns across tracked stocks.
+    Statistics are kept up to date incrementally as new daily bars arrive.
+    """
+    selected = select_tickers(db, tickers, stack)
+    import covariance
+    estimator = covariance.get_engine(method)
+    estimator.sync(db)
+    try:
+        names, matrix = estimator.matrix(selected, kind)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Stocks not tracked: {e.args[0]}")
+    return FastJSONResponse({
+        "tickers": names,
+        "method": method,
+        "kind": kind,
+        "window": covariance.WINDOW if method == "rolling" else None,
+        "halflife": covariance.HALFLIFE if method == "ewm" else None,
+        "as_of": estimator.as_of,
+        "matrix": matrix,
+    })
+
+@app.post("/api/admin/covariance/rebuild")
+def rebuild_covariance(db: Session = Depends(get_db)):
+    """Recomputes the covariance statistics from scratch for every method."""
+    import covariance
+    for method in covariance.METHODS:
+        covariance.get_engine(method).rebuild(db)
+    return {"message": "Covariance statistics rebuilt", "tickers": len(covariance.get_engine("ewm").tickers)}
+
+@app.post("/api/admin/profiling")
+def arm_profiling(inference_runs: int = Query(default=1, ge=0, le=100)):
+    """Profiles the next `inference_runs` inference runs (0 disarms)."""
+    return {"armed_inference_runs": profiling.arm_inference(inference_runs)}
+
+@app.get("/api/admin/profiles")
+def list_profiles():
+    return profiling.list_profiles()
+
+@app.get("/api/admin/profiles/{profile_id}/{name}")
+def get_profile_file(profile_id: str, name: str):
+    path = profiling.profile_file(profile_id, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile file not found")
+    return FileResponse(path, filename=f"{profile_id}-{name}")
 
 @app.post("/api/admin/retrain")
 def retrain_model(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
@@ -126,7 +394,7 @@ def retrain_model(background_tasks: BackgroundTasks, db: Session = Depends(get_d
     histories = []
     for stock in stocks:
          # Ensure we have data
-         if stock.history and len(stock.history) > 60:
+         if stock.history is not None and len(stock.history) > 60:
              histories.append(stock.history)
              
     if not histories:
@@ -135,15 +403,19 @@ def retrain_model(background_tasks: BackgroundTasks, db: Session = Depends(get_d
     background_tasks.add_task(service.predictor.auto_train, histories)
     return {"message": "Transfer learning pipeline started. This may take a few minutes."}
 
+# Concurrent refreshes share one execution instead of racing on the same rows
+_refresh_flight = SingleFlight()
+
 @app.get("/api/needs-refresh")
 def check_needs_refresh(db: Session = Depends(get_db)):
     """
     Check if data is stale (>24 hours old).
-    Returns: { "needs_refresh": bool, "last_updated": str | null }
+    Returns: { "needs_refresh": bool, "last_updated": str | null, "refreshing": bool }
     """
+    refreshing = _refresh_flight.in_flight("data")
     stock = db.query(Stock).first()
     if not stock or not stock.last_updated:
-        return {"needs_refresh": True, "last_updated": None}
+        return {"needs_refresh": True, "last_updated": None, "refreshing": refreshing}
     
     age = datetime.utcnow() - stock.last_updated
     needs_refresh = age > timedelta(hours=24)
@@ -151,9 +423,45 @@ def check_needs_refresh(db: Session = Depends(get_db)):
     return {
         "needs_refresh": needs_refresh,
         "last_updated": stock.last_updated.isoformat(),
-        "age_hours": round(age.total_seconds() / 3600, 1)
+        "age_hours": round(age.total_seconds() / 3600, 1),
+        "refreshing": refreshing,
     }
 
+def _update_all_data(db: Session) -> dict:
+    """Fetches fresh data for every stock; returns the histories long enough to forecast."""
+    stocks = db.query(Stock).all()
+    histories = {}
+    for stock in stocks:
+        service.update_stock_in_db(db, stock)
+        if stock.history is not None and len(stock.history) > 60:
+            histories[stock.ticker] = stock.history
+
+    # Fold the new bars into covariance/indicator state already being served
+    import covariance, indicators
+    covariance.update(db)
+    indicators.update(db)
+    db.commit()
+    return histories
+
+def _refresh(db: Session, run_inference: bool) -> dict:
+    # A plain refresh and the data phase of an inference refresh are the same work
+    histories, _ = _refresh_flight.do("data", _update_all_data, db)
+
+    # Only run Foundation Models if explicitly requested.
+    # Forecasts are persisted per ticker/model as they complete. A run an
+    # earlier process left unfinished is completed first (over its own
+    # tickers); the new run then covers every current stock. A run another
+    # thread is still executing needs no help: the new run's model phases
+    # wait for it on the model locks.
+    if run_inference and histories:
+        resumed = service.resume_interrupted_run(db)
+        run = service.run_forecasts(db, histories)
+        response = {"message": "Data updated and Foundation Model Inference completed", "run_id": run.id}
+        if resumed is not None:
+            response["resumed_run_id"] = resumed.id
+        return response
+    return {"message": "Stock data updated (no inference run)"}
+
 @app.post("/api/refresh")
 def refresh_all(
     db: Session = Depends(get_db),
@@ -162,38 +470,11 @@ def refresh_all(
     """
     Refreshes stock data from Yahoo Finance.
     Only runs Foundation Model inference if run_inference=true.
+    A request arriving while an identical refresh is running waits for that
+    refresh and returns its result, marked "coalesced".
     """
-    stocks = db.query(Stock).all()
-    histories = {}
-    
-    # 1. Update Data from Yahoo Finance
-    for stock in stocks:
-        service.update_stock_in_db(db, stock)
-        if stock.history and len(stock.history) > 60:
-            histories[stock.ticker] = stock.history
-    
-    # 2. Only run Foundation Models if explicitly requested
-    if run_inference and histories:
-        forecast_results = service.engine.predict_all(histories)
-        
-        # 3. Update DB with forecasts
-        for stock in stocks:
-            if stock.ticker in forecast_results:
-                stock.forecasts = forecast_results[stock.ticker]
-                # Update legacy fields with TimesFM 1M result as default
-                try:
-                    stock.projectedGrowth1M = stock.forecasts["timesfm"]["1m"]
-                    stock.projectedGrowth6M = stock.forecasts["timesfm"]["6m"]
-                    stock.projectedGrowth1Y = stock.forecasts["timesfm"]["1y"]
-                    stock.projectedGrowth = stock.projectedGrowth1M
-                except:
-                    pass
-        
-        db.commit()
-        return {"message": "Data updated and Foundation Model Inference completed"}
-    
-    db.commit()
-    return {"message": "Stock data updated (no inference run)"}
+    result, shared = _refresh_flight.do(("refresh", run_inference), _refresh, db, run_inference)
+    return {**result, "coalesced": True} if shared else result
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,296 @@
+"""
+Read-through local cache of daily bars, one columnar file per ticker.
+
+Each ticker is stored as MARKET_CACHE_DIR/<TICKER>.npz holding one array per
+column (date, Open, High, Low, Close, Volume) plus metadata: when the tail was
+last fetched and how far back the cached history is complete. Files are
+rewritten atomically, so readers never see a partial file.
+
+MARKET_DATA_CACHE selects the mode (see market_data.py for where it plugs in):
+  readthrough  historical ranges are served locally; only the bars after the
+               last cached one are fetched from the provider (at most once per
+               MARKET_CACHE_TTL_SECONDS). The fetched tail overlaps the cache
+               by two bars: if the provider's older closes no longer match (a
+               dividend/split re-adjusted the series), the full range is
+               fetched again instead of stitching.
+  replay       never calls the provider. Periods are counted back from each
+               ticker's last cached bar, not from today, so refreshes,
+               training and benchmarks run offline and repeat exactly.
+               Unknown tickers behave like unknown symbols (empty history).
+  off          no cache (default for the fake provider)
+
+Populate a cache for replay by running normally in readthrough mode, or with
+`python market_cache.py warm SPY QQQ --period 10y`.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import date
+
+import market_data
+
+logger = logging.getLogger(__name__)
+
+MARKET_CACHE_DIR = os.environ.get("MARKET_CACHE_DIR", os.path.join(os.getcwd(), "market_cache"))
+TTL_SECONDS = float(os.environ.get("MARKET_CACHE_TTL_SECONDS", "60"))
+
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+# Relative difference above which an overlapping close counts as re-adjusted
+_ADJUSTED_TOLERANCE = 1e-6
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock(symbol: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(symbol, threading.Lock())
+
+
+def _path(symbol: str, suffix: str = ".npz") -> str:
+    return os.path.join(MARKET_CACHE_DIR, symbol.upper().replace(os.sep, "_") + suffix)
+
+
+def _days(period: str) -> int:
+    return market_data._PERIOD_DAYS.get(period, 21)
+
+
+def _period_covering(days: int) -> str:
+    """Smallest provider period string spanning `days` trading days."""
+    for period, n in sorted(market_data._PERIOD_DAYS.items(), key=lambda kv: kv[1]):
+        if n >= days:
+            return period
+    return "max"
+
+
+class Entry:
+    """One ticker's cached bars as columns; dates are datetime64[D], oldest first."""
+
+    def __init__(self, dates, columns: dict, fetched_at: float = 0.0, span: int = 0, tz: str = None):
+        self.dates = dates
+        self.columns = columns
+        self.fetched_at = fetched_at
+        self.span = span  # trading days back from the last bar known to be complete
+        self.tz = tz
+
+    @classmethod
+    def from_frame(cls, frame, **meta):
+        import numpy as np
+
+        index = frame.index
+        tz = str(index.tz) if getattr(index, "tz", None) is not None else None
+        if tz:
+            index = index.tz_localize(None)
+        dates = np.asarray(index.values, dtype="datetime64[D]")
+        columns = {c: np.asarray(frame[c], dtype=np.float64) for c in COLUMNS if c in frame.columns}
+        return cls(dates, columns, tz=tz, **meta)
+
+    def to_frame(self, last: int = None):
+        import pandas as pd
+
+        start = max(len(self.dates) - last, 0) if last else 0
+        index = pd.DatetimeIndex(self.dates[start:].astype("datetime64[ns]"))
+        if self.tz:
+            index = index.tz_localize(self.tz)
+        return pd.DataFrame({c: v[start:] for c, v in self.columns.items()}, index=index)
+
+    def __len__(self):
+        return len(self.dates)
+
+
+def load(symbol: str):
+    """The cached Entry for `symbol`, or None."""
+    import numpy as np
+
+    try:
+        with np.load(_path(symbol), allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            columns = {c: z[c] for c in COLUMNS if c in z.files}
+            return Entry(z["date"], columns, **meta)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def store(symbol: str, entry: Entry):
+    import numpy as np
+
+    os.makedirs(MARKET_CACHE_DIR, exist_ok=True)
+    meta = json.dumps({"fetched_at": entry.fetched_at, "span": entry.span, "tz": entry.tz})
+    tmp = _path(symbol, f".{os.getpid()}.{threading.get_ident()}.tmp.npz")
+    np.savez(tmp, date=entry.dates, meta=np.array(meta), **entry.columns)
+    os.replace(tmp, _path(symbol))
+
+
+def _merge(cached: Entry, tail: Entry):
+    """cached + tail, or None if their overlapping closes disagree (re-adjusted history)."""
+    import numpy as np
+
+    if not len(tail):
+        return cached
+    # The last cached bar may have been a partial (intraday) bar: compare the ones before it
+    older = tail.dates < cached.dates[-1]
+    if older.any():
+        at = np.searchsorted(cached.dates, tail.dates[older])
+        at = np.minimum(at, len(cached) - 1)
+        same_day = cached.dates[at] == tail.dates[older]
+        was, now = cached.columns["Close"][at][same_day], tail.columns["Close"][older][same_day]
+        if len(was) and not np.allclose(was, now, rtol=_ADJUSTED_TOLERANCE, atol=0):
+            return None
+
+    if tail.dates[-1] < cached.dates[-1]:
+        return cached  # provider is behind the cache; nothing new
+    keep = cached.dates < tail.dates[0]
+    columns = {
+        c: np.concatenate([cached.columns[c][keep], tail.columns[c]])
+        for c in tail.columns if c in cached.columns
+    }
+    return Entry(np.concatenate([cached.dates[keep], tail.dates]), columns, span=cached.span, tz=cached.tz or tail.tz)
+
+
+def _tail_days(entry: Entry) -> int:
+    """Trading days to request so the tail overlaps the cache by two bars."""
+    import numpy as np
+
+    return int(np.busday_count(entry.dates[-1], np.datetime64(date.today(), "D"))) + 2
+
+
+def _fresh(entry: Entry) -> bool:
+    return time.time() - entry.fetched_at < TTL_SECONDS
+
+
+def _empty():
+    import pandas as pd
+    return pd.DataFrame(columns=list(COLUMNS))
+
+
+def _refresh(symbol: str, entry, days: int, fetch):
+    """
+    Brings `entry` up to date using fetch(period) -> DataFrame and stores it.
+    Returns the new Entry, or `entry` unchanged if the provider returned nothing.
+    """
+    span = max(days, entry.span if entry is not None else 0)
+    if entry is not None and len(entry) and entry.span >= days:
+        frame = fetch(_period_covering(_tail_days(entry)))
+        if frame is None or frame.empty:
+            return entry
+        merged = _merge(entry, Entry.from_frame(frame))
+        if merged is not None:
+            merged.fetched_at = time.time()
+            store(symbol, merged)
+            return merged
+        logger.info(f"{symbol}: cached history was re-adjusted upstream, fetching it again")
+
+    frame = fetch(_period_covering(span))
+    if frame is None or frame.empty:
+        return entry
+    # A shorter frame than asked for means the ticker is younger: still complete over `span`
+    fresh = Entry.from_frame(frame, fetched_at=time.time(), span=span)
+    store(symbol, fresh)
+    return fresh
+
+
+def history(symbol: str, period: str, upstream) -> "DataFrame":
+    """Daily bars for `period` through the cache; `upstream` is the provider ticker (unused in replay)."""
+    days = _days(period)
+    symbol = symbol.upper()
+    with _lock(symbol):
+        entry = load(symbol)
+        if market_data.CACHE_MODE != "replay" and not (entry is not None and entry.span >= days and _fresh(entry)):
+            entry = _refresh(symbol, entry, days, lambda p: upstream().history(period=p))
+    if entry is None or not len(entry):
+        return _empty()
+    return entry.to_frame(last=days)
+
+
+def download(symbols, period: str, upstream_download) -> dict:
+    """Batched history through the cache: only stale tickers go to the provider, tails in one call."""
+    days = _days(period)
+    entries = {s: load(s.upper()) for s in symbols}
+    if market_data.CACHE_MODE != "replay":
+        tail = [s for s, e in entries.items() if e is not None and len(e) and e.span >= days and not _fresh(e)]
+        full = [s for s, e in entries.items() if e is None or not len(e) or e.span < days]
+        if tail:
+            frames = upstream_download(tail, period=_period_covering(max(_tail_days(entries[s]) for s in tail)))
+            for s in tail:
+                if s not in frames:
+                    continue
+                merged = _merge(entries[s], Entry.from_frame(frames[s]))
+                if merged is None:
+                    full.append(s)
+                    continue
+                merged.fetched_at = time.time()
+                store(s.upper(), merged)
+                entries[s] = merged
+        if full:
+            for s, frame in upstream_download(full, period=period).items():
+                entries[s] = Entry.from_frame(frame, fetched_at=time.time(), span=days)
+                store(s.upper(), entries[s])
+    return {s: e.to_frame(last=days) for s, e in entries.items() if e is not None and len(e)}
+
+
+def info(symbol: str, upstream) -> dict:
+    """Provider info, kept next to the bars so replay can serve it offline."""
+    path = _path(symbol, ".info.json")
+    if market_data.CACHE_MODE == "replay":
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    data = upstream().info or {}
+    try:
+        os.makedirs(MARKET_CACHE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f, default=str)
+    except OSError as e:
+        logger.warning(f"Could not cache info for {symbol}: {e}")
+    return data
+
+
+class CachedTicker:
+    """yfinance.Ticker-compatible subset served through the cache."""
+
+    def __init__(self, symbol: str, upstream_factory):
+        self.ticker = symbol.upper()
+        self._factory = upstream_factory
+        self._upstream = None
+
+    def _get_upstream(self):
+        if self._upstream is None:
+            self._upstream = self._factory(self.ticker)
+        return self._upstream
+
+    def history(self, period: str = "1mo", **kwargs):
+        return history(self.ticker, period, self._get_upstream)
+
+    @property
+    def info(self) -> dict:
+        return info(self.ticker, self._get_upstream)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2 or sys.argv[1] not in ("warm", "status"):
+        print("Usage: python market_cache.py warm TICKER... [--period 10y] | status")
+        sys.exit(1)
+
+    if sys.argv[1] == "warm":
+        args = sys.argv[2:]
+        period = "5y"
+        if "--period" in args:
+            i = args.index("--period")
+            period = args[i + 1]
+            del args[i:i + 2]
+        for symbol in args:
+            frame = market_data.Ticker(symbol).history(period=period)
+            print(f"{symbol.upper():<8} {len(frame)} bars")
+    else:
+        names = sorted(n[:-4] for n in os.listdir(MARKET_CACHE_DIR) if n.endswith(".npz")) if os.path.isdir(MARKET_CACHE_DIR) else []
+        for symbol in names:
+            entry = load(symbol)
+            if entry is not None and len(entry):
+                print(f"{symbol:<8} {len(entry):>5} bars  {entry.dates[0]} .. {entry.dates[-1]}")
+        print(f"{len(names)} tickers in {MARKET_CACHE_DIR}")
@@ -0,0 +1,149 @@
+"""
+Market-data provider seam.
+
+Service code asks this module for `Ticker(symbol)` instead of calling yfinance
+directly. MARKET_DATA_PROVIDER selects the implementation:
+  yfinance (default) - live Yahoo Finance
+  fake               - deterministic synthetic prices, fully offline; used by
+                       the load-testing harness in benchmarks/
+
+FakeTicker mirrors the small part of the yfinance.Ticker API the backend uses:
+`.history(period=...)` returning a DataFrame with a Close column, and `.info`.
+`download()` fetches many symbols' histories in one batched call.
+
+MARKET_DATA_CACHE puts the local bar cache (market_cache.py) in front of the
+provider: `readthrough` (default for yfinance), `replay` (offline, from the
+cache only) or `off` (default for the fake provider).
+"""
+import functools
+import os
+import time
+import zlib
+from datetime import date
+
+MARKET_DATA_PROVIDER = os.environ.get("MARKET_DATA_PROVIDER", "yfinance")
+CACHE_MODE = os.environ.get("MARKET_DATA_CACHE", "off" if MARKET_DATA_PROVIDER == "fake" else "readthrough")
+
+# Optional simulated network latency per fake call, to make load tests realistic
+FAKE_LATENCY_MS = float(os.environ.get("FAKE_MARKET_LATENCY_MS", "0"))
+
+# Trading days per yfinance period string
+_PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252,
+                "2y": 504, "5y": 1260, "10y": 2520, "max": 5040}
+
+
+def fake_closes(symbol: str, days: int = None):
+    """
+    Deterministic synthetic daily closes for `symbol`, oldest first.
+    The full series is generated once per call so every length is a consistent suffix.
+    """
+    import numpy as np
+
+    seed = zlib.crc32(symbol.upper().encode())
+    rng = np.random.default_rng(seed)
+    start_price = 20 + (seed % 480)
+    closes = start_price * np.exp(np.cumsum(rng.normal(0.0004, 0.02, _PERIOD_DAYS["max"])))
+    return closes[-days:] if days else closes
+
+
+@functools.lru_cache(maxsize=4)
+def _business_days(end: date):
+    import pandas as pd
+    return pd.bdate_range(end=pd.Timestamp(end), periods=_PERIOD_DAYS["max"])
+
+
+class FakeTicker:
+    """Deterministic synthetic ticker: same symbol and day always give the same prices."""
+
+    def __init__(self, symbol: str):
+        self.ticker = symbol.upper()
+
+    def _sleep(self):
+        if FAKE_LATENCY_MS:
+            time.sleep(FAKE_LATENCY_MS / 1000)
+
+    def history(self, period: str = "1mo", **kwargs):
+        import numpy as np
+        import pandas as pd
+
+        self._sleep()
+        days = _PERIOD_DAYS.get(period, 21)
+        close = fake_closes(self.ticker, days + 1)
+        open_ = close[:-1]
+        close = close[1:]
+        volume = np.random.default_rng(zlib.crc32(self.ticker.encode()) + 1).integers(1_000_000, 50_000_000, days)
+        return pd.DataFrame(
+            {
+                "Open": open_,
+                "High": np.maximum(open_, close) * 1.005,
+                "Low": np.minimum(open_, close) * 0.995,
+                "Close": close,
+                "Volume": volume,
+            },
+            index=_business_days(date.today())[-days:],
+        )
+
+    @property
+    def info(self) -> dict:
+        self._sleep()
+        return {
+            "symbol": self.ticker,
+            "shortName": f"{self.ticker} Corp",
+            "longName": f"{self.ticker} Corporation",
+            "exchange": "FAKE",
+            "currency": "USD",
+            "sector": "Technology",
+        }
+
+
+def Ticker(symbol: str):
+    """Provider-backed ticker handle (yfinance.Ticker-compatible subset)."""
+    if CACHE_MODE != "off":
+        import market_cache
+        return market_cache.CachedTicker(symbol, _provider_ticker)
+    return _provider_ticker(symbol)
+
+
+def _provider_ticker(symbol: str):
+    if MARKET_DATA_PROVIDER == "fake":
+        return FakeTicker(symbol)
+    import yfinance as yf
+    return yf.Ticker(symbol)
+
+
+def download(symbols, period: str = "5y") -> dict:
+    """
+    Batched daily history fetch: { symbol: DataFrame } for symbols that returned data.
+    Unknown/delisted symbols are simply absent from the result.
+    """
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    if CACHE_MODE != "off":
+        import market_cache
+        return market_cache.download(symbols, period, _provider_download)
+    return _provider_download(symbols, period)
+
+
+def _provider_download(symbols, period: str) -> dict:
+    if MARKET_DATA_PROVIDER == "fake":
+        return {s: FakeTicker(s).history(period=period) for s in symbols}
+
+    import pandas as pd
+    import yfinance as yf
+
+    frame = yf.download(symbols, period=period, group_by="ticker", auto_adjust=True,
+                        threads=True, progress=False)
+    out = {}
+    for symbol in symbols:
+        if isinstance(frame.columns, pd.MultiIndex):
+            if symbol not in frame.columns.get_level_values(0):
+                continue
+            df = frame[symbol]
+        else:
+            df = frame
+        # Batched frames are aligned on the union of dates; drop the padding
+        df = df.dropna(subset=["Close"])
+        if not df.empty:
+            out[symbol] = df
+    return out
@@ -0,0 +1,184 @@
+"""
+Local, memory-mappable weight cache for the foundation models.
+
+`python model_cache.py prepare` reads the TimesFM and Chronos checkpoints once
+(from hf_cache, downloading if needed) and re-saves them under MODEL_CACHE_DIR
+as torch zip checkpoints, together with the configs needed to rebuild the
+modules. Loads then build the module skeleton on the meta device and assign
+mmap-backed tensors to it, so weights are paged in lazily by the OS instead of
+being deserialized and copied on every cycle.
+
+Once prepared, loading never touches the network or hf_cache.
+"""
+import json
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", os.path.join(os.getcwd(), "model_cache"))
+
+TIMESFM_REPO = "google/timesfm-2.5-200m-pytorch"
+CHRONOS_REPO = "amazon/chronos-t5-large"
+
+WEIGHTS_FILE = "weights.pt"
+META_FILE = "meta.json"
+
+
+def _model_dir(name: str) -> str:
+    return os.path.join(MODEL_CACHE_DIR, name)
+
+
+def is_prepared(name: str) -> bool:
+    """True if `name` ("timesfm" or "chronos") has a complete local cache entry."""
+    d = _model_dir(name)
+    return os.path.exists(os.path.join(d, WEIGHTS_FILE)) and os.path.exists(os.path.join(d, META_FILE))
+
+
+def _invalidate(name: str):
+    """Marks the entry incomplete (before any of its files is rewritten)."""
+    try:
+        os.remove(os.path.join(_model_dir(name), META_FILE))
+    except FileNotFoundError:
+        pass
+
+
+def _replace(path: str, write):
+    """Writes `path` through write(tmp_path) and a rename, so it is never seen half-written."""
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_meta(name: str, meta: dict):
+    def write(path):
+        with open(path, "w") as f:
+            json.dump(meta, f, indent=2)
+
+    _replace(os.path.join(_model_dir(name), META_FILE), write)
+
+
+def _save(name: str, state_dict, meta: dict):
+    """
+    Writes weights + metadata atomically: meta.json is removed first and
+    written last, so an interrupted (re)write never leaves new weights paired
+    with old metadata.
+    """
+    import torch
+
+    d = _model_dir(name)
+    os.makedirs(d, exist_ok=True)
+    _invalidate(name)
+
+    weights_path = os.path.join(d, WEIGHTS_FILE)
+    tensors = {k: v.detach().contiguous() for k, v in state_dict.items()}
+    _replace(weights_path, lambda path: torch.save(tensors, path))
+    _write_meta(name, dict(meta, created_at=time.time(), torch_version=torch.__version__))
+
+    size_mb = os.path.getsize(weights_path) / 1e6
+    logger.info(f"Cached {name} weights at {weights_path} ({size_mb:.0f} MB)")
+
+
+def _load_state_dict(name: str):
+    import torch
+
+    path = os.path.join(_model_dir(name), WEIGHTS_FILE)
+    # mmap=True keeps the storages file-backed: nothing is read until touched
+    return torch.load(path, mmap=True, weights_only=True, map_location="cpu")
+
+
+def prepare_timesfm():
+    """Converts the TimesFM checkpoint into the local mmap cache."""
+    import timesfm
+
+    logger.info(f"Preparing TimesFM cache from {TIMESFM_REPO}...")
+    tfm = timesfm.TimesFM_2p5_200M_torch.from_pretrained(TIMESFM_REPO, device="cpu")
+    _save("timesfm", tfm.model.state_dict(), {"repo": TIMESFM_REPO})
+    del tfm
+
+
+def prepare_chronos():
+    """Converts the Chronos checkpoint (and its HF config) into the local mmap cache."""
+    import torch
+    from chronos import ChronosPipeline
+
+    logger.info(f"Preparing Chronos cache from {CHRONOS_REPO}...")
+    pipeline = ChronosPipeline.from_pretrained(CHRONOS_REPO, device_map="cpu", dtype=torch.float32)
+    inner = pipeline.model.model
+    # config.json carries chronos_config, which is all we need to rebuild offline
+    _invalidate("chronos")
+    inner.config.save_pretrained(_model_dir("chronos"))
+    _save("chronos", inner.state_dict(), {"repo": CHRONOS_REPO, "dtype": "float32"})
+    del pipeline
+
+
+def load_timesfm(device: str):
+    """
+    Builds TimesFM from the local cache.
+    On CPU the parameters stay mmap-backed; on accelerators they are copied once to the device.
+    """
+    import torch
+    import timesfm
+
+    t0 = time.perf_counter()
+    state_dict = _load_state_dict("timesfm")
+    with torch.device("meta"):
+        tfm = timesfm.TimesFM_2p5_200M_torch()
+    tfm.model.load_state_dict(state_dict, assign=True)
+    if device != "cpu":
+        tfm.model.to(device)
+    tfm.model.eval()
+    logger.info(f"TimesFM mapped from local cache in {time.perf_counter() - t0:.2f}s")
+    return tfm
+
+
+def load_chronos():
+    """Builds the Chronos pipeline (CPU, float32) from the local cache."""
+    import torch
+    from transformers import AutoConfig, AutoModelForSeq2SeqLM
+    from chronos import ChronosConfig, ChronosModel, ChronosPipeline
+
+    t0 = time.perf_counter()
+    config = AutoConfig.from_pretrained(_model_dir("chronos"))
+    chronos_config = ChronosConfig(**config.chronos_config)
+
+    state_dict = _load_state_dict("chronos")
+    with torch.device("meta"):
+        inner = AutoModelForSeq2SeqLM.from_config(config, torch_dtype=torch.float32)
+    inner.load_state_dict(state_dict, assign=True)
+    inner.tie_weights()
+    inner.eval()
+
+    pipeline = ChronosPipeline(
+        tokenizer=chronos_config.create_tokenizer(),
+        model=ChronosModel(config=chronos_config, model=inner),
+    )
+    logger.info(f"Chronos mapped from local cache in {time.perf_counter() - t0:.2f}s")
+    return pipeline
+
+
+def prepare_all(force: bool = False):
+    """Prepares every model that is not cached yet (or all of them with force=True)."""
+    for name, prepare in (("timesfm", prepare_timesfm), ("chronos", prepare_chronos)):
+        if is_prepared(name) and not force:
+            logger.info(f"{name} already cached at {_model_dir(name)}")
+            continue
+        prepare()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    # Reuse the same HF cache location as the forecasting engine
+    os.environ.setdefault("HF_HOME", os.path.join(os.getcwd(), "hf_cache"))
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("prepare", "status"):
+        print("Usage: python model_cache.py prepare [--force] | status")
+        sys.exit(1)
+
+    if sys.argv[1] == "prepare":
+        prepare_all(force="--force" in sys.argv)
+    else:
+        for name in ("timesfm", "chronos"):
+            print(f"{name:<8} {'ready' if is_prepared(name) else 'missing'}  {_model_dir(name)}")
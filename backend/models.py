@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, DateTime
+from sqlalchemy import Column, Integer, String, Float, JSON, Date, DateTime, Boolean, ForeignKey, UniqueConstraint
 from database import Base
+from history_codec import PackedFloatArray
 from datetime import datetime
 
 class Stock(Base):
@@ -20,7 +21,86 @@ class Stock(Base):
     projectedGrowth1Y = Column(Float, default=0.0)
     riskScore = Column(String)
     volatility = Column(String)
-    history = Column(JSON)
+    history = Column(PackedFloatArray) # Daily closes; loads as a read-only np.ndarray
     forecasts = Column(JSON, default={}) # Stores { timesfm: {...}, chronos: {...} }
     last_updated = Column(DateTime, default=datetime.utcnow)
+    history_end = Column(Date, nullable=True) # Trading date of the last bar in history
+    version = Column(Integer, nullable=True, index=True) # Data version of the last change (see data_version.py)
 
+
+class StockDeletion(Base):
+    """Tombstone of a deleted stock, so delta syncs can report the deletion."""
+    __tablename__ = "stock_deletions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    stock_id = Column(String, index=True)
+    ticker = Column(String)
+    version = Column(Integer, index=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ForecastRun(Base):
+    """One inference cycle. Results are persisted per ticker/model as they are produced."""
+    __tablename__ = "forecast_runs"
+
+    id = Column(String, primary_key=True, index=True)
+    status = Column(String, default="running") # running | completed | failed
+    tickers = Column(JSON, default=[])
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    stats = Column(JSON, nullable=True) # { model: batch sizes, OOM retries, memory high-water marks }
+
+class ForecastResult(Base):
+    __tablename__ = "forecast_results"
+    __table_args__ = (UniqueConstraint("run_id", "ticker", "model"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(String, ForeignKey("forecast_runs.id"), index=True)
+    ticker = Column(String, index=True)
+    model = Column(String) # timesfm | chronos
+    values = Column(JSON) # { "1d": growth %, ... }
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ForecastPrediction(Base):
+    """
+    Price-level view of a forecast, kept for realized-accuracy scoring
+    (see scoring.py). One row per run/ticker/model.
+    """
+    __tablename__ = "forecast_predictions"
+    __table_args__ = (UniqueConstraint("run_id", "ticker", "model"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(String, ForeignKey("forecast_runs.id"), index=True)
+    ticker = Column(String, index=True)
+    model = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    base_date = Column(Date) # Last bar the forecast was made from
+    base_price = Column(Float)
+    prices = Column(JSON) # { "1d": predicted close, ... }
+    pending = Column(JSON, default=[]) # Horizons not yet matured/scored
+    errors = Column(JSON, default={}) # { horizon: % error of the predicted price }, filled as they mature
+    open = Column(Boolean, default=True, index=True) # False once every horizon is scored
+
+class ForecastAccuracy(Base):
+    """Running realized-error aggregates per model and horizon."""
+    __tablename__ = "forecast_accuracy"
+
+    model = Column(String, primary_key=True)
+    horizon = Column(String, primary_key=True)
+    count = Column(Integer, default=0)
+    abs_pct_error_sum = Column(Float, default=0.0)
+    sq_pct_error_sum = Column(Float, default=0.0)
+    pct_error_sum = Column(Float, default=0.0)
+    direction_hits = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class TickerMetadata(Base):
+    """Provider company metadata, cached with a TTL (see ticker_metadata.py)."""
+    __tablename__ = "ticker_metadata"
+
+    ticker = Column(String, primary_key=True, index=True)
+    name = Column(String)
+    exchange = Column(String)
+    currency = Column(String)
+    sector = Column(String)
+    fetched_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,183 @@
+"""
+On-demand single-ticker forecasts from warm models, with dynamic micro-batching.
+
+GET /api/forecasts/{ticker}?compute=true forecasts one ticker immediately
+instead of waiting for the next universe-wide run. Each model has a
+MicroBatcher: a thread that keeps the model loaded and collects the requests
+arriving within ONLINE_BATCH_WINDOW_MS of the first one (up to
+ONLINE_MAX_BATCH) into a single forward pass, compiled for that batch size. A
+batch decodes only as far as the longest horizon any of its requests asked for
+(for TimesFM, in whole 128-step output patches).
+
+Models load on the first request (or at startup with ONLINE_FORECAST_PRELOAD=1)
+and are unloaded after ONLINE_MODEL_IDLE_SECONDS without requests. Loading and
+every forward pass hold the model's engine lock (engine.model_locks), like a
+full inference run's phase for that model: the two never load or run the same
+model at once, and a request arriving during a run waits for that model's
+phase to finish (up to ONLINE_FORECAST_TIMEOUT_SECONDS). A run's phase unloads
+the warm copy before loading its own, so the two are never resident together;
+the next request loads it again.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, wait
+
+import precision
+from forecasting import engine
+
+logger = logging.getLogger(__name__)
+
+WINDOW = float(os.environ.get("ONLINE_BATCH_WINDOW_MS", "10")) / 1000
+MAX_BATCH = int(os.environ.get("ONLINE_MAX_BATCH", "32"))
+IDLE_SECONDS = float(os.environ.get("ONLINE_MODEL_IDLE_SECONDS", "900"))
+TIMEOUT = float(os.environ.get("ONLINE_FORECAST_TIMEOUT_SECONDS", "120"))
+PRELOAD = os.environ.get("ONLINE_FORECAST_PRELOAD", "0") == "1"
+
+
+class _Request:
+    def __init__(self, history, horizons):
+        self.history = history
+        self.horizons = horizons
+        self.future = Future()
+
+
+class MicroBatcher:
+    """Serves one model: collects concurrent requests into batched forward passes."""
+
+    def __init__(self, name: str, load, forecast):
+        self.name = name
+        self._load = load  # () -> (model, precision mode)
+        self._forecast = forecast  # (model, mode, histories, horizons) -> [{ horizon: growth % }]
+        self._queue = queue.Queue()
+        self._model = None
+        self._mode = None
+        self._lock = engine.model_locks[name]  # shared with inference runs of this model
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        engine.unload_hooks[name] = lambda: self._release("for an inference run")
+
+    @property
+    def warm(self) -> bool:
+        return self._model is not None
+
+    def ensure_loaded(self):
+        with self._lock:
+            return self._loaded()
+
+    def _loaded(self):
+        # Caller holds self._lock
+        if self._model is None:
+            start = time.perf_counter()
+            self._model, self._mode = self._load()
+            logger.info(f"Online {self.name} loaded ({self._mode}) in {time.perf_counter() - start:.1f}s")
+        return self._model, self._mode
+
+    def _release(self, reason: str):
+        # Caller holds self._lock
+        if self._model is not None:
+            self._model = None
+            engine._cleanup_memory()
+            logger.info(f"Online {self.name} unloaded {reason}")
+
+    def _unload(self):
+        with self._lock:
+            self._release(f"after {IDLE_SECONDS:.0f}s idle")
+
+    def submit(self, history, horizons) -> Future:
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"online-{self.name}", daemon=True)
+                self._thread.start()
+        request = _Request(history, horizons)
+        self._queue.put(request)
+        return request.future
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=IDLE_SECONDS if self.warm else None)]
+            except queue.Empty:
+                self._unload()
+                continue
+            deadline = time.monotonic() + WINDOW
+            while len(batch) < MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch):
+        # Decode to the longest horizon in the batch; each request gets what it asked for
+        wanted = {h for r in batch for h in r.horizons}
+        horizons = [h for h in engine.horizons if h in wanted]
+        try:
+            with self._lock:
+                model, mode = self._loaded()
+                outputs = self._forecast(model, mode, [r.history for r in batch], horizons)
+        except Exception as e:
+            logger.error(f"Online {self.name} batch of {len(batch)} failed: {e}")
+            for r in batch:
+                r.future.set_exception(e)
+            return
+        logger.debug(f"Online {self.name}: batch of {len(batch)} up to {horizons[-1]}")
+        for r, values in zip(batch, outputs):
+            r.future.set_result({h: values[h] for h in r.horizons if h in values})
+
+
+def _load_timesfm():
+    mode = precision.resolve("timesfm", engine.device)
+    # Compiled by each forward pass for its batch size and horizon
+    return engine._load_timesfm(mode), mode
+
+
+def _load_chronos():
+    # CPU only, as in batch inference
+    mode = precision.resolve("chronos", "cpu")
+    return engine._load_chronos("cpu", mode), mode
+
+
+batchers = {
+    "timesfm": MicroBatcher("timesfm", _load_timesfm, engine._timesfm_forecast),
+    "chronos": MicroBatcher("chronos", _load_chronos, engine._chronos_forecast),
+}
+MODELS = tuple(batchers)
+
+
+def forecast(history, models=MODELS, horizons=None) -> dict:
+    """
+    { model: { horizon: growth % } } for one history, from every model in
+    `models` concurrently. A model that fails is left out (and logged); raises
+    the error if all fail, TimeoutError after ONLINE_FORECAST_TIMEOUT_SECONDS.
+    """
+    horizons = list(horizons or engine.horizons)
+    futures = {name: batchers[name].submit(history, horizons) for name in models}
+    _, pending = wait(futures.values(), timeout=TIMEOUT)
+    if pending:
+        raise TimeoutError(f"forecast did not finish within {TIMEOUT:.0f}s")
+
+    results, errors = {}, []
+    for name, future in futures.items():
+        if future.exception() is None:
+            results[name] = future.result()
+        else:
+            errors.append(future.exception())
+    if errors and not results:
+        raise errors[0]
+    return results
+
+
+def preload():
+    """Loads every model ahead of the first request (ONLINE_FORECAST_PRELOAD=1)."""
+    for batcher in batchers.values():
+        try:
+            batcher.ensure_loaded()
+        except Exception as e:
+            logger.error(f"Online {batcher.name} preload failed: {e}")
+
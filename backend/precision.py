@@ -0,0 +1,180 @@
+"""
+Reduced-precision CPU inference modes and the accuracy gate that guards them.
+
+FORECAST_PRECISION selects the mode:
+  fp32 - reference behaviour
+  bf16 - bfloat16 autocast around forward passes (weights stay fp32 / mmap-backed)
+  int8 - dynamic int8 quantization of every nn.Linear
+
+A reduced mode is only used for a model after the evaluation harness
+(evaluate_accuracy.evaluate_forecasts) has shown that its MAPE at every horizon
+is within PRECISION_MAPE_TOLERANCE percentage points of fp32 on the same seeded
+series, through the same forward passes and prediction lengths inference uses.
+Verdicts are stored next to the model cache and reused until the tolerance or
+the torch version changes. A rejected mode falls back to fp32.
+
+The gate never runs on the inference path: run it with the command below, or
+let the API run it in the background at startup (ensure_gate). Until a verdict
+exists, inference uses fp32.
+
+Usage:
+    python precision.py validate bf16|int8
+"""
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+
+import model_cache
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("fp32", "bf16", "int8")
+
+PRECISION = os.environ.get("FORECAST_PRECISION", "fp32")
+MAPE_TOLERANCE = float(os.environ.get("PRECISION_MAPE_TOLERANCE", "0.5"))
+GATE_SEED = 0
+
+GATE_FILE = os.path.join(model_cache.MODEL_CACHE_DIR, "precision_gate.json")
+
+_gate_lock = threading.Lock()
+
+
+def quantize(module, mode: str):
+    """Returns `module` prepared for `mode`. Only int8 changes the module itself."""
+    if mode != "int8":
+        return module
+    import torch
+    # In place: a copy would first pull every mmap-backed fp32 weight into anonymous memory
+    return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def inference_context(mode: str):
+    """Context manager to wrap forward passes in for `mode`."""
+    if mode != "bf16":
+        return contextlib.nullcontext()
+    import torch
+    return torch.autocast("cpu", dtype=torch.bfloat16)
+
+
+def compare(baseline: dict, candidate: dict, tolerance: float) -> dict:
+    """
+    Per-model verdicts from two evaluate_accuracy.evaluate() results.
+    A model is rejected if any horizon's MAPE grows by more than `tolerance`
+    percentage points, or if either run produced no scores for it.
+    """
+    verdicts = {}
+    for model in ("timesfm", "chronos"):
+        base, cand = baseline.get(model) or {}, candidate.get(model) or {}
+        if not base or not cand or set(base) != set(cand):
+            verdicts[model] = {"accepted": False, "reason": "evaluation failed"}
+            continue
+
+        deltas = {h: cand[h]["MAPE"] - base[h]["MAPE"] for h in base}
+        worst = max(deltas, key=deltas.get)
+        verdicts[model] = {
+            "accepted": deltas[worst] <= tolerance,
+            "worst_horizon": worst,
+            "mape_delta": round(deltas[worst], 4),
+            "baseline": {h: round(v["MAPE"], 4) for h, v in base.items()},
+            "candidate": {h: round(v["MAPE"], 4) for h, v in cand.items()},
+        }
+    return verdicts
+
+
+def _read_gate() -> dict:
+    try:
+        with open(GATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_gate(gate: dict):
+    os.makedirs(os.path.dirname(GATE_FILE), exist_ok=True)
+    tmp = GATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(gate, f, indent=2)
+    os.replace(tmp, GATE_FILE)
+
+
+def _gate_entry(mode: str):
+    """The stored verdicts for `mode`, or None if missing or stale."""
+    import torch
+
+    entry = _read_gate().get(mode)
+    if (not entry or entry.get("tolerance") != MAPE_TOLERANCE
+            or entry.get("torch_version") != torch.__version__):
+        return None
+    return entry
+
+
+def run_gate(mode: str, tolerance: float = MAPE_TOLERANCE) -> dict:
+    """Runs the evaluation harness for fp32 and `mode` on CPU and records the verdicts."""
+    import torch
+    import evaluate_accuracy
+
+    logger.info(f"Validating precision '{mode}' against fp32 (tolerance {tolerance} MAPE points)...")
+    baseline = evaluate_accuracy.evaluate_forecasts(mode="fp32", seed=GATE_SEED)
+    candidate = evaluate_accuracy.evaluate_forecasts(mode=mode, seed=GATE_SEED)
+    verdicts = compare(baseline, candidate, tolerance)
+
+    for model, v in verdicts.items():
+        state = "ACCEPTED" if v["accepted"] else "REJECTED"
+        detail = v.get("reason") or f"worst {v['worst_horizon']} {v['mape_delta']:+.3f}"
+        logger.info(f"  {model} {mode}: {state} ({detail})")
+
+    gate = _read_gate()
+    gate[mode] = {"tolerance": tolerance, "torch_version": torch.__version__, "models": verdicts}
+    _write_gate(gate)
+    return verdicts
+
+
+def ensure_gate(mode: str = None):
+    """Runs the gate for `mode` (default FORECAST_PRECISION) unless a current verdict exists."""
+    mode = mode or PRECISION
+    if mode not in PRECISIONS[1:]:
+        return
+    try:
+        with _gate_lock:
+            if _gate_entry(mode) is None:
+                run_gate(mode)
+    except Exception as e:
+        logger.error(f"Precision gate for '{mode}' failed, inference stays fp32: {e}")
+
+
+def resolve(model: str, device: str = "cpu", mode: str = None) -> str:
+    """
+    Effective precision for `model`: the configured mode if it has passed the
+    gate, otherwise fp32 (also while the gate has not run yet).
+    """
+    mode = mode or PRECISION
+    if mode == "fp32":
+        return "fp32"
+    if mode not in PRECISIONS:
+        logger.warning(f"Unknown FORECAST_PRECISION '{mode}', using fp32")
+        return "fp32"
+    if device != "cpu":
+        # Reduced modes here are CPU kernels; accelerators keep their own defaults
+        return "fp32"
+
+    entry = _gate_entry(mode)
+    if entry is None:
+        logger.warning(f"Precision '{mode}' has not been validated yet (python precision.py validate {mode}); using fp32")
+        return "fp32"
+    verdict = entry.get("models", {}).get(model, {})
+    if verdict.get("accepted"):
+        return mode
+    logger.warning(f"Precision '{mode}' rejected for {model} by accuracy gate; using fp32")
+    return "fp32"
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 3 or sys.argv[1] != "validate" or sys.argv[2] not in PRECISIONS[1:]:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+    results = run_gate(sys.argv[2])
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if all(v["accepted"] for v in results.values()) else 1)
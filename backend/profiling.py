@@ -0,0 +1,219 @@
+"""
+Opt-in profiling of single API requests and inference runs.
+
+Nothing here runs unless asked for:
+  - a request with the header `X-Profile: 1` (or `?profile=1`) is profiled by
+    ProfilingMiddleware; `X-Profile: torch` (or `?profile=torch`) also runs
+    the torch profiler. The response carries the profile ID in `X-Profile-Id`.
+  - POST /api/admin/profiling?inference_runs=N profiles the next N inference
+    runs; their profile ID is the forecast run ID.
+
+A profile is a directory PROFILE_DIR/<id>/ with:
+  stacks.folded     sampled Python stacks in the folded flamegraph format
+                    (open in speedscope, or render with flamegraph.pl)
+  torch_trace.json  torch profiler trace (chrome://tracing, Perfetto), if enabled
+  meta.json         what was profiled, duration, sample count
+
+The sampler is a thread reading sys._current_frames() every
+PROFILE_INTERVAL_MS, so it sees time spent in any library (yfinance, pandas,
+SQLAlchemy, model forward passes) without instrumenting them. Request profiles
+sample every non-idle thread, since sync endpoints run in the threadpool;
+stacks are rooted at the thread name. Chronos workers (CHRONOS_WORKERS > 1) are separate
+processes and are not sampled.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(os.getcwd(), "profiles"))
+INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000
+
+# Leaf frames of threads that are parked (idle pool workers, background loops,
+# the event loop between requests); their samples are not recorded
+_IDLE = {("threading.py", "wait"), ("queue.py", "get"), ("selectors.py", "select")}
+
+_armed_lock = threading.Lock()
+_armed_inference_runs = 0
+
+
+class StackSampler:
+    """Samples Python stacks of `threads` (all but itself if None) into folded-stack counts."""
+
+    def __init__(self, threads=None, interval: float = INTERVAL):
+        self.threads = threads
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.threads is not None and ident not in self.threads):
+                    continue
+                if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profile:
+    """Context manager profiling the enclosed work into PROFILE_DIR/<profile_id>/."""
+
+    def __init__(self, target: str, profile_id: str = None, torch_trace: bool = False, threads=None):
+        self.target = target
+        self.id = profile_id or uuid.uuid4().hex[:12]
+        self.dir = os.path.join(PROFILE_DIR, self.id)
+        self.torch_trace = torch_trace
+        self.sampler = StackSampler(threads)
+        self._torch = None
+
+    def __enter__(self):
+        os.makedirs(self.dir, exist_ok=True)
+        self.started_at = datetime.utcnow()
+        self._t0 = time.perf_counter()
+        if self.torch_trace:
+            try:
+                import torch
+                activities = [torch.profiler.ProfilerActivity.CPU]
+                if torch.cuda.is_available():
+                    activities.append(torch.profiler.ProfilerActivity.CUDA)
+                self._torch = torch.profiler.profile(activities=activities)
+                self._torch.__enter__()
+            except Exception as e:
+                logger.warning(f"Profile {self.id}: torch profiler unavailable ({e})")
+                self._torch = None
+        self.sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.sampler.stop()
+        seconds = time.perf_counter() - self._t0
+        files = ["stacks.folded"]
+        try:
+            self.sampler.write(os.path.join(self.dir, "stacks.folded"))
+            if self._torch is not None:
+                self._torch.__exit__(None, None, None)
+                self._torch.export_chrome_trace(os.path.join(self.dir, "torch_trace.json"))
+                files.append("torch_trace.json")
+            with open(os.path.join(self.dir, "meta.json"), "w") as f:
+                json.dump({
+                    "id": self.id,
+                    "target": self.target,
+                    "started_at": self.started_at.isoformat(),
+                    "seconds": round(seconds, 3),
+                    "samples": self.sampler.samples,
+                    "interval_ms": self.sampler.interval * 1000,
+                    "error": repr(exc) if exc is not None else None,
+                    "files": files,
+                }, f, indent=2)
+            logger.info(f"Profile {self.id} ({self.target}, {seconds:.1f}s) written to {self.dir}")
+        except OSError as e:
+            logger.error(f"Profile {self.id}: could not write results: {e}")
+        return False
+
+
+def arm_inference(runs: int) -> int:
+    """Profiles the next `runs` inference runs; returns how many are armed."""
+    global _armed_inference_runs
+    with _armed_lock:
+        _armed_inference_runs = max(runs, 0)
+        return _armed_inference_runs
+
+
+def inference(run_id: str):
+    """Profile context for one inference run if one is armed, else a no-op context."""
+    global _armed_inference_runs
+    if not _armed_inference_runs:
+        return nullcontext()
+    with _armed_lock:
+        if not _armed_inference_runs:
+            return nullcontext()
+        _armed_inference_runs -= 1
+    return Profile(f"inference run {run_id}", run_id, torch_trace=True, threads={threading.get_ident()})
+
+
+def list_profiles() -> list:
+    """meta.json of every stored profile, newest first."""
+    out = []
+    if os.path.isdir(PROFILE_DIR):
+        for name in os.listdir(PROFILE_DIR):
+            try:
+                with open(os.path.join(PROFILE_DIR, name, "meta.json")) as f:
+                    out.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return sorted(out, key=lambda m: m.get("started_at", ""), reverse=True)
+
+
+def profile_file(profile_id: str, name: str):
+    """Path of a file listed in a profile's meta.json, or None."""
+    for meta in list_profiles():
+        if meta.get("id") == profile_id and name in meta.get("files", []):
+            return os.path.join(PROFILE_DIR, profile_id, name)
+    return None
+
+
+def _requested(scope) -> str:
+    """"" (off), "1" (sampler) or "torch" (sampler + torch profiler) for a request."""
+    for key, value in scope["headers"]:
+        if key == b"x-profile":
+            return value.decode("latin-1").strip().lower()
+    query = scope.get("query_string", b"")
+    if b"profile=" in query:
+        return parse_qs(query.decode("latin-1")).get("profile", [""])[-1].lower()
+    return ""
+
+
+class ProfilingMiddleware:
+    """Profiles requests that ask for it; a header scan and passthrough otherwise."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        mode = _requested(scope) if scope["type"] == "http" else ""
+        if mode in ("", "0", "false"):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(f"{scope['method']} {scope['path']}", torch_trace=mode == "torch")
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        with profile:
+            await self.app(scope, receive, send_with_id)
@@ -1,4 +1,9 @@
-from pydantic import BaseModel
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
 
 class StockCreate(BaseModel):
     ticker: str
@@ -10,3 +15,184 @@ class StockCreate(BaseModel):
     projectedGrowth1Y: float = 0.0
     riskScore: str = "Med"
     forecasts: dict = {}
+
+class StockOut(BaseModel):
+    """Public shape of a tracked stock (GET/POST /api/stocks)."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    name: Optional[str] = None
+    ticker: str
+    stack: Optional[str] = None
+    price: Optional[float] = None
+    change1M: Optional[float] = None
+    change6M: Optional[float] = None
+    change1Y: Optional[float] = None
+    change3Y: Optional[float] = None
+    projectedGrowth: Optional[float] = None
+    projectedGrowth1M: Optional[float] = None
+    projectedGrowth6M: Optional[float] = None
+    projectedGrowth1Y: Optional[float] = None
+    riskScore: Optional[str] = None
+    volatility: Optional[str] = None
+    history: List[float] = []
+    forecasts: Dict[str, Dict[str, float]] = {}
+    last_updated: Optional[datetime] = None
+
+class StockDeltaOut(BaseModel):
+    """GET /api/stocks?since=<version>: rows changed and deleted since that version."""
+    version: int
+    full: bool  # True if `stocks` is the whole list (since=0 or an unknown version)
+    stocks: List[StockOut]
+    deleted: List[str]  # ids of stocks removed since the version
+
+# { model: { horizon: growth % } }
+Forecasts = Dict[str, Dict[str, float]]
+
+class ForecastRunOut(BaseModel):
+    run_id: str
+    status: str
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    tickers: int
+    completed_results: int
+    stats: Optional[Dict[str, Any]] = None # per model: batch_sizes, oom_retries, peak_mb, ...
+
+class CovarianceOut(BaseModel):
+    """Daily-return covariance or correlation; matrix[i][j] pairs tickers[i] and tickers[j]."""
+    tickers: List[str]
+    method: str # rolling | ewm
+    kind: str # covariance | correlation
+    window: Optional[int] = None # rolling: trading days
+    halflife: Optional[float] = None # ewm: trading days
+    as_of: Optional[datetime] = None
+    matrix: List[List[Optional[float]]] # null where pairs overlap too little
+
+class IndicatorsOut(BaseModel):
+    """Latest technical indicators; values[name][i] belongs to tickers[i] (null until enough history)."""
+    tickers: List[str]
+    as_of: Optional[datetime] = None
+    values: Dict[str, List[Optional[float]]]
+
+class ForecastPredictionOut(BaseModel):
+    """One stored forecast with its predicted prices and the errors of matured horizons."""
+    model_config = ConfigDict(from_attributes=True)
+
+    run_id: str
+    model: str
+    created_at: Optional[datetime] = None
+    base_date: Optional[date] = None
+    base_price: Optional[float] = None
+    prices: Dict[str, float] = {}
+    errors: Dict[str, float] = {} # % error of the predicted price, per matured horizon
+    pending: List[str] = []
+
+class HorizonAccuracy(BaseModel):
+    count: int
+    MAPE: float
+    RMSE: float
+    bias: float # mean signed % error; > 0 means over-prediction
+    direction_accuracy: float
+
+# { model: { horizon: HorizonAccuracy } }
+ForecastAccuracyOut = Dict[str, Dict[str, HorizonAccuracy]]
+
+def stock_row(stock) -> dict:
+    """
+    StockOut-shaped dict read straight off the ORM row, for FastJSONResponse.
+    Skips Pydantic validation so history stays an ndarray that orjson writes natively.
+    """
+    return {field: getattr(stock, field) for field in StockOut.model_fields}
+
+RISK_SCORES = {"low": "Low", "med": "Med", "medium": "Med", "high": "High"}
+
+class BulkStockIn(BaseModel):
+    ticker: str
+    stack: str
+    riskScore: str = "Med"
+    name: Optional[str] = None
+
+    @field_validator("ticker")
+    @classmethod
+    def normalize_ticker(cls, v: str) -> str:
+        v = v.strip().upper()
+        if not v:
+            raise ValueError("ticker is empty")
+        return v
+
+    @field_validator("stack")
+    @classmethod
+    def normalize_stack(cls, v: str) -> str:
+        v = v.strip()
+        if not v:
+            raise ValueError("stack is empty")
+        return v
+
+    @field_validator("riskScore", mode="before")
+    @classmethod
+    def normalize_risk(cls, v):
+        if v is None or v == "":
+            return "Med"
+        risk = RISK_SCORES.get(str(v).strip().lower())
+        if not risk:
+            raise ValueError(f"riskScore must be Low, Med or High (got {v!r})")
+        return risk
+
+class BulkImportResult(BaseModel):
+    ticker: Optional[str] = None
+    status: str # added | exists | duplicate | invalid
+    id: Optional[str] = None
+    error: Optional[str] = None
+    row: Optional[int] = None # input row for entries that failed to parse
+
+class BulkImportResponse(BaseModel):
+    added: int
+    results: List[BulkImportResult]
+
+def parse_bulk_import(body: bytes, content_type: str) -> Tuple[List[dict], List[dict]]:
+    """
+    Parses a bulk import body: CSV (header: ticker,stack,risk[,name]) when the
+    content type is text/csv, otherwise JSON (a list or {"stocks": [...]}).
+    Returns (valid entries, invalid-row results); one bad row never fails the rest.
+    Rows are numbered from 1 in input order; valid entries keep that order.
+    """
+    errors = {}  # row -> problem found before validation
+    if "csv" in content_type:
+        reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+        rows = []
+        for i, raw in enumerate(reader, start=1):
+            # Values beyond the header's columns are collected under the None key
+            extra = raw.pop(None, None)
+            if extra:
+                errors[i] = f"{len(extra)} more field(s) than the header"
+            row = {k.strip().lower(): (v or "").strip() for k, v in raw.items()}
+            rows.append({
+                "ticker": row.get("ticker", ""),
+                "stack": row.get("stack", ""),
+                "riskScore": row.get("risk") or row.get("riskscore"),
+                "name": row.get("name") or None,
+            })
+    else:
+        data = json.loads(body or b"[]")
+        rows = data.get("stocks", []) if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError("expected a list of stocks")
+
+    entries, invalid = [], []
+    for i, row in enumerate(rows, start=1):
+        ticker = row.get("ticker") if isinstance(row, dict) else None
+        if i in errors:
+            invalid.append({"ticker": ticker, "status": "invalid", "error": errors[i], "row": i})
+            continue
+        try:
+            entries.append(BulkStockIn.model_validate(row).model_dump())
+        except ValidationError as e:
+            msg = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            invalid.append({"ticker": ticker, "status": "invalid", "error": msg, "row": i})
+    return entries, invalid
+
+def in_input_order(results: List[dict], invalid: List[dict]) -> List[dict]:
+    """Merges results for the valid entries (in order) with the invalid-row results by row number."""
+    by_row = {r["row"]: r for r in invalid}
+    valid = iter(results)
+    return [by_row[i] if i in by_row else next(valid) for i in range(1, len(results) + len(invalid) + 1)]
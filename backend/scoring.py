@@ -0,0 +1,123 @@
+"""
+Realized-accuracy scoring of stored forecasts.
+
+Every forecast result is also stored as a ForecastPrediction: the base bar it
+was made from (date and close) and a predicted close per horizon. Whenever a
+ticker's history is refreshed, score_ticker() looks only at that ticker's
+open predictions and scores the horizons that have matured since the last
+refresh (horizon = trading bars after the base bar). Each scored horizon is
+folded into running per-model, per-horizon sums in ForecastAccuracy, so
+summary() never rescans past predictions.
+
+Errors are measured on the current (split/dividend-adjusted) closes: the
+predicted move base -> horizon is compared with the realized move between the
+same two bars, expressed as the % error of the implied price.
+"""
+import logging
+from datetime import datetime
+
+from forecasting import engine
+from models import ForecastPrediction, ForecastAccuracy
+
+logger = logging.getLogger(__name__)
+
+
+def record_prediction(db, run_id: str, ticker: str, model_name: str, values: dict, base_price: float, base_date):
+    """
+    Stores the price-level forecast for one run/ticker/model.
+    `values` are growth % per horizon as produced by the forecasting engine.
+    """
+    base_price = float(base_price)
+    prices = {h: base_price * (1 + g / 100) for h, g in values.items() if h in engine.horizons}
+    db.add(ForecastPrediction(
+        run_id=run_id, ticker=ticker, model=model_name,
+        base_date=base_date, base_price=base_price, prices=prices,
+        pending=sorted(prices, key=engine.horizons.get), errors={},
+        open=base_date is not None and bool(prices),
+    ))
+
+
+def _accumulate(db, cache: dict, model_name: str, horizon: str, pct_error: float, direction_hit: bool):
+    key = (model_name, horizon)
+    row = cache.get(key) or db.get(ForecastAccuracy, key)
+    if row is None:
+        row = ForecastAccuracy(model=model_name, horizon=horizon, count=0, abs_pct_error_sum=0.0,
+                               sq_pct_error_sum=0.0, pct_error_sum=0.0, direction_hits=0)
+        db.add(row)
+        # Pending rows are invisible to db.get(): flush so a later ticker in this transaction finds it
+        db.flush()
+    cache[key] = row
+    row.count += 1
+    row.abs_pct_error_sum += abs(pct_error)
+    row.sq_pct_error_sum += pct_error * pct_error
+    row.pct_error_sum += pct_error
+    row.direction_hits += int(direction_hit)
+    row.updated_at = datetime.utcnow()
+
+
+def score_ticker(db, ticker: str, closes) -> int:
+    """
+    Scores the newly matured horizons of `ticker`'s open predictions against
+    `closes`, a daily close Series with a DatetimeIndex (oldest first).
+    Adds to the session without committing. Returns the number of horizons scored.
+    """
+    predictions = db.query(ForecastPrediction).filter(
+        ForecastPrediction.ticker == ticker, ForecastPrediction.open.is_(True)
+    ).all()
+    if not predictions or len(closes) == 0:
+        return 0
+
+    import numpy as np
+
+    dates = np.array([d.date() for d in closes.index], dtype="datetime64[D]")
+    values = np.asarray(closes, dtype=np.float64)
+    last = len(values) - 1
+    cache, scored = {}, 0
+
+    for p in predictions:
+        # Last bar on or before the base date
+        base = int(np.searchsorted(dates, np.datetime64(p.base_date, "D"), side="right")) - 1
+        if base < 0:
+            logger.warning(f"Forecast {p.run_id}/{ticker}/{p.model}: base bar {p.base_date} not in history, closing")
+            p.open = False
+            continue
+
+        pending, errors = list(p.pending or []), dict(p.errors or {})
+        for horizon in list(pending):
+            target = base + engine.horizons[horizon]
+            if target > last:
+                continue
+            realized, predicted = values[target] / values[base], p.prices[horizon] / p.base_price
+            if not (np.isfinite(realized) and realized > 0):
+                continue
+            pct_error = (predicted / realized - 1) * 100
+            errors[horizon] = pct_error
+            pending.remove(horizon)
+            _accumulate(db, cache, p.model, horizon, pct_error, (predicted >= 1) == (realized >= 1))
+            scored += 1
+
+        # Reassign so SQLAlchemy detects the JSON changes
+        p.pending, p.errors = pending, errors
+        p.open = bool(pending)
+    return scored
+
+
+def summary(db) -> dict:
+    """
+    { model: { horizon: { count, MAPE, RMSE, bias, direction_accuracy } } } from
+    the running aggregates; errors are % of the realized price.
+    """
+    out = {}
+    rows = sorted(db.query(ForecastAccuracy).all(), key=lambda r: (r.model, engine.horizons.get(r.horizon, 0)))
+    for row in rows:
+        if not row.count:
+            continue
+        n = row.count
+        out.setdefault(row.model, {})[row.horizon] = {
+            "count": n,
+            "MAPE": row.abs_pct_error_sum / n,
+            "RMSE": (row.sq_pct_error_sum / n) ** 0.5,
+            "bias": row.pct_error_sum / n,
+            "direction_accuracy": row.direction_hits / n,
+        }
+    return out
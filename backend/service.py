@@ -1,8 +1,12 @@
-import yfinance as yf
-from models import Stock
-import yfinance as yf
-from models import Stock
+from models import Stock, ForecastRun, ForecastResult
+import market_data
+import ticker_metadata
+import scoring
+import profiling
 import logging
+import os
+import threading
+import uuid
 from forecasting import engine
 from datetime import datetime
 
@@ -10,6 +14,56 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Tickers validated/fetched per provider call in bulk imports
+BULK_BATCH_SIZE = int(os.environ.get("BULK_IMPORT_BATCH_SIZE", "200"))
+
+def apply_history(stock_model, history_full, current_price=None):
+    """
+    Sets price, change %, history and volatility on a Stock from a daily OHLC
+    frame (oldest first). No I/O, so callers can batch fetches and commits.
+    """
+    if current_price is None:
+        current_price = history_full["Close"].iloc[-1]
+
+    # Calculate changes
+    def get_change(days_ago):
+        if len(history_full) < days_ago: return 0.0
+        old_price = history_full["Close"].iloc[-days_ago]
+        return ((current_price - old_price) / old_price) * 100
+
+    stock_model.price = float(current_price)
+    stock_model.change1M = float(get_change(21))
+    stock_model.change6M = float(get_change(126))
+    stock_model.change1Y = float(get_change(252))
+    stock_model.change3Y = float(get_change(252 * 3))
+    
+    stock_model.history = history_full["Close"].fillna(0).to_numpy()
+    stock_model.history_end = history_full.index[-1].date()
+    
+    # Volatility
+    if len(history_full) > 252:
+         daily_returns = history_full["Close"].tail(252).pct_change().std()
+    else:
+         daily_returns = history_full["Close"].pct_change().std()
+    
+    # Annualized Vol
+    annualized_vol = 0.0
+    if daily_returns:
+        annualized_vol = daily_returns * (252 ** 0.5) * 100
+        
+    if annualized_vol > 40:
+        stock_model.volatility = "High"
+    elif annualized_vol > 20:
+        stock_model.volatility = "Medium"
+    else:
+        stock_model.volatility = "Low"
+        
+    if not stock_model.forecasts:
+        stock_model.forecasts = {}
+
+    # Update timestamp
+    stock_model.last_updated = datetime.utcnow()
+
 def update_stock_in_db(db, stock_model):
     """
     Fetches latest data and updates the existing stock record.
@@ -17,7 +71,7 @@ def update_stock_in_db(db, stock_model):
     This function primarily updates price, history, and volatility.
     """
     try:
-        t = yf.Ticker(stock_model.ticker)
+        t = market_data.Ticker(stock_model.ticker)
         
         # history (fastest way for checking if valid)
         history_1d = t.history(period="1d")
@@ -28,44 +82,9 @@ def update_stock_in_db(db, stock_model):
         current_price = history_1d["Close"].iloc[-1]
         history_full = t.history(period="5y")
         
-        # Calculate changes
-        def get_change(days_ago):
-            if len(history_full) < days_ago: return 0.0
-            old_price = history_full["Close"].iloc[-days_ago]
-            return ((current_price - old_price) / old_price) * 100
-
-        stock_model.price = float(current_price)
-        stock_model.change1M = float(get_change(21))
-        stock_model.change6M = float(get_change(126))
-        stock_model.change1Y = float(get_change(252))
-        stock_model.change3Y = float(get_change(252 * 3))
-        
-        chart_history = history_full["Close"].fillna(0).tolist()
-        stock_model.history = [float(x) for x in chart_history]
-        
-        # Volatility
-        if len(history_full) > 252:
-             daily_returns = history_full["Close"].tail(252).pct_change().std()
-        else:
-             daily_returns = history_full["Close"].pct_change().std()
-        
-        # Annualized Vol
-        annualized_vol = 0.0
-        if daily_returns:
-            annualized_vol = daily_returns * (252 ** 0.5) * 100
-            
-        if annualized_vol > 40:
-            stock_model.volatility = "High"
-        elif annualized_vol > 20:
-            stock_model.volatility = "Medium"
-        else:
-            stock_model.volatility = "Low"
-            
-        if not stock_model.forecasts:
-            stock_model.forecasts = {}
-
-        # Update timestamp
-        stock_model.last_updated = datetime.utcnow()
+        apply_history(stock_model, history_full, current_price)
+        # Score forecasts whose horizons matured with the new bars
+        scoring.score_ticker(db, stock_model.ticker, history_full["Close"])
 
         db.commit()
         db.refresh(stock_model)
@@ -81,15 +100,15 @@ def add_stock(db, ticker: str, stack: str):
     if existing: return existing
 
     try:
-        t = yf.Ticker(ticker)
+        t = market_data.Ticker(ticker)
         history = t.history(period="1d")
         if history.empty: raise ValueError(f"Ticker {ticker} not found")
-        name = t.info.get('shortName') or t.info.get('longName') or ticker
+        meta = ticker_metadata.get_metadata(db, ticker, handle=t)
+        name = meta.name if meta else ticker
     except Exception as e:
         logger.error(f"Failed to verify ticker {ticker}: {e}")
         return None
 
-    import uuid
     new_id = str(uuid.uuid4())
     
     new_stock = Stock(
@@ -117,3 +136,198 @@ def add_stock(db, ticker: str, stack: str):
     
     update_stock_in_db(db, new_stock)
     return new_stock
+
+def bulk_add_stocks(db, entries):
+    """
+    Imports many stocks at once. `entries` are dicts with ticker, stack,
+    riskScore and optional name.
+
+    Tickers are validated and their 5y history fetched in batches of
+    BULK_BATCH_SIZE (one provider call per batch); every new row is inserted
+    in a single transaction. Returns one result per entry, in input order:
+    { ticker, status: added | exists | duplicate | invalid, id?, error? }
+    """
+    results, pending, seen = [], [], set()
+    tickers = [e["ticker"] for e in entries]
+    existing = {
+        s.ticker: s.id
+        for s in db.query(Stock.ticker, Stock.id).filter(Stock.ticker.in_(tickers))
+    } if tickers else {}
+
+    for entry in entries:
+        ticker = entry["ticker"]
+        if ticker in seen:
+            results.append({"ticker": ticker, "status": "duplicate"})
+            continue
+        seen.add(ticker)
+        if ticker in existing:
+            results.append({"ticker": ticker, "status": "exists", "id": existing[ticker]})
+            continue
+        result = {"ticker": ticker, "status": "pending"}
+        results.append(result)
+        pending.append((entry, result))
+
+    # Names come from the metadata cache; uncached tickers get a placeholder
+    # that the background metadata refresher fills in (no inline .info calls)
+    metadata = ticker_metadata.get_many(db, [entry["ticker"] for entry, _ in pending])
+
+    new_stocks = []
+    for i in range(0, len(pending), BULK_BATCH_SIZE):
+        batch = pending[i:i + BULK_BATCH_SIZE]
+        try:
+            histories = market_data.download([entry["ticker"] for entry, _ in batch], period="5y")
+        except Exception as e:
+            logger.error(f"Bulk fetch failed for batch {i // BULK_BATCH_SIZE}: {e}")
+            for _, result in batch:
+                result.update(status="invalid", error=f"fetch failed: {e}")
+            continue
+
+        for entry, result in batch:
+            history_full = histories.get(entry["ticker"])
+            if history_full is None:
+                result.update(status="invalid", error="no price data")
+                continue
+            stock = Stock(
+                id=str(uuid.uuid4()),
+                name=entry.get("name") or getattr(metadata.get(entry["ticker"]), "name", None) or entry["ticker"],
+                ticker=entry["ticker"],
+                stack=entry["stack"],
+                riskScore=entry.get("riskScore") or "Med",
+                projectedGrowth=0.0,
+                projectedGrowth1M=0.0,
+                projectedGrowth6M=0.0,
+                projectedGrowth1Y=0.0,
+                forecasts={},
+            )
+            apply_history(stock, history_full)
+            new_stocks.append(stock)
+            result.update(status="added", id=stock.id)
+        logger.info(f"Bulk import: batch {i // BULK_BATCH_SIZE + 1} fetched {len(histories)}/{len(batch)} tickers")
+
+    db.add_all(new_stocks)
+    db.commit()
+    ticker_metadata.enqueue([s.ticker for s in new_stocks if s.name == s.ticker])
+    return results
+
+# Run IDs executing in this process. Any other run still marked "running"
+# was interrupted (crash/restart) and can be resumed.
+_active_runs = set()
+_active_runs_lock = threading.Lock()
+
+def _claim_run(run_id: str) -> bool:
+    """Marks a run as executing here; False if another thread already is."""
+    with _active_runs_lock:
+        if run_id in _active_runs:
+            return False
+        _active_runs.add(run_id)
+        return True
+
+def _release_run(run_id: str):
+    with _active_runs_lock:
+        _active_runs.discard(run_id)
+
+def apply_forecast(db, ticker: str, model_name: str, values: dict):
+    """
+    Writes one model's forecast onto the Stock row, so readers always see the
+    newest completed value even while a run is still in progress.
+    """
+    stock = db.query(Stock).filter(Stock.ticker == ticker).first()
+    if not stock:
+        return None
+
+    # Reassign (not mutate) so SQLAlchemy detects the JSON change
+    forecasts = dict(stock.forecasts or {})
+    forecasts[model_name] = values
+    stock.forecasts = forecasts
+
+    if model_name == "timesfm":
+        # Update legacy fields with TimesFM 1M result as default
+        try:
+            stock.projectedGrowth1M = values["1m"]
+            stock.projectedGrowth6M = values["6m"]
+            stock.projectedGrowth1Y = values["1y"]
+            stock.projectedGrowth = stock.projectedGrowth1M
+        except KeyError:
+            pass
+    return stock
+
+def find_interrupted_run(db):
+    """Most recent run left "running" by a process that is no longer executing it."""
+    with _active_runs_lock:
+        active = list(_active_runs)
+    return (
+        db.query(ForecastRun)
+        .filter(ForecastRun.status == "running", ForecastRun.id.notin_(active))
+        .order_by(ForecastRun.started_at.desc())
+        .first()
+    )
+
+def run_forecasts(db, histories: dict, run=None):
+    """
+    Runs a forecasting cycle, or resumes `run`, persisting every ticker/model
+    result under the run ID as soon as it is produced. Results already stored
+    for the run are skipped, so a resumed run picks up where it stopped.
+    A run another thread is already executing is returned untouched.
+    """
+    if run is None:
+        run = ForecastRun(id=str(uuid.uuid4()), status="running", tickers=sorted(histories))
+        _claim_run(run.id)
+        db.add(run)
+        db.commit()
+    else:
+        if not _claim_run(run.id):
+            logger.info(f"Forecast run {run.id} is already being executed")
+            return run
+        run_tickers = set(run.tickers or [])
+        histories = {t: h for t, h in histories.items() if t in run_tickers}
+
+    done = {
+        (ticker, model_name)
+        for ticker, model_name in db.query(ForecastResult.ticker, ForecastResult.model)
+        .filter(ForecastResult.run_id == run.id)
+    }
+    if done:
+        logger.info(f"Resuming forecast run {run.id}: {len(done)} results already stored")
+
+    def save(ticker, model_name, values):
+        try:
+            db.add(ForecastResult(run_id=run.id, ticker=ticker, model=model_name, values=values))
+            stock = apply_forecast(db, ticker, model_name, values)
+            if stock is not None:
+                # Rows fetched before history_end existed fall back to the fetch date
+                base_date = stock.history_end or (stock.last_updated.date() if stock.last_updated else None)
+                scoring.record_prediction(db, run.id, ticker, model_name, values, histories[ticker][-1], base_date)
+            db.commit()
+        except Exception:
+            # Keep the session usable for the rest of the run; this result is redone on resume
+            db.rollback()
+            raise
+
+    stats = {}
+    try:
+        with profiling.inference(run.id):
+            engine.predict_all(histories, on_result=save, skip=done, stats=stats)
+        run.status = "completed"
+    except Exception as e:
+        logger.error(f"Forecast run {run.id} failed: {e}")
+        db.rollback()
+        run.status = "failed"
+    finally:
+        run.finished_at = datetime.utcnow()
+        # A resumed run keeps the report of phases it did not need to redo
+        run.stats = {**(run.stats or {}), **stats}
+        db.commit()
+        _release_run(run.id)
+
+    return run
+
+def resume_interrupted_run(db):
+    """Resumes the latest interrupted run, if any, using the current stored histories."""
+    run = find_interrupted_run(db)
+    if not run:
+        return None
+
+    stocks = db.query(Stock).filter(Stock.ticker.in_(run.tickers or [])).all()
+    histories = {s.ticker: s.history for s in stocks if s.history is not None and len(s.history) > 60}
+    logger.info(f"Resuming interrupted forecast run {run.id} ({len(histories)} stocks)...")
+    return run_forecasts(db, histories, run)
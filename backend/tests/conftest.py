@@ -0,0 +1,38 @@
+"""
+Shared test setup. Backend modules import flat from backend/, so it is put on
+sys.path; the settings below must be in place before the first of them is
+imported: a throwaway SQLite database, the fake market-data provider and
+scratch directories for the on-disk caches.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_scratch = tempfile.mkdtemp(prefix="stock-tracker-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_scratch, 'stocks.db')}")
+os.environ.setdefault("MARKET_DATA_PROVIDER", "fake")
+os.environ.setdefault("MODEL_CACHE_DIR", os.path.join(_scratch, "model_cache"))
+os.environ.setdefault("MARKET_CACHE_DIR", os.path.join(_scratch, "market_cache"))
+os.environ.setdefault("PROFILE_DIR", os.path.join(_scratch, "profiles"))
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables."""
+    import models  # noqa: F401  (registers the tables)
+    from database import Base, SessionLocal, engine
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    if "data_version" in sys.modules:
+        sys.modules["data_version"]._last = None
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,109 @@
+import pytest
+
+import batch_sizing
+
+MB = 2**20
+
+
+class FakeProbe:
+    """
+    Memory that grows by `cost` bytes per series in the batch being run, plus
+    `weights` bytes paged in by the first batch (memory-mapped weights).
+    """
+
+    def __init__(self, cost, weights=0):
+        self.cost = cost
+        self.weights = weights
+        self.resident = 1000 * MB
+        self.size = 0
+
+    def reset_peak(self):
+        pass
+
+    def current(self):
+        return self.resident
+
+    def peak(self):
+        peak = self.resident + self.weights + self.size * self.cost
+        self.resident += self.weights
+        self.weights = 0
+        return peak
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    """Fixed free memory and a fresh per-series cost table."""
+    monkeypatch.setattr(batch_sizing, "_per_series", {})
+    monkeypatch.setattr(batch_sizing, "HEADROOM_BYTES", 100 * MB)
+    monkeypatch.setattr(batch_sizing, "available_bytes", lambda device="cpu": 400 * MB)
+    probe = FakeProbe(cost=10 * MB, weights=800 * MB)
+    monkeypatch.setattr(batch_sizing, "MemoryProbe", lambda device: probe)
+    return probe
+
+
+def run(items, forward, memory, baseline=None):
+    def tracked(batch):
+        memory.size = len(batch)
+        forward(batch)
+    return batch_sizing.run_in_batches(items, tracked, "timesfm", "cpu", baseline=baseline)
+
+
+def test_warms_up_probes_with_one_series_then_sizes_from_free_memory(memory):
+    items = [(f"T{i}", None) for i in range(50)]
+
+    report = run(items, lambda batch: None, memory, baseline=900 * MB)
+
+    # The warm-up pages the weights in unmeasured; (400 - 100) MB free / (10 MB x 1.5 safety) = 20 per batch
+    assert report["batch_sizes"] == [1, 1, 20, 20, 8]
+    assert report["per_series_mb"] == 10.0
+    assert report["model_mb"] == 900.0
+    assert batch_sizing._per_series[("timesfm", "cpu", "fp32")] == 10 * MB
+
+
+def test_each_run_replaces_the_cost_left_by_the_previous_one(memory):
+    batch_sizing._per_series[("timesfm", "cpu", "fp32")] = 100 * MB
+
+    report = run([(f"T{i}", None) for i in range(30)], lambda batch: None, memory)
+
+    # Sized from the stored cost until this run has measured its own
+    assert report["batch_sizes"] == [2, 2, 20, 6]
+    assert batch_sizing._per_series[("timesfm", "cpu", "fp32")] == 10 * MB
+
+
+def test_allocation_failure_halves_the_batch_and_retries_the_same_series(memory):
+    seen = []
+
+    def forward(batch):
+        if len(batch) > 8:
+            raise RuntimeError("CUDA out of memory. Tried to allocate 2.00 GiB")
+        seen.extend(t for t, _ in batch)
+
+    report = run([(f"T{i}", None) for i in range(30)], forward, memory)
+
+    assert report["oom_retries"] == 2  # 20 -> 10 -> 5
+    assert report["batch_sizes"][:4] == [1, 1, 5, 5]
+    assert seen == [f"T{i}" for i in range(30)]
+
+
+def test_bad_series_fails_alone(memory):
+    def forward(batch):
+        if any(t == "BAD" for t, _ in batch):
+            raise ValueError("NaN in context")
+
+    items = [("A", None), ("B", None), ("BAD", None), ("C", None)]
+    batch_sizing._per_series[("timesfm", "cpu", "fp32")] = 10 * MB
+
+    report = run(items, forward, memory)
+
+    assert report["failed"] == 1
+    assert report["batch_sizes"] == [1, 1, 1]
+
+
+@pytest.mark.parametrize("exc, expected", [
+    (MemoryError(), True),
+    (RuntimeError("DefaultCPUAllocator: can't allocate memory: you tried to allocate 123 bytes"), True),
+    (RuntimeError("shape mismatch"), False),
+    (ValueError("out of memory"), False),
+])
+def test_is_oom(exc, expected):
+    assert batch_sizing.is_oom(exc) is expected
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+import market_data
+import service
+import ticker_metadata
+from models import Stock
+from schemas import in_input_order, parse_bulk_import
+
+
+def test_csv_rows_are_normalized_and_bad_rows_reported():
+    body = "\ufeffTicker,Stack,Risk,Name\n aapl ,Applications,high,Apple\nmsft,Cloud & Infra,,\n,Models,low,\nnvda,Hardware,extreme,\n"
+
+    entries, invalid = parse_bulk_import(body.encode("utf-8"), "text/csv; charset=utf-8")
+
+    assert entries == [
+        {"ticker": "AAPL", "stack": "Applications", "riskScore": "High", "name": "Apple"},
+        {"ticker": "MSFT", "stack": "Cloud & Infra", "riskScore": "Med", "name": None},
+    ]
+    assert [(r["row"], r["ticker"]) for r in invalid] == [(3, ""), (4, "nvda")]
+    assert all(r["status"] == "invalid" for r in invalid)
+
+
+def test_json_accepts_a_list_or_a_stocks_object():
+    rows = [{"ticker": "amd", "stack": "Hardware"}]
+    for body in (rows, {"stocks": rows}):
+        entries, invalid = parse_bulk_import(json.dumps(body).encode(), "application/json")
+        assert [e["ticker"] for e in entries] == ["AMD"] and invalid == []
+
+    with pytest.raises(ValueError):
+        parse_bulk_import(b'{"stocks": "AMD"}', "application/json")
+
+
+def test_bulk_add_batches_fetches_and_reports_every_entry(db, monkeypatch):
+    db.add(Stock(id="old", ticker="OLD", name="Old", stack="Models", history=[1.0], forecasts={}))
+    db.commit()
+    calls = []
+
+    def download(symbols, period="5y"):
+        calls.append(list(symbols))
+        return {s: market_data.FakeTicker(s).history(period=period) for s in symbols if s != "GONE"}
+
+    monkeypatch.setattr(service, "BULK_BATCH_SIZE", 2)
+    monkeypatch.setattr(service.market_data, "download", download)
+    monkeypatch.setattr(ticker_metadata, "enqueue", lambda tickers: None)
+    entries = [{"ticker": t, "stack": "Models", "riskScore": "Med", "name": None}
+               for t in ("AAA", "OLD", "BBB", "AAA", "GONE", "CCC")]
+
+    results = service.bulk_add_stocks(db, entries)
+
+    assert [r["status"] for r in results] == ["added", "exists", "added", "duplicate", "invalid", "added"]
+    assert results[1]["id"] == "old"
+    assert calls == [["AAA", "BBB"], ["GONE", "CCC"]]
+    added = db.query(Stock).filter(Stock.ticker.in_(["AAA", "BBB", "CCC"])).all()
+    assert len(added) == 3
+    assert all(s.history is not None and len(s.history) == 1260 for s in added)
+
+
+def test_csv_row_with_extra_fields_or_empty_stack_is_invalid():
+    body = "ticker,stack,risk\namd,Hardware,low,oops\nintc, ,med\ntsm,Hardware,high\n"
+
+    entries, invalid = parse_bulk_import(body.encode(), "text/csv")
+
+    assert [e["ticker"] for e in entries] == ["TSM"]
+    assert [(r["row"], r["ticker"]) for r in invalid] == [(1, "amd"), (2, "intc")]
+    assert "more field" in invalid[0]["error"] and "stack" in invalid[1]["error"]
+
+
+def test_results_are_merged_back_in_input_order():
+    results = [{"ticker": "AAA", "status": "added"}, {"ticker": "CCC", "status": "exists"}]
+    invalid = [{"ticker": "", "status": "invalid", "row": 1}, {"ticker": "bb", "status": "invalid", "row": 3}]
+
+    assert [r["ticker"] for r in in_input_order(results, invalid)] == ["", "AAA", "bb", "CCC"]
@@ -0,0 +1,52 @@
+import multiprocessing.spawn
+import os
+import subprocess
+import sys
+import textwrap
+
+import chronos_shards
+from conftest import BACKEND_DIR
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_plan_respects_cores_memory_and_series(monkeypatch):
+    monkeypatch.setattr(chronos_shards, "cpu_count", lambda: 8)
+    monkeypatch.setattr(chronos_shards.batch_sizing, "HEADROOM_BYTES", 0)
+    monkeypatch.setattr(chronos_shards, "WORKER_MEMORY_BYTES", 1000)
+    monkeypatch.setattr(chronos_shards.batch_sizing, "available_bytes", lambda device="cpu": 3500)
+
+    assert chronos_shards.plan(100, "1") == (1, 8)
+    assert chronos_shards.plan(100, "auto") == (3, 2)  # memory fits 3
+    assert chronos_shards.plan(2, "4") == (2, 4)  # one series per worker at most
+    assert chronos_shards.plan(100, "lots") == (1, 8)
+
+
+def test_workers_are_not_pointed_at_the_parent_main_module():
+    with chronos_shards._main_pinned():
+        data = multiprocessing.spawn.get_preparation_data("chronos-worker-0")
+    assert data["init_main_from_name"] == "chronos_shards"
+    assert "init_main_from_path" not in data
+
+
+def test_spawned_workers_do_not_re_run_the_launching_script(tmp_path):
+    marker = tmp_path / "imports.log"
+    script = tmp_path / "server.py"
+    script.write_text(textwrap.dedent(f"""
+        import sys
+        sys.path[:0] = [{BACKEND_DIR!r}, {TESTS_DIR!r}]
+        with open({str(marker)!r}, "a") as f:
+            f.write("imported\\n")
+
+        if __name__ == "__main__":
+            import chronos_shards, shard_stub
+            chronos_shards._worker = shard_stub.worker
+            stats = {{}}
+            results = chronos_shards.run({{"AAA": [1.0], "BBB": [1.0], "CCC": [1.0]}}, 2, 1, stats=stats)
+            print(sorted(results), stats["failed"])
+    """))
+
+    out = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120, check=True).stdout
+
+    assert out.strip() == "['AAA', 'BBB', 'CCC'] 0"
+    assert marker.read_text() == "imported\n"
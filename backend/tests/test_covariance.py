@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import covariance
+from models import Stock
+from universe import close_matrix, new_bars
+from universe_data import random_walks, store
+
+
+def stored_returns(db):
+    stocks = db.query(Stock).order_by(Stock.ticker).all()
+    closes = close_matrix([s.history for s in stocks])
+    return pd.DataFrame(covariance.returns_matrix(closes), columns=[s.ticker for s in stocks])
+
+
+@pytest.mark.parametrize("kind", ["covariance", "correlation"])
+def test_rolling_matches_pandas_pairwise(db, kind):
+    store(db, random_walks())
+    engine = covariance.CovarianceEngine("rolling")
+    engine.sync(db)
+
+    tickers, matrix = engine.matrix(kind=kind)
+
+    window = stored_returns(db).iloc[-covariance.WINDOW:]
+    expected = window.cov(min_periods=covariance.MIN_PERIODS) if kind == "covariance" else window.corr(min_periods=covariance.MIN_PERIODS)
+    np.testing.assert_allclose(matrix, expected.loc[tickers, tickers].to_numpy(), rtol=1e-8, atol=1e-12)
+
+
+def test_ewm_matches_pandas(db):
+    store(db, random_walks())
+    engine = covariance.CovarianceEngine("ewm")
+    engine.sync(db)
+
+    tickers, matrix = engine.matrix(kind="covariance")
+
+    returns = stored_returns(db)
+    expected = returns.ewm(halflife=covariance.HALFLIFE).cov().loc[returns.index[-1]]
+    np.testing.assert_allclose(matrix, expected.loc[tickers, tickers].to_numpy(), rtol=1e-8, atol=1e-12)
+
+
+@pytest.mark.parametrize("method", covariance.METHODS)
+def test_covariance_incremental_sync_matches_rebuild(db, method):
+    walks = random_walks(extra=5)
+    store(db, walks, cut=5)
+    engine = covariance.CovarianceEngine(method)
+    engine.sync(db)
+
+    store(db, walks, when=datetime(2026, 1, 2) + timedelta(days=7))
+    engine.sync(db)
+    rebuilt = covariance.CovarianceEngine(method)
+    rebuilt.rebuild(db)
+
+    assert engine.updates == 5
+    np.testing.assert_allclose(engine.matrix()[1], rebuilt.matrix()[1], rtol=1e-9, atol=1e-12)
+
+
+def test_new_bars_treats_a_rewritten_last_bar_as_a_revision():
+    history = np.arange(1.0, 11.0)
+    tail = history[-5:-2].copy()
+
+    assert new_bars(tail, history) == (2, False)
+    tail[-1] += 0.5
+    assert new_bars(tail, history) == (2, True)
+    tail[0] += 0.5
+    assert new_bars(tail, history) is None
+
+
+@pytest.mark.parametrize("method", covariance.METHODS)
+def test_revised_last_bar_is_swapped_out_without_a_rebuild(db, method):
+    walks = random_walks(extra=2)
+    store(db, walks, cut=2, partial=1.03)
+    engine = covariance.CovarianceEngine(method)
+    engine.sync(db)
+
+    store(db, walks, when=datetime(2026, 1, 2) + timedelta(days=3))
+    engine.sync(db)
+    rebuilt = covariance.CovarianceEngine(method)
+    rebuilt.rebuild(db)
+
+    assert engine.updates == 2
+    np.testing.assert_allclose(engine.matrix()[1], rebuilt.matrix()[1], rtol=1e-9, atol=1e-12)
+
+
+def test_removed_ticker_is_dropped(db):
+    store(db, random_walks())
+    engine = covariance.CovarianceEngine("rolling")
+    engine.sync(db)
+    before = dict(zip(engine.tickers, range(len(engine.tickers))))
+    _, full = engine.matrix()
+
+    db.delete(db.get(Stock, "ccc"))
+    db.commit()
+    engine.sync(db)
+
+    tickers, matrix = engine.matrix()
+    assert tickers == ["AAA", "BBB", "DDD"]
+    idx = [before[t] for t in tickers]
+    np.testing.assert_allclose(matrix, full[np.ix_(idx, idx)])
+    with pytest.raises(KeyError):
+        engine.matrix(["CCC"])
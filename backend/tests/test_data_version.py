@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import data_version
+import service
+from models import Stock
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    import covariance
+    import indicators
+    import main
+    from fastapi.testclient import TestClient
+
+    for ticker in ("AAA", "BBB", "CCC"):
+        assert service.add_stock(db, ticker, "Test")
+    # Covariance/indicator folding is covered elsewhere; keep the refresh to the rows
+    monkeypatch.setattr(covariance, "update", lambda db: None)
+    monkeypatch.setattr(indicators, "update", lambda db: None)
+    return TestClient(main.app)
+
+
+def _since(client, version):
+    body = client.get("/api/stocks", params={"since": version}).json()
+    return body["version"], sorted(s["ticker"] for s in body["stocks"]), body["deleted"]
+
+
+def test_changes_and_tombstones_are_sent_once(db, client):
+    client.post("/api/refresh")
+    version, tickers, deleted = _since(client, 0)
+    assert tickers == ["AAA", "BBB", "CCC"] and deleted == []
+
+    stock = db.query(Stock).filter(Stock.ticker == "AAA").one()
+    stock.stack = "Other"
+    db.commit()
+    gone = db.query(Stock).filter(Stock.ticker == "BBB").one()
+    gone_id = gone.id
+    db.delete(gone)
+    db.commit()
+
+    newer, tickers, deleted = _since(client, version)
+    assert newer == version + 2
+    assert tickers == ["AAA"] and deleted == [gone_id]
+    assert _since(client, newer) == (newer, [], [])
+
+
+def test_a_refresh_that_changes_nothing_does_not_bump_versions(db, client):
+    client.post("/api/refresh")
+    version = client.get("/api/stocks").headers["X-Data-Version"]
+
+    client.post("/api/refresh")
+
+    assert client.get("/api/stocks").headers["X-Data-Version"] == version
+    assert _since(client, int(version)) == (int(version), [], [])
+
+
+def test_histories_compare_at_the_stored_dtype(db):
+    stock = Stock(id="s", name="S", ticker="S", stack="Test")
+    stock.history = np.linspace(10, 11, 50)  # float64, not exactly representable in float32
+    db.add(stock)
+    db.commit()
+    version = stock.version
+
+    stock.history = np.linspace(10, 11, 50)
+    db.commit()
+    assert stock.version == version
+
+    stock.history = np.linspace(10, 12, 50)
+    db.commit()
+    assert stock.version == data_version.current(db) > version
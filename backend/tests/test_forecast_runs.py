@@ -0,0 +1,109 @@
+from datetime import date
+
+import numpy as np
+
+import service
+from models import ForecastPrediction, ForecastResult, ForecastRun, Stock
+
+
+def add_stock(db, ticker, closes):
+    db.add(Stock(id=ticker.lower(), ticker=ticker, name=ticker, stack="Tech", price=float(closes[-1]),
+                 history=np.asarray(closes, dtype=np.float64), history_end=date(2026, 1, 2), forecasts={}))
+    db.commit()
+
+
+def fake_predict_all(results):
+    """predict_all stand-in emitting `results` ({ (ticker, model): values }) through on_result."""
+    def predict_all(histories, on_result=None, skip=None, stats=None):
+        for (ticker, model_name), values in results.items():
+            if (ticker, model_name) in (skip or set()):
+                continue
+            try:
+                on_result(ticker, model_name, values)
+            except Exception:
+                pass  # the engine logs and moves on to the next ticker
+        return {}
+    return predict_all
+
+
+def test_failed_save_does_not_poison_the_rest_of_the_run(db, monkeypatch):
+    add_stock(db, "AAA", [10.0] * 70)
+    add_stock(db, "BBB", [20.0] * 70)
+    unserializable = {"1d": object()}
+    monkeypatch.setattr(service.engine, "predict_all", fake_predict_all({
+        ("AAA", "timesfm"): unserializable,
+        ("BBB", "timesfm"): {"1d": 1.0, "1m": 2.0},
+    }))
+
+    run = service.run_forecasts(db, {"AAA": [10.0] * 70, "BBB": [20.0] * 70})
+
+    assert run.status == "completed"
+    saved = db.query(ForecastResult).filter(ForecastResult.run_id == run.id).all()
+    assert [(r.ticker, r.values) for r in saved] == [("BBB", {"1d": 1.0, "1m": 2.0})]
+    assert db.query(Stock).filter(Stock.ticker == "BBB").one().forecasts == {"timesfm": {"1d": 1.0, "1m": 2.0}}
+
+
+def test_resumed_run_skips_stored_results(db, monkeypatch):
+    add_stock(db, "AAA", [10.0] * 70)
+    db.add(ForecastRun(id="run-1", status="running", tickers=["AAA"]))
+    db.add(ForecastResult(run_id="run-1", ticker="AAA", model="timesfm", values={"1d": 1.0}))
+    db.commit()
+    emitted = []
+
+    def predict_all(histories, on_result=None, skip=None, stats=None):
+        assert skip == {("AAA", "timesfm")}
+        emitted.append("chronos")
+        on_result("AAA", "chronos", {"1d": -1.0})
+        return {}
+
+    monkeypatch.setattr(service.engine, "predict_all", predict_all)
+
+    run = service.resume_interrupted_run(db)
+
+    assert run.id == "run-1" and run.status == "completed"
+    assert emitted == ["chronos"]
+    assert db.query(ForecastPrediction).filter(ForecastPrediction.run_id == "run-1").count() == 1
+
+
+def test_inference_refresh_finishes_an_interrupted_run_then_forecasts_every_stock(db, monkeypatch):
+    import covariance
+    import indicators
+    import main
+    from fastapi.testclient import TestClient
+
+    for ticker in ("AAA", "BBB"):
+        assert service.add_stock(db, ticker, "Test")
+    db.add(ForecastRun(id="old-run", status="running", tickers=["AAA"]))
+    db.commit()
+    monkeypatch.setattr(covariance, "update", lambda db: None)
+    monkeypatch.setattr(indicators, "update", lambda db: None)
+    calls = []
+
+    def predict_all(histories, on_result=None, skip=None, stats=None):
+        calls.append(sorted(histories))
+        for ticker in histories:
+            on_result(ticker, "timesfm", {"1d": 1.0})
+        return {}
+
+    monkeypatch.setattr(service.engine, "predict_all", predict_all)
+
+    body = TestClient(main.app).post("/api/refresh", params={"run_inference": "true"}).json()
+
+    assert calls == [["AAA"], ["AAA", "BBB"]]
+    assert body["resumed_run_id"] == "old-run"
+    db.expire_all()
+    runs = {r.id: r for r in db.query(ForecastRun)}
+    assert runs["old-run"].status == "completed"
+    assert runs[body["run_id"]].status == "completed" and runs[body["run_id"]].tickers == ["AAA", "BBB"]
+    assert service._active_runs == set()
+
+
+def test_a_run_claimed_elsewhere_is_not_interrupted(db):
+    db.add(ForecastRun(id="busy", status="running", tickers=["AAA"]))
+    db.commit()
+    assert service._claim_run("busy")
+    try:
+        assert service.find_interrupted_run(db) is None
+    finally:
+        service._release_run("busy")
+    assert service.find_interrupted_run(db).id == "busy"
@@ -0,0 +1,82 @@
+import sys
+import types
+from datetime import date
+
+import numpy as np
+import pytest
+
+import service
+from forecasting import engine
+from models import ForecastPrediction, ForecastResult, Stock
+
+
+class FakeTimesFM:
+    """TimesFM stand-in: a float32 curve rising 1% per step from each context's last value."""
+
+    def __init__(self):
+        self.horizons = []
+        self.compiled = []
+
+    def compile(self, config):
+        self.compiled.append((config["per_core_batch_size"], config["max_horizon"]))
+
+    def forecast(self, inputs, horizon):
+        self.horizons.append(horizon)
+        steps = np.arange(1, horizon + 1, dtype=np.float32)
+        return np.stack([np.float32(c[-1]) * (1 + steps / 100) for c in inputs]), None
+
+
+@pytest.fixture(autouse=True)
+def timesfm(monkeypatch):
+    monkeypatch.setitem(sys.modules, "timesfm", types.SimpleNamespace(ForecastConfig=dict))
+
+
+def test_timesfm_growth_is_plain_float_and_decodes_only_to_the_longest_horizon():
+    model = FakeTimesFM()
+    history = np.full(100, 50.0, dtype=np.float32)
+
+    [growth] = engine._timesfm_forecast(model, "fp32", [history], ["1d", "1m"])
+
+    assert model.horizons == [21]
+    assert model.compiled == [(1, 128)]
+    assert set(growth) == {"1d", "1m"}
+    assert all(type(v) is float for v in growth.values())
+    assert abs(growth["1m"] - 21.0) < 1e-3
+
+
+def test_timesfm_is_compiled_for_the_batch_size_and_output_patches():
+    model = FakeTimesFM()
+    histories = [np.full(100, 50.0, dtype=np.float32)] * 4
+
+    engine._timesfm_forecast(model, "fp32", histories, ["1w"])
+    engine._timesfm_forecast(model, "fp32", histories, ["1d", "6m"])
+    engine._timesfm_forecast(model, "fp32", histories)
+    engine._timesfm_forecast(model, "fp32", histories[:3])
+
+    assert model.compiled == [(4, 128), (4, 256), (3, 256)]
+
+
+def test_forecast_from_a_decoded_history_is_persisted(db, monkeypatch):
+    db.add(Stock(id="aaa", ticker="AAA", name="AAA", stack="Tech", price=100.0, forecasts={},
+                 history=np.linspace(90.0, 100.0, 300), history_end=date(2026, 1, 2)))
+    db.commit()
+    db.expire_all()
+    history = db.query(Stock).one().history
+    assert history.dtype == np.float32  # as stored, not as written
+
+    def predict_all(histories, on_result=None, skip=None, stats=None):
+        for ticker, h in histories.items():
+            [values] = engine._timesfm_forecast(FakeTimesFM(), "fp32", [h])
+            on_result(ticker, "timesfm", values)
+        return {}
+
+    monkeypatch.setattr(service.engine, "predict_all", predict_all)
+
+    run = service.run_forecasts(db, {"AAA": history})
+
+    assert run.status == "completed"
+    result = db.query(ForecastResult).filter(ForecastResult.run_id == run.id).one()
+    assert set(result.values) == set(engine.horizons)
+    prediction = db.query(ForecastPrediction).filter(ForecastPrediction.run_id == run.id).one()
+    assert abs(prediction.prices["1d"] - 101.0) < 1e-3
+    assert db.query(Stock).one().forecasts["timesfm"] == result.values
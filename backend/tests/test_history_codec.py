@@ -0,0 +1,37 @@
+import json
+
+import numpy as np
+import pytest
+
+import history_codec
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float64"])
+@pytest.mark.parametrize("codec", ["none", "zlib"])
+def test_round_trip(dtype, codec):
+    values = np.linspace(10.0, 250.0, 1261)
+
+    decoded = history_codec.decode(history_codec.encode(values, dtype=dtype, codec=codec))
+
+    assert decoded.dtype == np.dtype(dtype)
+    np.testing.assert_array_equal(decoded, values.astype(dtype))
+
+
+def test_uncompressed_blob_decodes_to_a_read_only_view():
+    decoded = history_codec.decode(history_codec.encode([1.0, 2.0, 3.0], codec="none"))
+
+    assert not decoded.flags.writeable
+    with pytest.raises(ValueError):
+        decoded[0] = 5.0
+
+
+def test_legacy_json_rows_still_decode():
+    legacy = json.dumps([1.5, 2.5, 3.5])
+
+    np.testing.assert_array_equal(history_codec.decode(legacy), [1.5, 2.5, 3.5])
+    np.testing.assert_array_equal(history_codec.decode(legacy.encode()), [1.5, 2.5, 3.5])
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        history_codec.encode([1.0], codec="lz4")
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from models import Stock
+from universe import close_matrix
+from universe_data import random_walks, store
+
+
+def test_indicators_match_pandas(db):
+    store(db, random_walks())
+    engine = indicators.IndicatorEngine()
+    engine.sync(db)
+
+    tickers, values = engine.latest()
+
+    stocks = db.query(Stock).order_by(Stock.ticker).all()
+    closes = pd.DataFrame(close_matrix([s.history for s in stocks]), columns=[s.ticker for s in stocks])
+    np.testing.assert_allclose(values["sma_50"], closes.rolling(50).mean().iloc[-1][tickers], rtol=1e-10)
+    np.testing.assert_allclose(values["ema_12"], closes.ewm(span=12, adjust=False, ignore_na=True).mean().iloc[-1][tickers], rtol=1e-10)
+    assert np.isnan(values["sma_200"][tickers.index("DDD")])  # 120 bars
+    assert np.all((values["rsi_14"] >= 0) & (values["rsi_14"] <= 100))
+    assert np.all(values["drawdown"] <= 0) and np.all(values["max_drawdown"] <= values["drawdown"])
+
+
+def test_indicators_incremental_sync_matches_rebuild(db):
+    walks = random_walks(extra=3)
+    store(db, walks, cut=3)
+    engine = indicators.IndicatorEngine()
+    engine.sync(db)
+
+    store(db, walks, when=datetime(2026, 1, 2) + timedelta(days=5))
+    engine.sync(db)
+    rebuilt = indicators.IndicatorEngine()
+    rebuilt.rebuild(db)
+
+    assert engine.updates == 3
+    incremental, full = engine.latest()[1], rebuilt.latest()[1]
+    for name in indicators.NAMES:
+        np.testing.assert_allclose(incremental[name], full[name], rtol=1e-9, equal_nan=True, err_msg=name)
+
+
+def test_indicators_revised_last_bar_matches_rebuild(db):
+    walks = random_walks(extra=2)
+    store(db, walks, cut=2, partial=0.97)
+    engine = indicators.IndicatorEngine()
+    engine.sync(db)
+
+    store(db, walks, when=datetime(2026, 1, 2) + timedelta(days=3))
+    engine.sync(db)
+    rebuilt = indicators.IndicatorEngine()
+    rebuilt.rebuild(db)
+
+    assert engine.updates == 2
+    incremental, full = engine.latest()[1], rebuilt.latest()[1]
+    for name in indicators.NAMES:
+        np.testing.assert_allclose(incremental[name], full[name], rtol=1e-9, equal_nan=True, err_msg=name)
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+
+from conftest import BACKEND_DIR
+
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+import bench_utils  # noqa: E402
+import market_data  # noqa: E402
+import synthetic_db  # noqa: E402
+from models import Stock  # noqa: E402
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert bench_utils.percentile(values, 50) == 50
+    assert bench_utils.percentile(values, 99) == 99
+    assert bench_utils.percentile(values, 100) == 100
+    assert bench_utils.percentile([], 95) == 0.0
+
+
+def test_fake_closes_are_deterministic_suffixes():
+    full = market_data.fake_closes("SPY")
+    np.testing.assert_array_equal(market_data.fake_closes("spy", 252), full[-252:])
+    assert not np.array_equal(market_data.fake_closes("QQQ", 252), full[-252:])
+
+
+def test_fake_history_matches_the_requested_period():
+    frame = market_data.FakeTicker("AAA").history(period="1y")
+    assert len(frame) == 252
+    np.testing.assert_allclose(frame["Close"].to_numpy(), market_data.fake_closes("AAA", 252))
+
+
+def test_synthetic_db_rows_match_what_a_fake_refresh_writes(tmp_path):
+    path = synthetic_db.build(str(tmp_path / "synthetic.db"), 25, days=300)
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(Stock)).scalar() == 25
+        history, price = conn.execute(
+            select(Stock.history, Stock.price).where(Stock.ticker == synthetic_db.synthetic_ticker(3))
+        ).one()
+    engine.dispose()
+
+    closes = market_data.fake_closes(synthetic_db.synthetic_ticker(3), 300)
+    np.testing.assert_allclose(history, closes, rtol=1e-6)
+    assert price == float(closes[-1])
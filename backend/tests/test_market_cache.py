@@ -0,0 +1,153 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import market_cache
+import market_data
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(market_cache, "MARKET_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(market_data, "CACHE_MODE", "readthrough")
+    return tmp_path
+
+
+class Provider:
+    """Upstream serving the last N bars of one series per period, counting calls."""
+
+    def __init__(self, closes):
+        self.closes = np.asarray(closes, dtype=float)
+        self.periods = []
+
+    def frame(self, period):
+        days = market_data._PERIOD_DAYS[period]
+        close = self.closes[-days:]
+        index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=len(self.closes))[-len(close):]
+        return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close,
+                             "Volume": np.full(len(close), 1e6)}, index=index)
+
+    def history(self, period):
+        self.periods.append(period)
+        return self.frame(period)
+
+    def download(self, symbols, period):
+        self.periods.append((tuple(symbols), period))
+        return {s: self.frame(period) for s in symbols}
+
+
+def _entry(dates, closes, **meta):
+    columns = {c: np.asarray(closes, dtype=float) for c in market_cache.COLUMNS}
+    return market_cache.Entry(np.asarray(dates, dtype="datetime64[D]"), columns, **meta)
+
+
+def _age(symbol, seconds):
+    entry = market_cache.load(symbol)
+    entry.fetched_at -= seconds
+    market_cache.store(symbol, entry)
+
+
+def test_merge_appends_new_bars_and_replaces_the_partial_last_one():
+    dates = np.arange("2024-01-01", "2024-01-11", dtype="datetime64[D]")
+    cached = _entry(dates, np.arange(10.0), span=10)
+    tail = _entry(np.arange("2024-01-09", "2024-01-13", dtype="datetime64[D]"), [8.0, 9.5, 10.0, 11.0])
+
+    merged = market_cache._merge(cached, tail)
+
+    assert len(merged) == 12 and merged.span == 10
+    assert merged.columns["Close"].tolist() == [*range(9), 9.5, 10.0, 11.0]
+
+
+def test_merge_refuses_re_adjusted_history():
+    dates = np.arange("2024-01-01", "2024-01-11", dtype="datetime64[D]")
+    cached = _entry(dates, np.arange(10.0), span=10)
+    tail = _entry(np.arange("2024-01-09", "2024-01-12", dtype="datetime64[D]"), [7.9, 9.0, 10.0])
+
+    assert market_cache._merge(cached, tail) is None
+
+
+def test_fresh_cache_is_served_without_the_provider():
+    provider = Provider(np.linspace(10, 20, 600))
+
+    first = market_cache.history("aaa", "1y", lambda: provider)
+    second = market_cache.history("AAA", "6mo", lambda: provider)
+
+    assert provider.periods == ["1y"]
+    assert len(first) == 252 and len(second) == 126
+    assert second["Close"].tolist() == first["Close"].tolist()[-126:]
+
+
+def test_stale_cache_fetches_only_the_tail():
+    provider = Provider(np.linspace(10, 20, 600))
+    market_cache.history("AAA", "1y", lambda: provider)
+    _age("AAA", market_cache.TTL_SECONDS + 1)
+
+    frame = market_cache.history("AAA", "1y", lambda: provider)
+
+    assert provider.periods == ["1y", "5d"]
+    assert frame["Close"].tolist() == provider.frame("1y")["Close"].tolist()
+    assert market_cache._fresh(market_cache.load("AAA"))
+
+
+def test_longer_period_than_cached_fetches_the_full_range():
+    provider = Provider(np.linspace(10, 20, 600))
+    market_cache.history("AAA", "6mo", lambda: provider)
+
+    frame = market_cache.history("AAA", "2y", lambda: provider)
+
+    assert provider.periods == ["6mo", "2y"]
+    assert len(frame) == 504 and market_cache.load("AAA").span == 504
+
+
+def test_re_adjusted_upstream_history_is_fetched_again():
+    provider = Provider(np.linspace(10, 20, 600))
+    market_cache.history("AAA", "1y", lambda: provider)
+    _age("AAA", market_cache.TTL_SECONDS + 1)
+    provider.closes = provider.closes * 0.5  # e.g. a 2:1 split, adjusted back
+
+    frame = market_cache.history("AAA", "1y", lambda: provider)
+
+    assert provider.periods == ["1y", "5d", "1y"]
+    assert frame["Close"].tolist() == pytest.approx(provider.frame("1y")["Close"].tolist())
+
+
+def test_download_batches_tails_and_full_fetches():
+    provider = Provider(np.linspace(10, 20, 600))
+    market_cache.download(["AAA", "BBB"], "1y", provider.download)
+    _age("AAA", market_cache.TTL_SECONDS + 1)
+    provider.periods.clear()
+
+    frames = market_cache.download(["AAA", "BBB", "CCC"], "1y", provider.download)
+
+    assert provider.periods == [(("AAA",), "5d"), (("CCC",), "1y")]
+    assert set(frames) == {"AAA", "BBB", "CCC"}
+    assert all(len(f) == 252 for f in frames.values())
+
+
+def test_replay_never_calls_the_provider(monkeypatch):
+    provider = Provider(np.linspace(10, 20, 600))
+    market_cache.history("AAA", "2y", lambda: provider)
+    _age("AAA", 365 * 86400)
+    monkeypatch.setattr(market_data, "CACHE_MODE", "replay")
+
+    def offline():
+        raise AssertionError("provider called in replay mode")
+
+    frame = market_cache.history("AAA", "1mo", offline)
+    assert len(frame) == 21 and frame.index[-1] == provider.frame("1d").index[-1]
+    assert market_cache.history("ZZZ", "1mo", offline).empty
+    assert set(market_cache.download(["AAA", "ZZZ"], "1y", offline)) == {"AAA"}
+
+
+def test_entries_round_trip_with_timezone(cache):
+    index = pd.bdate_range("2024-01-01", periods=5, tz="America/New_York")
+    frame = pd.DataFrame({c: np.arange(5.0) for c in market_cache.COLUMNS}, index=index)
+    market_cache.store("TZ", market_cache.Entry.from_frame(frame, fetched_at=time.time(), span=5))
+
+    loaded = market_cache.load("TZ").to_frame()
+
+    assert list(loaded.index) == list(frame.index)
+    pd.testing.assert_frame_equal(loaded, frame, check_index_type=False, check_freq=False)
+    assert not list(cache.glob("*.tmp.npz"))
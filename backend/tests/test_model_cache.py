@@ -0,0 +1,32 @@
+import os
+
+import model_cache
+
+
+def test_entry_is_complete_only_once_meta_is_written():
+    directory = os.path.join(model_cache.MODEL_CACHE_DIR, "timesfm")
+    os.makedirs(directory, exist_ok=True)
+    open(os.path.join(directory, model_cache.WEIGHTS_FILE), "wb").close()
+    assert not model_cache.is_prepared("timesfm")
+
+    with open(os.path.join(directory, model_cache.META_FILE), "w") as f:
+        f.write("{}")
+    assert model_cache.is_prepared("timesfm")
+    assert not model_cache.is_prepared("chronos")
+
+
+
+def test_rewriting_an_entry_invalidates_it_first_and_writes_meta_last():
+    directory = os.path.join(model_cache.MODEL_CACHE_DIR, "chronos")
+    os.makedirs(directory, exist_ok=True)
+    open(os.path.join(directory, model_cache.WEIGHTS_FILE), "wb").close()
+    model_cache._write_meta("chronos", {"repo": "old"})
+    assert model_cache.is_prepared("chronos")
+
+    model_cache._invalidate("chronos")
+    assert not model_cache.is_prepared("chronos")
+    model_cache._invalidate("chronos")  # already incomplete: no error
+
+    model_cache._write_meta("chronos", {"repo": "new"})
+    assert model_cache.is_prepared("chronos")
+    assert sorted(os.listdir(directory)) == [model_cache.META_FILE, model_cache.WEIGHTS_FILE]
@@ -0,0 +1,183 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import online_forecast
+from forecasting import engine
+from online_forecast import MicroBatcher
+
+
+class FakeModel:
+    """load/forecast pair for a MicroBatcher, recording what it was asked to do."""
+
+    def __init__(self, fail=False):
+        self.loads, self.batches = 0, []
+        self.fail = fail
+
+    def load(self):
+        self.loads += 1
+        return object(), "fp32"
+
+    def forecast(self, model, mode, histories, horizons):
+        self.batches.append((len(histories), list(horizons)))
+        if self.fail:
+            raise RuntimeError("forward failed")
+        return [{h: np.float32(history[-1] + i) for i, h in enumerate(horizons)} for history in histories]
+
+
+@pytest.fixture(autouse=True)
+def window(monkeypatch):
+    monkeypatch.setattr(online_forecast, "WINDOW", 0.1)
+    # Batchers created here register with the engine; keep the module's own registrations
+    monkeypatch.setattr(engine, "unload_hooks", dict(engine.unload_hooks))
+
+
+def test_concurrent_requests_share_one_pass_over_their_horizons():
+    fake = FakeModel()
+    batcher = MicroBatcher("timesfm", fake.load, fake.forecast)
+
+    short = batcher.submit([1.0], ["1d"])
+    long = batcher.submit([2.0], ["1d", "1m"])
+
+    assert short.result(5) == {"1d": 1.0}
+    assert long.result(5) == {"1d": 2.0, "1m": 3.0}
+    assert fake.loads == 1
+    assert fake.batches == [(2, ["1d", "1m"])]
+
+
+def test_batches_are_capped(monkeypatch):
+    monkeypatch.setattr(online_forecast, "MAX_BATCH", 2)
+    fake = FakeModel()
+    batcher = MicroBatcher("timesfm", fake.load, fake.forecast)
+
+    futures = [batcher.submit([float(i)], ["1d"]) for i in range(5)]
+
+    assert [f.result(5)["1d"] for f in futures] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert [n for n, _ in fake.batches] == [2, 2, 1]
+    assert fake.loads == 1
+
+
+def test_forward_passes_wait_for_the_engine_model_lock():
+    fake = FakeModel()
+    batcher = MicroBatcher("chronos", fake.load, fake.forecast)
+
+    with engine.model_locks["chronos"]:
+        future = batcher.submit([1.0], ["1d"])
+        time.sleep(0.3)
+        assert not future.done() and fake.loads == 0
+
+    assert future.result(5) == {"1d": 1.0}
+
+
+def test_preload_waits_for_the_engine_model_lock():
+    fake = FakeModel()
+    batcher = MicroBatcher("timesfm", fake.load, fake.forecast)
+    engine.model_locks["timesfm"].acquire()
+    loader = threading.Thread(target=batcher.ensure_loaded)
+    loader.start()
+    time.sleep(0.2)
+    assert fake.loads == 0
+    engine.model_locks["timesfm"].release()
+    loader.join(5)
+
+    assert fake.loads == 1 and batcher.warm
+
+
+def test_idle_model_is_unloaded_and_reloaded_on_demand(monkeypatch):
+    monkeypatch.setattr(online_forecast, "IDLE_SECONDS", 0.2)
+    fake = FakeModel()
+    batcher = MicroBatcher("timesfm", fake.load, fake.forecast)
+
+    batcher.submit([1.0], ["1d"]).result(5)
+    assert batcher.warm
+    deadline = time.monotonic() + 5
+    while batcher.warm and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not batcher.warm
+
+    assert batcher.submit([1.0], ["1d"]).result(5) == {"1d": 1.0}
+    assert fake.loads == 2
+
+
+def test_a_run_phase_unloads_the_warm_model_before_loading_its_own():
+    fake = FakeModel()
+    batcher = MicroBatcher("timesfm", fake.load, fake.forecast)
+    batcher.submit([1.0], ["1d"]).result(5)
+    assert batcher.warm
+
+    def run(todo, on_result, stats):
+        assert not batcher.warm
+        return {"AAA": {"1d": 1.0}}
+
+    assert engine._locked("timesfm", run, {"AAA": [1.0]}, None, {}) == {"AAA": {"1d": 1.0}}
+    assert batcher.submit([2.0], ["1d"]).result(5) == {"1d": 2.0}
+    assert fake.loads == 2
+
+
+def test_a_failed_pass_fails_its_requests_and_the_next_one_recovers():
+    fake = FakeModel(fail=True)
+    batcher = MicroBatcher("timesfm", fake.load, fake.forecast)
+
+    futures = [batcher.submit([1.0], ["1d"]), batcher.submit([2.0], ["1d"])]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(5)
+
+    fake.fail = False
+    assert batcher.submit([3.0], ["1d"]).result(5) == {"1d": 3.0}
+
+
+def test_forecast_leaves_out_failed_models(monkeypatch):
+    good, bad = FakeModel(), FakeModel(fail=True)
+    monkeypatch.setattr(online_forecast, "batchers", {
+        "timesfm": MicroBatcher("timesfm", good.load, good.forecast),
+        "chronos": MicroBatcher("chronos", bad.load, bad.forecast),
+    })
+
+    assert online_forecast.forecast([5.0], horizons=["1d"]) == {"timesfm": {"1d": 5.0}}
+    with pytest.raises(RuntimeError):
+        online_forecast.forecast([5.0], models=["chronos"], horizons=["1d"])
+
+
+@pytest.fixture
+def client(db):
+    import main
+    import service
+    from fastapi.testclient import TestClient
+
+    assert service.add_stock(db, "AAA", "Test")
+    client = TestClient(main.app)
+    client.post("/api/refresh")
+    return client
+
+
+def test_computed_forecasts_are_stored_as_floats(client, monkeypatch):
+    monkeypatch.setattr(online_forecast, "forecast", lambda history, models, horizons: {
+        "timesfm": {"1d": np.float32(1.5), "1m": np.float32(2.5)},
+    })
+
+    response = client.get("/api/forecasts/AAA", params={"compute": "true", "horizons": "1d,1m"})
+
+    assert response.status_code == 200
+    assert response.json()["timesfm"] == {"1d": 1.5, "1m": 2.5}
+    assert client.get("/api/forecasts/AAA").json()["timesfm"] == {"1d": 1.5, "1m": 2.5}
+
+
+def test_a_failed_save_is_rolled_back(client, monkeypatch):
+    import service
+
+    monkeypatch.setattr(online_forecast, "forecast", lambda history, models, horizons: {"timesfm": {"1d": 1.0}})
+
+    def failing_apply(db, ticker, model_name, values):
+        db.query(service.Stock).filter(service.Stock.ticker == ticker).one().stack = "Changed"
+        raise ValueError("disk full")
+
+    monkeypatch.setattr(service, "apply_forecast", failing_apply)
+
+    response = client.get("/api/forecasts/AAA", params={"compute": "true"})
+
+    assert response.status_code == 503
+    assert "disk full" in response.json()["detail"]
+    assert client.get("/api/stocks").json()[0]["stack"] == "Test"
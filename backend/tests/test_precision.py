@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import precision
+
+
+def scores(**mape):
+    return {h: {"MAPE": v, "MAE": 0.0} for h, v in mape.items()}
+
+
+def test_compare_accepts_within_tolerance_and_rejects_beyond():
+    baseline = {"timesfm": scores(**{"1d": 1.0, "1y": 5.0}), "chronos": scores(**{"1d": 1.0, "1y": 5.0})}
+    candidate = {"timesfm": scores(**{"1d": 1.2, "1y": 5.4}), "chronos": scores(**{"1d": 1.0, "1y": 6.0})}
+
+    verdicts = precision.compare(baseline, candidate, tolerance=0.5)
+
+    assert verdicts["timesfm"]["accepted"]
+    assert verdicts["timesfm"]["worst_horizon"] == "1y"
+    assert not verdicts["chronos"]["accepted"]
+    assert verdicts["chronos"]["mape_delta"] == 1.0
+
+
+def test_compare_rejects_a_failed_evaluation():
+    baseline = {"timesfm": scores(**{"1d": 1.0}), "chronos": scores(**{"1d": 1.0})}
+    candidate = {"timesfm": {}, "chronos": scores(**{"1w": 1.0})}
+
+    verdicts = precision.compare(baseline, candidate, tolerance=0.5)
+
+    assert verdicts["timesfm"] == {"accepted": False, "reason": "evaluation failed"}
+    assert not verdicts["chronos"]["accepted"]
+
+
+@pytest.mark.parametrize("mode, device", [("fp32", "cpu"), ("fp16", "cpu"), ("bf16", "cuda")])
+def test_resolve_falls_back_without_consulting_the_gate(monkeypatch, mode, device):
+    monkeypatch.setattr(precision, "run_gate", lambda *a, **k: pytest.fail("gate ran"))
+    assert precision.resolve("timesfm", device, mode) == "fp32"
+
+
+def test_resolve_never_runs_the_gate_and_uses_stored_verdicts(monkeypatch, tmp_path):
+    torch = pytest.importorskip("torch")
+    monkeypatch.setattr(precision, "GATE_FILE", str(tmp_path / "gate.json"))
+    monkeypatch.setattr(precision, "run_gate", lambda *a, **k: pytest.fail("gate ran on the inference path"))
+
+    assert precision.resolve("timesfm", "cpu", "bf16") == "fp32"
+
+    (tmp_path / "gate.json").write_text(json.dumps({"bf16": {
+        "tolerance": precision.MAPE_TOLERANCE,
+        "torch_version": torch.__version__,
+        "models": {"timesfm": {"accepted": True}, "chronos": {"accepted": False}},
+    }}))
+    assert precision.resolve("timesfm", "cpu", "bf16") == "bf16"
+    assert precision.resolve("chronos", "cpu", "bf16") == "fp32"
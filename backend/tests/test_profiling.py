@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+import pytest
+
+import profiling
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    yield tmp_path
+    profiling.arm_inference(0)
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def test_sampler_records_busy_threads_and_skips_parked_ones():
+    parked = threading.Event()
+    idle = threading.Thread(target=parked.wait, name="parked", daemon=True)
+    idle.start()
+    sampler = profiling.StackSampler(interval=0.002)
+    sampler.start()
+    _busy(0.2)
+    sampler.stop()
+    parked.set()
+
+    assert sampler.samples > 0
+    stacks = list(sampler.counts)
+    assert any(s.startswith("MainThread;") and "_busy (test_profiling.py" in s for s in stacks)
+    assert not any(s.startswith("parked;") for s in stacks)
+    assert not any(s.startswith("profile-sampler;") for s in stacks)
+
+
+def test_sampler_limited_to_given_threads():
+    other = threading.Thread(target=_busy, args=(0.2,), name="other", daemon=True)
+    other.start()
+    sampler = profiling.StackSampler(threads={threading.get_ident()}, interval=0.002)
+    sampler.start()
+    _busy(0.2)
+    sampler.stop()
+    other.join()
+
+    assert sampler.counts
+    assert all(s.startswith("MainThread;") for s in sampler.counts)
+
+
+def test_profile_writes_folded_stacks_and_meta_even_on_error(profile_dir):
+    with pytest.raises(RuntimeError):
+        with profiling.Profile("unit test", "p1") as profile:
+            _busy(0.05)
+            raise RuntimeError("boom")
+
+    meta = json.loads((profile_dir / "p1" / "meta.json").read_text())
+    assert meta["id"] == "p1" and meta["target"] == "unit test"
+    assert meta["files"] == ["stacks.folded"]
+    assert "boom" in meta["error"]
+    lines = (profile_dir / "p1" / "stacks.folded").read_text().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) >= 1
+    assert profiling.list_profiles()[0]["id"] == profile.id
+
+
+def test_missing_torch_profiler_still_profiles(profile_dir, monkeypatch):
+    import builtins
+
+    real_import = builtins.__import__
+
+    def no_torch(name, *args, **kwargs):
+        if name == "torch":
+            raise ImportError("no torch here")
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_torch)
+    with profiling.Profile("no torch", "p2", torch_trace=True):
+        pass
+
+    assert json.loads((profile_dir / "p2" / "meta.json").read_text())["files"] == ["stacks.folded"]
+
+
+def test_armed_runs_are_profiled_once_each():
+    assert isinstance(profiling.inference("r0"), nullcontext)
+
+    assert profiling.arm_inference(2) == 2
+    first, second, third = (profiling.inference(f"r{i}") for i in (1, 2, 3))
+
+    assert isinstance(first, profiling.Profile) and first.id == "r1"
+    assert first.sampler.threads == {threading.get_ident()}
+    assert isinstance(second, profiling.Profile)
+    assert isinstance(third, nullcontext)
+    assert profiling.arm_inference(-3) == 0
+
+
+def test_profile_file_only_serves_listed_files(profile_dir):
+    with profiling.Profile("files", "p3"):
+        pass
+
+    assert profiling.profile_file("p3", "stacks.folded") == os.path.join(str(profile_dir), "p3", "stacks.folded")
+    assert profiling.profile_file("p3", "meta.json") is None
+    assert profiling.profile_file("p3", "../../etc/passwd") is None
+    assert profiling.profile_file("nope", "stacks.folded") is None
+
+
+def test_middleware_profiles_only_requests_that_ask(db, profile_dir):
+    import main
+    from fastapi.testclient import TestClient
+
+    client = TestClient(main.app)
+    assert "x-profile-id" not in client.get("/api/stocks").headers
+    assert "x-profile-id" not in client.get("/api/stocks", headers={"X-Profile": "0"}).headers
+    assert profiling.list_profiles() == []
+
+    by_header = client.get("/api/stocks", headers={"X-Profile": "1"}).headers["x-profile-id"]
+    by_query = client.get("/api/stocks", params={"profile": "1"}).headers["x-profile-id"]
+
+    listed = client.get("/api/admin/profiles").json()
+    assert {m["id"] for m in listed} == {by_header, by_query}
+    assert all(m["target"] == "GET /api/stocks" for m in listed)
+    assert client.get(f"/api/admin/profiles/{by_header}/stacks.folded").status_code == 200
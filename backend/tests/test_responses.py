@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import numpy as np
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import responses
+from models import Stock
+from schemas import StockOut, stock_row
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br" if responses.brotli else "gzip"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip;q=0", ""),
+    ("*", "br" if responses.brotli else "gzip"),
+    ("identity", ""),
+    ("", ""),
+])
+def test_negotiate_encoding(header, expected):
+    assert responses.negotiate_encoding(header) == expected
+
+
+def test_stock_row_serializes_numpy_history_and_matches_the_schema():
+    stock = Stock(id="aaa", ticker="AAA", name="A", history=np.array([1.5, 2.5], dtype=np.float32),
+                  forecasts={"timesfm": {"1d": 0.5}}, last_updated=datetime(2026, 1, 2, 3, 4, 5))
+
+    body = responses.FastJSONResponse([stock_row(stock)]).body
+    [row] = orjson.loads(body)
+
+    assert row["history"] == [1.5, 2.5]
+    assert row["last_updated"] == "2026-01-02T03:04:05"
+    assert StockOut.model_validate(row).ticker == "AAA"
+
+
+def compressed_app(size):
+    app = FastAPI()
+    app.add_middleware(responses.CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/payload")
+    def payload():
+        return responses.FastJSONResponse({"data": "x" * size})
+
+    return TestClient(app)
+
+
+def test_large_responses_are_compressed_and_small_ones_are_not():
+    client = compressed_app(10_000)
+    response = client.get("/payload", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json()["data"] == "x" * 10_000
+
+    small = compressed_app(10).get("/payload", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_large_bodies_are_compressed_off_the_event_loop():
+    client = compressed_app(responses._OFFLOAD_BYTES + 1)
+    response = client.get("/payload", headers={"Accept-Encoding": "gzip"})
+    assert int(response.headers["content-length"]) < responses._OFFLOAD_BYTES
+    assert len(response.json()["data"]) == responses._OFFLOAD_BYTES + 1
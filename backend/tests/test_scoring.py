@@ -0,0 +1,59 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import scoring
+from models import ForecastPrediction
+
+
+def closes(values, start="2026-01-05"):
+    return pd.Series(values, index=pd.bdate_range(start, periods=len(values)))
+
+
+def test_matured_horizons_are_scored_once_and_the_rest_stay_pending(db):
+    # Predicts +10% at 1d and +20% at 1w from a base close of 100 on the first bar
+    scoring.record_prediction(db, "run-1", "AAA", "timesfm", {"1d": 10.0, "1w": 20.0}, 100.0, date(2026, 1, 5))
+    db.commit()
+
+    assert scoring.score_ticker(db, "AAA", closes([100.0, 110.0, 100.0])) == 1
+    db.commit()
+    p = db.query(ForecastPrediction).one()
+    assert p.errors == {"1d": pytest.approx(0.0)}
+    assert p.pending == ["1w"] and p.open
+
+    # Rescoring the same bars adds nothing; the 1w bar (5 bars later) closes it
+    assert scoring.score_ticker(db, "AAA", closes([100.0, 110.0, 100.0])) == 0
+    assert scoring.score_ticker(db, "AAA", closes([100.0, 110.0, 100.0, 100.0, 100.0, 100.0])) == 1
+    db.commit()
+    p = db.query(ForecastPrediction).one()
+    assert p.errors["1w"] == pytest.approx(20.0)
+    assert not p.open
+
+
+def test_summary_aggregates_per_model_and_horizon(db):
+    scoring.record_prediction(db, "run-1", "AAA", "timesfm", {"1d": 10.0}, 100.0, date(2026, 1, 5))
+    scoring.record_prediction(db, "run-1", "BBB", "timesfm", {"1d": -10.0}, 100.0, date(2026, 1, 5))
+    db.commit()
+    # Scored in one transaction: both add to the same accuracy row
+    scoring.score_ticker(db, "AAA", closes([100.0, 99.0]))  # wrong direction
+    scoring.score_ticker(db, "BBB", closes([100.0, 90.0]))  # exact
+    db.commit()
+
+    summary = scoring.summary(db)["timesfm"]["1d"]
+
+    miss = (1.10 / 0.99 - 1) * 100
+    assert summary["count"] == 2
+    assert summary["MAPE"] == pytest.approx(miss / 2)
+    assert summary["bias"] == pytest.approx(miss / 2)
+    assert summary["RMSE"] == pytest.approx((miss ** 2 / 2) ** 0.5)
+    assert summary["direction_accuracy"] == pytest.approx(0.5)
+
+
+def test_prediction_without_its_base_bar_is_closed(db):
+    scoring.record_prediction(db, "run-1", "AAA", "chronos", {"1d": 1.0}, 100.0, date(2025, 6, 2))
+    db.commit()
+
+    assert scoring.score_ticker(db, "AAA", closes([100.0, 101.0])) == 0
+    db.commit()
+    assert not db.query(ForecastPrediction).one().open
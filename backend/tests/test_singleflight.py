@@ -0,0 +1,109 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import service
+from forecasting import engine
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight, calls, started = SingleFlight(), [], threading.Event()
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, "k", work)
+        started.wait(5)
+        assert flight.in_flight("k")
+        followers = [pool.submit(flight.do, "k", work) for _ in range(3)]
+        time.sleep(0.05)
+        release.set()
+        outcomes = [leader.result()] + [f.result() for f in followers]
+
+    assert calls == [1]
+    assert outcomes == [("result", False)] + [("result", True)] * 3
+    assert not flight.in_flight("k")
+
+
+def test_errors_reach_every_waiter_and_the_next_call_starts_fresh():
+    flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ConnectionError("provider down")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "k", failing)
+        started.wait(5)
+        follower = pool.submit(flight.do, "k", failing)
+        time.sleep(0.05)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ConnectionError):
+                future.result()
+
+    assert flight.do("k", lambda: 42) == (42, False)
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight, release = SingleFlight(), threading.Event()
+
+    with ThreadPoolExecutor(2) as pool:
+        slow = pool.submit(flight.do, "a", release.wait, 5)
+        assert flight.do("b", lambda: "b") == ("b", False)
+        release.set()
+        slow.result()
+
+
+def test_a_run_can_only_be_claimed_once():
+    assert service._claim_run("run-x")
+    try:
+        assert not service._claim_run("run-x")
+    finally:
+        service._active_runs.discard("run-x")
+
+
+def test_model_phases_wait_for_the_model_lock_and_report_the_wait():
+    stats = {}
+    engine.model_locks["chronos"].acquire()
+    timer = threading.Timer(0.2, engine.model_locks["chronos"].release)
+    timer.start()
+
+    result = engine._locked("chronos", lambda todo, on_result, s: todo, {"AAA": [1.0]}, None, stats)
+
+    assert result == {"AAA": [1.0]}
+    assert stats["chronos"]["lock_wait_s"] >= 0.15
+
+
+def test_concurrent_refresh_requests_are_coalesced(db, monkeypatch):
+    import main
+    from fastapi.testclient import TestClient
+
+    fetches, release = [], threading.Event()
+
+    def update_all_data(session):
+        fetches.append(1)
+        release.wait(5)
+        return {}
+
+    monkeypatch.setattr(main, "_update_all_data", update_all_data)
+    client = TestClient(main.app)
+    with ThreadPoolExecutor(3) as pool:
+        responses = [pool.submit(client.post, "/api/refresh") for _ in range(3)]
+        while not main._refresh_flight.in_flight("data"):
+            time.sleep(0.01)
+        time.sleep(0.1)
+        release.set()
+        bodies = [r.result().json() for r in responses]
+
+    assert fetches == [1]
+    assert sum(1 for b in bodies if b.get("coalesced")) == 2
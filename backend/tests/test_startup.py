@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import threading
+
+from fastapi.testclient import TestClient
+
+from conftest import BACKEND_DIR
+
+
+def test_importing_the_api_does_not_import_ml_or_provider_libraries():
+    heavy = ("torch", "timesfm", "chronos", "transformers", "yfinance", "numpy", "pandas")
+    out = subprocess.run(
+        [sys.executable, "-c", f"import sys, main; print([m for m in {heavy!r} if m in sys.modules])"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+
+    assert out.strip().splitlines()[-1] == "[]"
+
+
+def test_importing_the_api_does_not_touch_the_database(tmp_path):
+    path = tmp_path / "untouched.db"
+    subprocess.run(
+        [sys.executable, "-c", "import main"],
+        cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"}, check=True,
+    )
+
+    assert not path.exists()
+
+
+def test_api_serves_while_seeding_is_still_running(db, monkeypatch):
+    import main
+
+    release = threading.Event()
+    monkeypatch.setattr(main, "seed_and_fetch", lambda: release.wait(10))
+    try:
+        with TestClient(main.app) as client:
+            response = client.get("/api/stocks")
+            assert response.status_code == 200
+            assert not release.is_set()
+    finally:
+        release.set()
@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import ticker_metadata
+from models import Stock, TickerMetadata
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    out = []
+    monkeypatch.setattr(ticker_metadata, "enqueue", lambda tickers: out.extend([tickers] if isinstance(tickers, str) else tickers))
+    return out
+
+
+class CountingTicker:
+    calls = 0
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    @property
+    def info(self):
+        CountingTicker.calls += 1
+        return {"shortName": f"{self.symbol} Inc", "exchange": "NMS", "currency": "USD", "sector": "Tech"}
+
+
+def test_missing_ticker_is_fetched_once_then_served_from_the_table(db, monkeypatch, queued):
+    CountingTicker.calls = 0
+    monkeypatch.setattr(ticker_metadata.market_data, "Ticker", CountingTicker)
+
+    first = ticker_metadata.get_metadata(db, "AAA")
+    second = ticker_metadata.get_metadata(db, "AAA")
+
+    assert first.name == second.name == "AAA Inc"
+    assert CountingTicker.calls == 1
+    assert queued == []
+
+
+def test_stale_rows_are_served_and_queued(db, queued):
+    db.add(TickerMetadata(ticker="OLD", name="Old Co", fetched_at=datetime.utcnow() - ticker_metadata.METADATA_TTL - timedelta(hours=1)))
+    db.add(TickerMetadata(ticker="NEW", name="New Co", fetched_at=datetime.utcnow()))
+    db.commit()
+
+    rows = ticker_metadata.get_many(db, ["OLD", "NEW", "MISSING"])
+
+    assert {t: r.name for t, r in rows.items()} == {"OLD": "Old Co", "NEW": "New Co"}
+    assert queued == ["OLD"]
+
+
+def test_refresh_fills_placeholder_names_and_keeps_rows_on_failure(db, monkeypatch):
+    db.add(Stock(id="bbb", ticker="BBB", name="BBB", stack="Models", forecasts={}))
+    db.add(TickerMetadata(ticker="CCC", name="Kept", fetched_at=datetime.utcnow()))
+    db.commit()
+    monkeypatch.setattr(ticker_metadata.market_data, "Ticker", CountingTicker)
+
+    assert ticker_metadata.refresh(db, "BBB")
+    assert db.query(Stock).one().name == "BBB Inc"
+
+    def failing(symbol):
+        raise ConnectionError("rate limited")
+
+    monkeypatch.setattr(ticker_metadata.market_data, "Ticker", failing)
+    assert not ticker_metadata.refresh(db, "CCC")
+    assert db.get(TickerMetadata, "CCC").name == "Kept"
+
+
+def test_sweep_queues_tracked_tickers_without_fresh_metadata(db, queued):
+    for ticker in ("AAA", "BBB", "CCC"):
+        db.add(Stock(id=ticker.lower(), ticker=ticker, name=ticker, stack="Models", forecasts={}))
+    db.add(TickerMetadata(ticker="AAA", name="A", fetched_at=datetime.utcnow()))
+    db.add(TickerMetadata(ticker="BBB", name="B", fetched_at=datetime.utcnow() - ticker_metadata.METADATA_TTL * 2))
+    db.commit()
+
+    assert ticker_metadata.sweep(db) == 2
+    assert sorted(queued) == ["BBB", "CCC"]
+
+
+def test_refresher_delays_the_first_sweep_and_spaces_out_fetches(monkeypatch):
+    sweeps, refreshed = [], []
+    monkeypatch.setattr(ticker_metadata, "_queue", queue.Queue())
+    monkeypatch.setattr(ticker_metadata, "_queued", set())
+    monkeypatch.setattr(ticker_metadata, "FIRST_SWEEP_DELAY_S", 0.5)
+    monkeypatch.setattr(ticker_metadata, "MIN_REFRESH_INTERVAL_S", 0.1)
+    monkeypatch.setattr(ticker_metadata, "sweep", lambda db: sweeps.append(time.monotonic()) or 0)
+    monkeypatch.setattr(ticker_metadata, "refresh", lambda db, ticker: refreshed.append(time.monotonic()))
+    ticker_metadata.enqueue(["AAA", "BBB", "CCC"])
+
+    stop = threading.Event()
+    start = time.monotonic()
+    worker = threading.Thread(target=ticker_metadata.run_refresher, args=(stop,))
+    worker.start()
+    time.sleep(1.5)
+    stop.set()
+    worker.join()
+
+    assert len(refreshed) == 3
+    assert all(b - a >= 0.1 for a, b in zip(refreshed, refreshed[1:]))
+    assert len(sweeps) == 1 and sweeps[0] - start >= 0.5
@@ -0,0 +1,30 @@
+"""Synthetic stored universes for the covariance and indicator tests."""
+from datetime import datetime
+
+import numpy as np
+
+from models import Stock
+
+LENGTHS = {"AAA": 400, "BBB": 400, "CCC": 300, "DDD": 120}
+
+
+def random_walks(seed=0, extra=0):
+    rng = np.random.default_rng(seed)
+    return {t: 50 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, n + extra))) for t, n in LENGTHS.items()}
+
+
+def store(db, walks, cut=0, when=None, partial=None):
+    """
+    Writes each walk minus its last `cut` bars as the stored history;
+    `partial` scales the last stored bar, like an intraday partial bar.
+    """
+    when = when or datetime(2026, 1, 2)
+    for ticker, closes in walks.items():
+        stock = db.get(Stock, ticker.lower()) or Stock(id=ticker.lower(), ticker=ticker, name=ticker, stack="Models", forecasts={})
+        history = np.array(closes[:len(closes) - cut])
+        if partial is not None:
+            history[-1] *= partial
+        stock.history = history
+        stock.last_updated = when
+        db.add(stock)
+    db.commit()
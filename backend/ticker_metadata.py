@@ -0,0 +1,169 @@
+"""
+Persistent ticker metadata cache (name, exchange, currency, sector) with a TTL.
+
+Provider `.info` calls are among the slowest and most rate-limited Yahoo calls,
+so every code path that needs company metadata goes through this module:
+  - fresh rows are served straight from the ticker_metadata table
+  - stale rows are served as-is and queued for a background refresh
+  - a ticker never seen before is fetched inline once (get_metadata) or
+    queued for the background refresher (get_metadata(..., fetch_missing=False))
+
+run_refresher() is the background loop started from the API lifespan: it drains
+the queue and periodically sweeps tracked tickers whose metadata is missing or
+older than METADATA_TTL_HOURS. The first sweep waits METADATA_FIRST_SWEEP_SECONDS
+so it does not compete with startup fetches, and background `.info` calls are
+spaced at least METADATA_MIN_INTERVAL_SECONDS apart so a full queue trickles out
+instead of tripping the provider's rate limit.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+import market_data
+from models import Stock, TickerMetadata
+
+logger = logging.getLogger(__name__)
+
+METADATA_TTL = timedelta(hours=float(os.environ.get("METADATA_TTL_HOURS", "168")))
+SWEEP_INTERVAL_S = float(os.environ.get("METADATA_SWEEP_SECONDS", "3600"))
+FIRST_SWEEP_DELAY_S = float(os.environ.get("METADATA_FIRST_SWEEP_SECONDS", "60"))
+MIN_REFRESH_INTERVAL_S = float(os.environ.get("METADATA_MIN_INTERVAL_SECONDS", "1.0"))
+
+_queue = queue.Queue()
+_queued = set()
+_queued_lock = threading.Lock()
+
+
+def fetch_info(ticker: str, handle=None) -> dict:
+    """One provider .info call, mapped to the cached fields."""
+    info = (handle or market_data.Ticker(ticker)).info or {}
+    return {
+        "name": info.get("shortName") or info.get("longName") or ticker,
+        "exchange": info.get("exchange"),
+        "currency": info.get("currency"),
+        "sector": info.get("sector"),
+    }
+
+
+def is_stale(row) -> bool:
+    return row.fetched_at is None or datetime.utcnow() - row.fetched_at > METADATA_TTL
+
+
+def _store(db, ticker: str, fields: dict):
+    row = db.get(TickerMetadata, ticker)
+    if row is None:
+        row = TickerMetadata(ticker=ticker)
+        db.add(row)
+    for key, value in fields.items():
+        setattr(row, key, value)
+    row.fetched_at = datetime.utcnow()
+
+    # Fill in placeholder names (bulk imports use the ticker until metadata arrives)
+    for stock in db.query(Stock).filter(Stock.ticker == ticker):
+        if not stock.name or stock.name == ticker:
+            stock.name = row.name
+    return row
+
+
+def enqueue(tickers):
+    """Queues tickers for the background refresher (deduplicated)."""
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    with _queued_lock:
+        for ticker in tickers:
+            if ticker not in _queued:
+                _queued.add(ticker)
+                _queue.put(ticker)
+
+
+def get_metadata(db, ticker: str, handle=None, fetch_missing: bool = True):
+    """
+    Cached metadata row for `ticker`, or None if unavailable.
+    `handle` lets callers reuse a provider Ticker they already created.
+    """
+    row = db.get(TickerMetadata, ticker)
+    if row is None:
+        if not fetch_missing:
+            enqueue(ticker)
+            return None
+        try:
+            row = _store(db, ticker, fetch_info(ticker, handle))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Metadata fetch failed for {ticker}: {e}")
+            return None
+    elif is_stale(row):
+        enqueue(ticker)
+    return row
+
+
+def get_many(db, tickers) -> dict:
+    """
+    { ticker: row } for cached tickers, never fetching inline. Stale rows are
+    queued; queueing missing tickers is left to the caller, once their Stock
+    rows exist so the refresher can fill in placeholder names.
+    """
+    tickers = list(tickers)
+    rows = {r.ticker: r for r in db.query(TickerMetadata).filter(TickerMetadata.ticker.in_(tickers))} if tickers else {}
+    enqueue([t for t, row in rows.items() if is_stale(row)])
+    return rows
+
+
+def refresh(db, ticker: str) -> bool:
+    """Re-fetches one ticker's metadata. On failure the previous row is kept."""
+    try:
+        _store(db, ticker, fetch_info(ticker))
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Metadata refresh failed for {ticker}: {e}")
+        return False
+
+
+def sweep(db) -> int:
+    """Queues every tracked ticker whose metadata is missing or stale."""
+    cached = {r.ticker: r for r in db.query(TickerMetadata)}
+    due = [
+        ticker for (ticker,) in db.query(Stock.ticker)
+        if ticker not in cached or is_stale(cached[ticker])
+    ]
+    enqueue(due)
+    return len(due)
+
+
+def run_refresher(stop_event: threading.Event):
+    """Background loop: periodic sweeps plus draining the refresh queue."""
+    from database import SessionLocal
+
+    # Backdated so the first sweep comes FIRST_SWEEP_DELAY_S after start
+    last_sweep = time.monotonic() - SWEEP_INTERVAL_S + FIRST_SWEEP_DELAY_S
+    last_refresh = float("-inf")
+    while not stop_event.is_set():
+        db = SessionLocal()
+        try:
+            if time.monotonic() - last_sweep >= SWEEP_INTERVAL_S:
+                queued = sweep(db)
+                if queued:
+                    logger.info(f"Metadata sweep queued {queued} tickers")
+                last_sweep = time.monotonic()
+
+            try:
+                ticker = _queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            wait = last_refresh + MIN_REFRESH_INTERVAL_S - time.monotonic()
+            if wait > 0 and stop_event.wait(wait):
+                break
+            with _queued_lock:
+                _queued.discard(ticker)
+            refresh(db, ticker)
+            last_refresh = time.monotonic()
+        except Exception as e:
+            logger.error(f"Metadata refresher error: {e}")
+        finally:
+            db.close()
@@ -0,0 +1,179 @@
+"""
+Shared machinery for statistics maintained online over the whole tracked universe.
+
+Stored histories are undated daily closes, so the universe is viewed as a
+(T, N) close matrix right-aligned on each ticker's latest bar, as for
+forecasting. UniverseState.sync() compares the stored histories with what it
+saw last time: when every ticker gained the same number of bars, only those
+bars are handed to the subclass (`_advance`); removed tickers are dropped
+(`_drop`). A rewritten last bar (an intraday partial bar replaced by the final
+close) is a revision: the subclass swaps it out and folds the new bars in
+(`_revise`). Anything else (new tickers, revised older history, a partial
+refresh) rebuilds from the full matrix (`_build`).
+
+Subclasses: covariance.CovarianceEngine, indicators.IndicatorEngine.
+"""
+import logging
+import threading
+
+import numpy as np
+
+from models import Stock
+
+logger = logging.getLogger(__name__)
+
+# Closes remembered per ticker to recognise its history on the next sync
+_TAIL = 5
+# Furthest back the previous tail is searched for, i.e. max new bars per sync
+_MAX_NEW_BARS = 60
+
+
+def close_matrix(histories) -> np.ndarray:
+    """
+    (T, N) float64 closes of right-aligned histories, T being the longest.
+    NaN before a ticker's first bar and where a close is not positive.
+    """
+    T = max((len(h) for h in histories), default=0)
+    C = np.full((T, len(histories)), np.nan)
+    for j, h in enumerate(histories):
+        if len(h):
+            C[T - len(h):, j] = h
+    C[~(C > 0)] = np.nan
+    return C
+
+
+def new_bars(tail, history):
+    """
+    (bars appended to `history` since `tail` was its end, whether the last bar
+    of `tail` was rewritten), or None if not found.
+    """
+    history = np.asarray(history, dtype=np.float64)
+    if len(tail) == 0:
+        return None
+    searched = range(0, min(_MAX_NEW_BARS, len(history) - len(tail)) + 1)
+    for new in searched:
+        end = len(history) - new
+        if np.array_equal(history[end - len(tail):end], tail):
+            return new, False
+    # Matching on the bars before the last one too: that one may be a partial bar since rewritten
+    if len(tail) > 1:
+        for new in searched:
+            end = len(history) - new
+            if np.array_equal(history[end - len(tail):end - 1], tail[:-1]):
+                return new, True
+    return None
+
+
+class UniverseState:
+    """Base class keeping derived state in step with the stored histories."""
+
+    name = "universe"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tickers = []
+        self._index = {}
+        self._tails = []
+        self._fingerprint = None
+        self.built = False
+        self.as_of = None
+        self.updates = 0  # incremental bar updates since the last rebuild
+
+    # Subclass hooks, called with the lock held
+    def _build(self, closes: np.ndarray):
+        """Computes the state from scratch from the (T, N) close matrix."""
+        raise NotImplementedError
+
+    def _drop(self, keep):
+        """Keeps only the tickers at positions `keep`."""
+        raise NotImplementedError
+
+    def _advance(self, closes: np.ndarray):
+        """Folds in new bars: (k + 1, N) closes, the first row being the previous last bar."""
+        raise NotImplementedError
+
+    def _revise(self, closes: np.ndarray, previous: np.ndarray):
+        """
+        Replaces the last bar and folds in new bars: (k + 2, N) closes, the
+        first row being the bar before the revised one, the second its new
+        values. `previous` (N,) are the values it is replacing.
+        """
+        raise NotImplementedError
+
+    def _load(self, db):
+        rows, seen = [], set()
+        for ticker, history, last_updated in db.query(Stock.ticker, Stock.history, Stock.last_updated).order_by(Stock.ticker):
+            if ticker not in seen:
+                seen.add(ticker)
+                rows.append((ticker, history if history is not None else np.empty(0), last_updated))
+        return rows
+
+    def _fingerprint_of(self, db):
+        return tuple(sorted(set(db.query(Stock.ticker, Stock.last_updated)), key=lambda r: (r[0], str(r[1]))))
+
+    def _remember(self, rows, fingerprint):
+        self.tickers = [t for t, _, _ in rows]
+        self._index = {t: i for i, t in enumerate(self.tickers)}
+        self._tails = [np.asarray(h[-_TAIL:], dtype=np.float64) for _, h, _ in rows]
+        self._fingerprint = fingerprint
+        self.as_of = max((u for _, _, u in rows if u), default=None)
+
+    def _rebuild(self, rows, fingerprint):
+        self._build(close_matrix([h for _, h, _ in rows]))
+        self._remember(rows, fingerprint)
+        self.built = True
+        self.updates = 0
+        logger.info(f"{self.name} rebuilt over {len(self.tickers)} tickers")
+
+    def _try_incremental(self, rows, fingerprint) -> bool:
+        tickers = [t for t, _, _ in rows]
+        if not set(tickers) <= set(self._index):
+            return False
+        keep = [self._index[t] for t in tickers]
+        counts = {
+            new_bars(self._tails[i], h)
+            for i, (_, h, _) in zip(keep, rows)
+            if len(self._tails[i]) or len(h)  # tickers still without data don't vote
+        }
+        if None in counts or len({k for k, _ in counts}) > 1:
+            return False
+        revised = any(r for _, r in counts)
+        k = counts.pop()[0] if counts else 0
+
+        if len(keep) != len(self.tickers):
+            self._drop(keep)
+        if revised:
+            previous = close_matrix([self._tails[i][-1:] for i in keep])[-1]
+            self._revise(close_matrix([h[-(k + 2):] for _, h, _ in rows]), previous)
+            self.updates += k
+        elif k:
+            self._advance(close_matrix([h[-(k + 1):] for _, h, _ in rows]))
+            self.updates += k
+        self._remember(rows, fingerprint)
+        return True
+
+    def rebuild(self, db):
+        """Recomputes the state from scratch from the stored histories."""
+        with self._lock:
+            self._rebuild(self._load(db), self._fingerprint_of(db))
+
+    def sync(self, db):
+        """
+        Brings the state up to date with the stored histories. A no-op
+        (one small query) when no stock has been updated since the last sync.
+        """
+        with self._lock:
+            fingerprint = self._fingerprint_of(db)
+            if self.built and fingerprint == self._fingerprint:
+                return
+            rows = self._load(db)
+            if not (self.built and self._try_incremental(rows, fingerprint)):
+                self._rebuild(rows, fingerprint)
+
+    def _positions(self, tickers):
+        """(tickers, positions) for `tickers` (all if None). KeyError lists unknown tickers."""
+        tickers = list(tickers) if tickers else list(self.tickers)
+        unknown = [t for t in tickers if t not in self._index]
+        if unknown:
+            raise KeyError(", ".join(unknown))
+        return tickers, [self._index[t] for t in tickers]
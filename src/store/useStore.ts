@@ -24,11 +24,43 @@ export interface Company {
     history: number[];
 }
 
+// GET /api/stocks?since=<version>
+interface StockDelta {
+    version: number;
+    full: boolean; // stocks is the whole list
+    stocks: Company[];
+    deleted: string[];
+}
+
+// Applies a delta to the current list: removes deleted ids, replaces changed rows, appends new ones
+function mergeStocks(current: Company[], delta: StockDelta): Company[] {
+    if (delta.full) return delta.stocks;
+    if (delta.stocks.length === 0 && delta.deleted.length === 0) return current;
+
+    const deleted = new Set(delta.deleted);
+    const changed = new Map(delta.stocks.map((s) => [s.id, s]));
+    const merged = current
+        .filter((s) => !deleted.has(s.id))
+        .map((s) => {
+            const updated = changed.get(s.id);
+            changed.delete(s.id);
+            return updated ?? s;
+        });
+    return [...merged, ...changed.values()];
+}
+
+async function fetchStocksSince(version: number): Promise<StockDelta> {
+    const res = await fetch(`/api/py/stocks?since=${version}`);
+    if (!res.ok) throw new Error('Failed to fetch stocks');
+    return res.json();
+}
+
 interface PortfolioState {
     stocks: Company[];
     budget: number;
     allocations: Record<string, number>; // companyId -> percentage (0-100)
     lastUpdated: Date | null;
+    dataVersion: number; // backend data version the stocks reflect (0: none yet)
     isRefreshing: boolean;
     hasLoadedInitially: boolean;
     error: string | null;
@@ -45,6 +77,7 @@ export const useStore = create<PortfolioState>((set, get) => ({
     budget: 100000,
     allocations: {},
     lastUpdated: null,
+    dataVersion: 0,
     isRefreshing: false,
     hasLoadedInitially: false,
     error: null,
@@ -60,12 +93,10 @@ export const useStore = create<PortfolioState>((set, get) => ({
         if (get().hasLoadedInitially) return;
 
         try {
-            const res = await fetch('/api/py/stocks');
-            if (!res.ok) throw new Error('Failed to fetch stocks');
-
-            const data = await res.json();
+            const delta = await fetchStocksSince(0);
             set({
-                stocks: data,
+                stocks: delta.stocks,
+                dataVersion: delta.version,
                 lastUpdated: new Date(),
                 hasLoadedInitially: true,
                 error: null
@@ -109,15 +140,13 @@ export const useStore = create<PortfolioState>((set, get) => ({
                 : '/api/py/refresh';
             await fetch(url, { method: 'POST' });
 
-            // Fetch updated data
-            const res = await fetch('/api/py/stocks');
-            if (!res.ok) throw new Error('Failed to fetch stocks');
-
-            const data = await res.json();
+            // Fetch only what changed since the data we have
+            const delta = await fetchStocksSince(get().dataVersion);
 
             // Update with new data (preserving existing if fetch failed)
             set({
-                stocks: data,
+                stocks: mergeStocks(get().stocks, delta),
+                dataVersion: delta.version,
                 lastUpdated: new Date(),
                 isRefreshing: false,
                 error: null